@@ -0,0 +1,101 @@
+"""
+Commands per second over the sock engine, unframed vs framed.
+
+    python benchmarks/bench_framing.py [commands] [tasks]
+
+Runs the daemon's unix socket server in a background thread with `tasks`
+added tasks and sends `commands` List requests from the main thread:
+
+- unframed:  the previous protocol, one connection per command, the reply
+             read until the daemon closes the connection.
+- framed:    one persistent connection, a length-prefixed frame per command.
+
+Also sends one batch of 5000 requests each way to check that nothing is
+truncated, the old client stopped at a single 10 KB read.
+"""
+import asyncio
+import json
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common.frame import FrameSocket  # noqa: E402
+from common.task import AsyncTask, Task  # noqa: E402
+from watchmend import lib  # noqa: E402
+from watchmend.engine.sock import run_sock  # noqa: E402
+
+REQUEST = json.dumps([{"command": {"List": None}}]).encode("utf-8")
+BATCH = json.dumps([{"command": {"List": None}}] * 5000).encode("utf-8")
+
+
+def serve(path: str, tasks: int, ready: threading.Event) -> None:
+    async def main() -> None:
+        for i in range(tasks):
+            await lib.add(Task(
+                id=i + 1,
+                name=f"task-{i}",
+                command="true",
+                task_type=AsyncTask(max_restart=0, has_restart=0, started_at=0, stopped_at=0),
+            ))
+        server = asyncio.create_task(run_sock(path))
+        while not os.path.exists(path):
+            await asyncio.sleep(0.01)
+        ready.set()
+        await server
+
+    asyncio.run(main())
+
+
+def unframed(path: str, payload: bytes) -> bytes:
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.connect(path)
+        client.sendall(payload)
+        chunks = []
+        while True:
+            chunk = client.recv(65536)
+            if not chunk:
+                break
+            chunks.append(chunk)
+    return b"".join(chunks)
+
+
+def run(path: str, commands: int) -> None:
+    begin = time.perf_counter()
+    for _ in range(commands):
+        json.loads(unframed(path, REQUEST))
+    elapsed = time.perf_counter() - begin
+    print(f"unframed {commands} commands in {elapsed:.2f}s: {commands / elapsed:,.0f}/s")
+
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    client.connect(path)
+    connection = FrameSocket(client)
+    begin = time.perf_counter()
+    for _ in range(commands):
+        json.loads(connection.call(REQUEST))
+    elapsed = time.perf_counter() - begin
+    print(f"framed   {commands} commands in {elapsed:.2f}s: {commands / elapsed:,.0f}/s")
+
+    reply = unframed(path, BATCH)
+    print(f"unframed batch: {len(BATCH)} bytes sent, {len(json.loads(reply))} responses, {len(reply)} bytes")
+    reply = connection.call(BATCH)
+    print(f"framed   batch: {len(BATCH)} bytes sent, {len(json.loads(reply))} responses, {len(reply)} bytes")
+    connection.close()
+
+
+def main() -> None:
+    commands = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    tasks = int(sys.argv[2]) if len(sys.argv) > 2 else 0
+    path = os.path.join(tempfile.mkdtemp(), "watchmen.sock")
+    ready = threading.Event()
+    threading.Thread(target=serve, args=(path, tasks, ready), daemon=True).start()
+    ready.wait()
+    run(path, commands)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Mixed workload over the sock engine, one request at a time vs pipelined.
+
+    python benchmarks/bench_pipeline.py [tasks] [window]
+
+Runs the daemon's unix socket server in a background thread with `tasks`
+added tasks; each one takes about 0.2s to exit on SIGTERM. For every task
+the client sends Start, List of the task, Stop, List of the task, with a
+Metrics request in between:
+
+- sequential:  every request waits for its response before the next is sent.
+- pipelined:   up to `window` requests in flight on one connection, answered
+               out of order; those on the same task still run in order.
+
+Reports requests per second and checks that every last List saw its task
+stopped.
+"""
+import asyncio
+import json
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common.frame import FrameSocket  # noqa: E402
+from common.task import AsyncTask, Task  # noqa: E402
+from watchmend import lib  # noqa: E402
+from watchmend.engine.sock import run_sock  # noqa: E402
+
+SCRIPT = "exec 2>/dev/null; trap 'sleep 0.2; exit 0' TERM; while :; do sleep 0.05; done"
+
+
+def serve(path: str, tasks: int, ready: threading.Event) -> None:
+    async def main() -> None:
+        for i in range(tasks):
+            await lib.add(Task(
+                id=i + 1,
+                name=f"task-{i}",
+                command="sh",
+                args=["-c", SCRIPT],
+                task_type=AsyncTask(max_restart=0, has_restart=0, started_at=0, stopped_at=0),
+            ))
+        server = asyncio.create_task(run_sock(path))
+        while not os.path.exists(path):
+            await asyncio.sleep(0.01)
+        ready.set()
+        await server
+
+    asyncio.run(main())
+
+
+def workload(tasks: int) -> List[bytes]:
+    requests = []
+    for i in range(1, tasks + 1):
+        for command in ("Start", "List", "Metrics", "Stop", "List"):
+            data = None if command == "Metrics" else {"id": i}
+            requests.append(json.dumps([{"command": {command: data}}]).encode("utf-8"))
+    return requests
+
+
+def stopped(replies: List[bytes]) -> int:
+    # the last List of every task is the last of its five requests
+    count = 0
+    for reply in replies[4::5]:
+        status = json.loads(reply)[0]["data"]["Status"]
+        count += status[0]["status"] == "stopped"
+    return count
+
+
+def run(path: str, tasks: int, window: int) -> None:
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    client.connect(path)
+    connection = FrameSocket(client)
+    requests = workload(tasks)
+
+    begin = time.perf_counter()
+    replies = [connection.call(request) for request in requests]
+    elapsed = time.perf_counter() - begin
+    print(f"sequential {len(requests)} requests in {elapsed:.2f}s: {len(requests) / elapsed:,.0f}/s, "
+          f"{stopped(replies)}/{tasks} stopped")
+
+    begin = time.perf_counter()
+    ids = []
+    replies = []
+    for request in requests:
+        if len(ids) - len(replies) >= window:
+            replies.append(connection.result(ids[len(replies)]))
+        ids.append(connection.submit(request))
+    replies += [connection.result(i) for i in ids[len(replies):]]
+    elapsed = time.perf_counter() - begin
+    print(f"pipelined  {len(requests)} requests in {elapsed:.2f}s: {len(requests) / elapsed:,.0f}/s, "
+          f"{stopped(replies)}/{tasks} stopped")
+    connection.close()
+
+
+def main() -> None:
+    tasks = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    window = int(sys.argv[2]) if len(sys.argv) > 2 else 64
+    path = os.path.join(tempfile.mkdtemp(), "watchmen.sock")
+    ready = threading.Event()
+    threading.Thread(target=serve, args=(path, tasks, ready), daemon=True).start()
+    ready.wait()
+    run(path, tasks, window)
+
+
+if __name__ == "__main__":
+    main()
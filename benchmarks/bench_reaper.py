@@ -0,0 +1,98 @@
+"""
+Memory and exit-detection latency of the child reaper.
+
+    python benchmarks/bench_reaper.py [children]
+
+Spawns `children` sleeping processes and waits for them three ways, each in
+a fresh interpreter: asyncio subprocesses with one watch() task each (the
+previous daemon behaviour), the reaper with pidfds and the reaper with its
+SIGCHLD fallback. Reports the RSS and thread growth while all children are
+alive and, after killing them all at once, the latency from kill to exit
+delivery. Kills are sent from the loop thread, so per-child latency includes
+the time to send the remaining kills.
+"""
+import asyncio
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from watchmend.reaper import reaper  # noqa: E402
+
+MODES = ["asyncio", "pidfd", "sigchld"]
+
+
+def rss_kb() -> int:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1])
+    return 0
+
+
+async def run(mode: str, count: int) -> None:
+    base_rss = rss_kb()
+    base_threads = threading.active_count()
+    detected = {}
+    waiters = []
+    pids = []
+
+    begin = time.perf_counter()
+    if mode == "asyncio":
+        async def watch(child):
+            await child.wait()
+            detected[child.pid] = time.perf_counter()
+
+        for _ in range(count):
+            child = await asyncio.create_subprocess_exec("sleep", "1000")
+            pids.append(child.pid)
+            waiters.append(asyncio.create_task(watch(child)))
+    else:
+        reaper.use_pidfd = mode == "pidfd"
+
+        async def watch(child):
+            await child.wait()
+            detected[child.pid] = time.perf_counter()
+
+        for _ in range(count):
+            child = reaper.watch(subprocess.Popen(["sleep", "1000"]))
+            pids.append(child.pid)
+            waiters.append(asyncio.create_task(watch(child)))
+    spawned = time.perf_counter() - begin
+    await asyncio.sleep(0.5)
+
+    rss = rss_kb() - base_rss
+    threads = threading.active_count() - base_threads
+
+    killed = {}
+    for pid in pids:
+        os.kill(pid, signal.SIGKILL)
+        killed[pid] = time.perf_counter()
+    last_kill = time.perf_counter()
+    await asyncio.gather(*waiters)
+    drain = (max(detected.values()) - last_kill) * 1000
+
+    latency = sorted((detected[pid] - killed[pid]) * 1000 for pid in pids)
+    p50 = latency[len(latency) // 2]
+    p99 = latency[min(len(latency) - 1, len(latency) * 99 // 100)]
+    print(f"{mode:<8} spawn {spawned:6.2f}s  rss +{rss / 1024:7.1f}MiB ({rss / count:5.1f}KiB/child)  "
+          f"threads +{threads:<5}  exit latency p50 {p50:7.1f}ms p99 {p99:7.1f}ms, "
+          f"all delivered {drain:7.1f}ms after the last kill")
+
+
+def main() -> None:
+    if len(sys.argv) > 2 and sys.argv[1] == "--mode":
+        asyncio.run(run(sys.argv[2], int(sys.argv[3])))
+        return
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    print(f"{count} children")
+    for mode in MODES:
+        subprocess.run([sys.executable, os.path.abspath(__file__), "--mode", mode, str(count)], check=True)
+
+
+if __name__ == "__main__":
+    main()
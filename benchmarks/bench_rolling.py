@@ -0,0 +1,149 @@
+"""
+Refused connections while a network service is restarted under load.
+
+    python benchmarks/bench_rolling.py [restarts] [clients]
+
+Runs a small TCP service twice through the daemon's task functions while
+`clients` threads connect, send a line and read the answer in a loop:
+
+- bind:    the service binds the port itself and is restarted with `restart`
+           (stop, then start), the port is closed in between.
+- listen:  the task declares `listen`, the daemon holds the socket and the
+           service takes it from LISTEN_FDS; restarted with `rolling-restart`.
+
+Reports requests served, refused and otherwise failed for each mode. The
+listen mode is expected to report zero refused and zero failed.
+"""
+import asyncio
+import os
+import socket
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common.task import AsyncTask, Task, TaskFlag  # noqa: E402
+from watchmend import lib  # noqa: E402
+
+PORT = 18931
+
+SERVICE = r"""
+import os, signal, socket, sys
+if os.environ.get("LISTEN_PID") == str(os.getpid()):
+    server = socket.socket(fileno=3)
+else:
+    server = socket.socket()
+    server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    server.bind(("127.0.0.1", int(sys.argv[1])))
+    server.listen(128)
+busy = False
+stopping = False
+def term(signum, frame):
+    global stopping
+    stopping = True
+    if not busy:
+        sys.exit(0)
+signal.signal(signal.SIGTERM, term)
+while not stopping:
+    conn, _ = server.accept()
+    busy = True
+    with conn:
+        conn.recv(64)
+        conn.sendall(b"ok\n")
+    busy = False
+"""
+
+
+class Load:
+    def __init__(self, clients: int) -> None:
+        self.clients = clients
+        self.served = 0
+        self.refused = 0
+        self.failed = 0
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._threads = []
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                with socket.create_connection(("127.0.0.1", PORT), timeout=5) as conn:
+                    conn.sendall(b"ping\n")
+                    ok = conn.recv(64) == b"ok\n"
+                with self._lock:
+                    if ok:
+                        self.served += 1
+                    else:
+                        self.failed += 1
+            except ConnectionRefusedError:
+                with self._lock:
+                    self.refused += 1
+            except OSError:
+                with self._lock:
+                    self.failed += 1
+
+    def start(self) -> None:
+        self._threads = [threading.Thread(target=self._run, daemon=True) for _ in range(self.clients)]
+        for t in self._threads:
+            t.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        for t in self._threads:
+            t.join()
+
+
+async def wait_listening() -> None:
+    for _ in range(100):
+        try:
+            socket.create_connection(("127.0.0.1", PORT), timeout=1).close()
+            return
+        except OSError:
+            await asyncio.sleep(0.05)
+
+
+async def run(mode: str, restarts: int, clients: int) -> None:
+    task_id = 1 if mode == "bind" else 2
+    task = Task(
+        id=task_id,
+        name=f"service-{mode}",
+        command=sys.executable,
+        args=["-c", SERVICE, str(PORT)],
+        listen=[f"tcp://127.0.0.1:{PORT}"] if mode == "listen" else None,
+        task_type=AsyncTask(max_restart=0, has_restart=0, started_at=0, stopped_at=0, ready_delay=0.3),
+    )
+    await lib.run(task)
+    await wait_listening()
+
+    load = Load(clients)
+    load.start()
+    begin = time.perf_counter()
+    for _ in range(restarts):
+        await asyncio.sleep(0.2)
+        if mode == "bind":
+            await lib.restart(TaskFlag(id=task_id))
+            await wait_listening()
+        else:
+            await lib.rolling_restart(TaskFlag(id=task_id))
+    await asyncio.sleep(0.2)
+    await asyncio.to_thread(load.stop)
+    elapsed = time.perf_counter() - begin
+
+    await lib.stop(TaskFlag(id=task_id))
+    await asyncio.sleep(0.3)
+    await lib.remove(TaskFlag(id=task_id))
+    print(f"{mode: <8} {restarts} restarts in {elapsed:.1f}s: {load.served} served, "
+          f"{load.refused} refused, {load.failed} failed")
+
+
+async def main() -> None:
+    restarts = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    clients = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    await run("bind", restarts, clients)
+    await asyncio.sleep(0.5)
+    await run("listen", restarts, clients)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
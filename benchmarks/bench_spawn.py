@@ -0,0 +1,53 @@
+"""
+Spawn latency of each spawn backend across daemon heap sizes.
+
+    python benchmarks/bench_spawn.py [spawns] [heap MiB ...]
+
+Grows the heap of this process to each size (touched, so it is resident),
+then starts `spawns` `true` processes through each backend and reports the
+median and p99 time spent in the spawn call. `preexec` is a Popen with a
+no-op preexec_fn, which is what the old `preexec_fn=os.setsid` cost.
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common.spawn import popen, posix_spawn  # noqa: E402
+
+BACKENDS = {
+    "preexec": lambda: popen(["true"], os.environ, preexec=lambda: None),
+    "subprocess": lambda: popen(["true"], os.environ),
+    "posix_spawn": lambda: posix_spawn(["true"], os.environ),
+}
+
+
+def measure(spawn, count: int) -> list:
+    latency = []
+    for _ in range(count):
+        begin = time.perf_counter()
+        process = spawn()
+        latency.append((time.perf_counter() - begin) * 1000)
+        os.waitpid(process.pid, 0)
+        process.returncode = 0
+    return sorted(latency)
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    sizes = [int(i) for i in sys.argv[2:]] or [0, 256, 1024, 2048]
+    heap = []
+    for size in sizes:
+        missing = size - sum(len(i) for i in heap) // (1 << 20)
+        if missing > 0:
+            heap.append(b"\x01" * (missing << 20))
+        row = [f"heap {size:>5}MiB"]
+        for name, spawn in BACKENDS.items():
+            latency = measure(spawn, count)
+            row.append(f"{name} p50 {latency[len(latency) // 2]:6.2f}ms p99 {latency[len(latency) * 99 // 100]:6.2f}ms")
+        print("  ".join(row))
+
+
+if __name__ == "__main__":
+    main()
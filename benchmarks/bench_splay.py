@@ -0,0 +1,64 @@
+"""
+Peak concurrent spawns of periodic tasks with and without splay.
+
+    python benchmarks/bench_splay.py [tasks] [duration] [horizon]
+
+Simulates `tasks` periodic tasks added at the same moment with intervals of
+60, 300 and 3600 seconds, each child running `duration` seconds, over
+`horizon` seconds of the scheduler's next-fire computation. Reports the peak
+number of spawns in one second and the peak number of children alive at
+once, first as is and then with `splay = true` on every task.
+"""
+import heapq
+import os
+import sys
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common.task import PeriodicTask, Task  # noqa: E402
+from watchmend.scheduler import next_fire  # noqa: E402
+
+INTERVALS = [60, 300, 3600]
+
+
+def simulate(count: int, duration: int, horizon: int, splay: bool) -> tuple:
+    begin = 1_700_000_000
+    spawns = []
+    heap = []
+    tasks = []
+    for i in range(1, count + 1):
+        task_type = PeriodicTask(interval=INTERVALS[i % len(INTERVALS)], last_run=begin, splay=splay)
+        task = Task(id=i, name=f"t{i}", command="true", task_type=task_type, status="interval")
+        tasks.append(task)
+        heapq.heappush(heap, (next_fire(task, begin), i - 1))
+
+    while heap and heap[0][0] < begin + horizon:
+        deadline, index = heapq.heappop(heap)
+        task = tasks[index]
+        spawns.append(deadline)
+        task.task_type.last_run = int(deadline)
+        heapq.heappush(heap, (next_fire(task, deadline), index))
+
+    per_second = Counter(int(t) for t in spawns)
+    events = sorted([(t, 1) for t in spawns] + [(t + duration, -1) for t in spawns], key=lambda e: (e[0], e[1]))
+    alive = peak_alive = 0
+    for _, delta in events:
+        alive += delta
+        peak_alive = max(peak_alive, alive)
+    return len(spawns), max(per_second.values(), default=0), peak_alive
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    duration = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    horizon = int(sys.argv[3]) if len(sys.argv) > 3 else 3600
+    print(f"{count} tasks, intervals {INTERVALS}, {duration}s per run, {horizon}s simulated")
+    for splay in (False, True):
+        spawns, peak_second, peak_alive = simulate(count, duration, horizon, splay)
+        name = "splay" if splay else "no splay"
+        print(f"{name:<9} {spawns} spawns, peak {peak_second} spawns/s, peak {peak_alive} children alive")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Time to stop many tasks, some of which ignore SIGTERM, and processes left behind.
+
+    python benchmarks/bench_stop.py [tasks] [hung_every] [stop_timeout]
+
+Every task is a shell that forks a `sleep` and waits on another one, so it
+has a grandchild in its process group. Every `hung_every`-th task ignores
+SIGTERM, its whole group has to be killed after `stop_timeout` seconds.
+
+- sequential: `stop` awaited task after task, as a loop of single requests.
+- concurrent: `stop_many`, as a group stop, under one deadline.
+
+Reports the elapsed time and the process groups still alive afterwards,
+expected to be zero for both.
+"""
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common.task import AsyncTask, Task, TaskFlag  # noqa: E402
+from watchmend import lib  # noqa: E402
+
+
+async def run(mode: str, count: int, hung_every: int, stop_timeout: float) -> None:
+    base = 1 if mode == "sequential" else count + 1
+    pgids = []
+    for i in range(count):
+        script = "sleep 300 & sleep 300"
+        if hung_every > 0 and i % hung_every == 0:
+            script = "trap '' TERM; " + script
+        task = Task(
+            id=base + i,
+            name=f"{mode}-{i}",
+            command="sh",
+            args=["-c", script],
+            stop_timeout=stop_timeout,
+            task_type=AsyncTask(max_restart=0, has_restart=0, started_at=0, stopped_at=0),
+        )
+        await lib.run(task)
+        pgids.append(lib.tasks.get(task.id).task.pid)
+    # let the shells fork their sleeps
+    await asyncio.sleep(0.5)
+
+    tfs = [TaskFlag(id=base + i) for i in range(count)]
+    begin = time.perf_counter()
+    if mode == "sequential":
+        for tf in tfs:
+            await lib.stop(tf)
+    else:
+        await lib.stop_many(tfs)
+    elapsed = time.perf_counter() - begin
+
+    left = sum([await lib._group_alive(pgid) for pgid in pgids])
+    for tf in tfs:
+        await lib.remove(tf)
+    print(f"{mode: <10} {count} tasks in {elapsed:.2f}s, {left} process groups left")
+
+
+async def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    hung_every = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    stop_timeout = float(sys.argv[3]) if len(sys.argv) > 3 else 1
+    await run("sequential", count, hung_every, stop_timeout)
+    await run("concurrent", count, hung_every, stop_timeout)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -5,7 +5,7 @@ from .config import Config
 from .consts import ExitCode
 from .handle import Request, Response, Status
 from .log import get_logger
-from .task import AsyncTask, PeriodicTask, ScheduledTask, Task, TaskFlag
+from .task import AsyncTask, CronTask, LogsFlag, PeriodicTask, ScaleFlag, ScheduledTask, StatsFlag, Task, TaskFlag
 from .utils import get_with_home, get_with_home_path
 
 
@@ -18,7 +18,7 @@ __all__: List[str] = [
     "ExitCode",
     "Request", "Response", "Status",
     "get_logger",
-    "AsyncTask", "PeriodicTask", "ScheduledTask", "Task", "TaskFlag"
+    "AsyncTask", "CronTask", "LogsFlag", "PeriodicTask", "ScaleFlag", "StatsFlag", "ScheduledTask", "Task", "TaskFlag"
     "get_with_home", "get_with_home_path",
     "VERSION",
 ]
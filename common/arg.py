@@ -18,14 +18,20 @@ class TaskArgs:
 
         self._create_flag_command("start", "Start tasks")
         self._create_flag_command("restart", "Restart tasks")
+        self._create_flag_command("rolling-restart", "Replace running instances one at a time without downtime")
         self._create_flag_command("stop", "Stop tasks")
         self._create_flag_command("remove", "Remove tasks")
+        self._create_scale_command("scale", "Set the instance count of an async task")
 
         self._create_flag_command("pause", "Pause tasks")
         self._create_flag_command("resume", "Resume tasks")
 
         self._create_list_command("list", "Get tasks list")
 
+        self._create_metrics_command("metrics", "Get daemon metrics")
+
+        self._create_logs_command("logs", "Show task output")
+
     def _create_parser(self) -> ArgumentParser:
         parser = ArgumentParser(description=DESCRIPTION,
                                 usage="watchmen [OPTIONS] [COMMAND]", epilog=EPILOG)
@@ -83,9 +89,21 @@ class TaskArgs:
                             default=None, help="Task id (unique)", dest=f"task_id")
         parser.add_argument("-n", "--name", type=str, metavar="<NAME>",
                             default=None, help="Task name (unique)", dest=f"task_name")
+        parser.add_argument("-g", "--group", type=str, metavar="<GROUP>",
+                            default=None, help="Task group", dest=f"task_group")
         parser.add_argument("-m", "--mat", action="store_true",
                             default=False, help="Is match regex pattern by namae", dest=f"task_mat")
 
+    def _create_scale_command(self, name: str, help_text: str) -> None:
+        parser: ArgumentParser = self._subparser.add_parser(name=name, help=help_text,
+                                                            usage=f"watchmen {name} [OPTIONS] <INSTANCES>")
+        parser.add_argument("-i", "--id", type=int, metavar="<ID>",
+                            default=None, help="Task id (unique)", dest=f"task_id")
+        parser.add_argument("-n", "--name", type=str, metavar="<NAME>",
+                            default=None, help="Task name (unique)", dest=f"task_name")
+        parser.add_argument("task_instances", type=int, metavar="<INSTANCES>",
+                            help="Instances to run, running ones are kept")
+
     def _create_list_command(self, name: str, help_text: str) -> None:
         parser: ArgumentParser = self._subparser.add_parser(name=name, help=help_text,
                                                             usage=f"watchmen {name} [OPTIONS]")
@@ -107,6 +125,28 @@ class TaskArgs:
                             default=False, help="Show more info", dest=f"task_more")
         parser.add_argument("-l", "--less", action="store_true",
                             default=False, help="Show less info", dest=f"task_less")
+        parser.add_argument("-s", "--stats", action="store_true",
+                            default=False, help="Show CPU, RSS and restart history", dest=f"task_stats")
+        parser.add_argument("--step", type=int, metavar="<SECONDS>",
+                            default=10, help="Seconds per history point (10, 60 or 3600). Default: 10", dest=f"task_step")
+        parser.add_argument("--points", type=int, metavar="<POINTS>",
+                            default=30, help="History points shown. Default: 30", dest=f"task_points")
+
+    def _create_metrics_command(self, name: str, help_text: str) -> None:
+        self._subparser.add_parser(name=name, help=help_text,
+                                   usage=f"watchmen {name}")
+
+    def _create_logs_command(self, name: str, help_text: str) -> None:
+        parser: ArgumentParser = self._subparser.add_parser(name=name, help=help_text,
+                                                            usage=f"watchmen {name} [OPTIONS]")
+        parser.add_argument("-i", "--id", type=int, metavar="<ID>",
+                            default=None, help="Task id (unique)", dest=f"task_id")
+        parser.add_argument("-n", "--name", type=str, metavar="<NAME>",
+                            default=None, help="Task name (unique)", dest=f"task_name")
+        parser.add_argument("-l", "--lines", type=int, metavar="<LINES>",
+                            default=10, help="Output the last LINES lines. Default: 10", dest=f"task_lines")
+        parser.add_argument("-f", "--follow", action="store_true",
+                            default=False, help="Output appended data as the task writes it", dest=f"task_follow")
 
     @classmethod
     def parse(cls) -> Namespace:
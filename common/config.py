@@ -1,6 +1,6 @@
 import os
 from pathlib import Path
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 import toml
 from pydantic import BaseModel
@@ -18,6 +18,28 @@ class Watchmen(BaseModel):
     pid: Optional[str] = None
     mat: Optional[str] = None
     cache: Optional[str] = None
+    cache_compact: Optional[int] = None
+    cache_flush_ms: Optional[int] = None
+    restore_concurrency: Optional[int] = None
+    bulk_concurrency: Optional[int] = None
+    restart_backoff_ms: Optional[int] = None
+    restart_backoff_max_ms: Optional[int] = None
+    restart_jitter: Optional[float] = None
+    restart_rate: Optional[float] = None
+    restart_burst: Optional[int] = None
+    max_executions: Optional[int] = None
+    group_executions: Optional[Dict[str, int]] = None
+    splay_groups: Optional[List[str]] = None
+    group_affinity: Optional[Dict[str, List[int]]] = None
+    log_fd_limit: Optional[int] = None
+    capture_buffer: Optional[int] = None
+    capture_flush_ms: Optional[int] = None
+    log_rotate_size: Optional[int] = None
+    log_rotate_keep: Optional[int] = None
+    log_compress: Optional[bool] = None
+    sample_interval: Optional[float] = None
+    stop_timeout: Optional[float] = None
+    stop_deadline: Optional[float] = None
     interval: Optional[int] = None
 
 
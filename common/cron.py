@@ -0,0 +1,221 @@
+from calendar import monthrange
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+
+MACROS: Dict[str, str] = {
+    "@yearly": "0 0 1 1 *",
+    "@annually": "0 0 1 1 *",
+    "@monthly": "0 0 1 * *",
+    "@weekly": "0 0 * * 0",
+    "@daily": "0 0 * * *",
+    "@midnight": "0 0 * * *",
+    "@hourly": "0 * * * *",
+}
+
+MONTHS: Dict[str, int] = {
+    "jan": 1, "feb": 2, "mar": 3, "apr": 4, "may": 5, "jun": 6,
+    "jul": 7, "aug": 8, "sep": 9, "oct": 10, "nov": 11, "dec": 12,
+}
+
+WEEKDAYS: Dict[str, int] = {
+    "sun": 0, "mon": 1, "tue": 2, "wed": 3, "thu": 4, "fri": 5, "sat": 6,
+}
+
+# (name, lowest, highest, aliases)
+FIELDS: List[Tuple[str, int, int, Dict[str, int]]] = [
+    ("second", 0, 59, {}),
+    ("minute", 0, 59, {}),
+    ("hour", 0, 23, {}),
+    ("day", 1, 31, {}),
+    ("month", 1, 12, MONTHS),
+    ("weekday", 0, 7, WEEKDAYS),
+]
+
+# cron years searched before giving up on an expression that never matches (e.g. Feb 30)
+SEARCH_YEARS = 8
+
+
+def _next_bit(bits: int, start: int) -> int:
+    """
+    Lowest set bit of `bits` at position >= `start`, -1 if there is none.
+    """
+    rest = bits >> start
+    if rest == 0:
+        return -1
+    return start + (rest & -rest).bit_length() - 1
+
+
+def _value(text: str, aliases: Dict[str, int], name: str) -> int:
+    text = text.lower()
+    if text in aliases:
+        return aliases[text]
+    if not text.isdigit():
+        raise ValueError(f"Invalid {name} value [{text}]")
+    return int(text)
+
+
+def _parse_field(text: str, name: str, lo: int, hi: int, aliases: Dict[str, int]) -> int:
+    bits = 0
+    for part in text.split(","):
+        step = 1
+        if "/" in part:
+            part, step_text = part.split("/", 1)
+            if not step_text.isdigit() or int(step_text) == 0:
+                raise ValueError(f"Invalid {name} step [{step_text}]")
+            step = int(step_text)
+        if part == "*":
+            start, end = lo, hi
+        elif "-" in part:
+            a, b = part.split("-", 1)
+            start, end = _value(a, aliases, name), _value(b, aliases, name)
+        else:
+            start = _value(part, aliases, name)
+            end = hi if step > 1 else start
+        if start < lo or end > hi or start > end:
+            raise ValueError(f"Invalid {name} range [{part}], allowed {lo}-{hi}")
+        for i in range(start, end + 1, step):
+            bits |= 1 << i
+    return bits
+
+
+class Cron:
+    """
+    Cron expression compiled into one bitset per field.
+
+    Accepts 5 fields (minute hour day month weekday), 6 fields with leading
+    seconds, and the @hourly / @daily / ... macros. When both day and weekday
+    are restricted a day matches if either does, like Vixie cron.
+    """
+    __slots__ = ("expr", "seconds", "minutes", "hours", "days", "months", "weekdays",
+                 "day_any", "weekday_any", "year", "_weekday_masks")
+
+    def __init__(self, expr: str, seconds: int, minutes: int, hours: int, days: int, months: int,
+                 weekdays: int, day_any: bool, weekday_any: bool, year: Optional[int] = None) -> None:
+        self.expr = expr
+        self.seconds = seconds
+        self.minutes = minutes
+        self.hours = hours
+        self.days = days
+        self.months = months
+        self.weekdays = weekdays
+        self.day_any = day_any
+        self.weekday_any = weekday_any
+        self.year = year
+        # day-of-month mask of matching weekdays, indexed by weekday of the 1st
+        self._weekday_masks = [0] * 7
+        for first in range(7):
+            week = ((weekdays >> first) | (weekdays << (7 - first))) & 0x7f
+            self._weekday_masks[first] = ((week | week << 7 | week << 14 | week << 21 | week << 28) << 1) & 0xfffffffe
+
+    @classmethod
+    def parse(cls, expr: str) -> "Cron":
+        """
+        Compile a cron expression, compiled expressions are cached.
+        :param expr: Cron expression
+        :return: Cron
+        """
+        return _compile(expr.strip())
+
+    @classmethod
+    def from_fields(cls, year: Optional[int] = None, month: Optional[int] = None, day: Optional[int] = None,
+                    hour: Optional[int] = None, minute: Optional[int] = None, second: Optional[int] = None) -> "Cron":
+        """
+        Matcher for fixed fields, None matches any value.
+        """
+        values = [second, minute, hour, day, month]
+        bits = []
+        for value, (name, lo, hi, _) in zip(values, FIELDS):
+            if value is None:
+                bits.append(sum(1 << i for i in range(lo, hi + 1)))
+            elif lo <= value <= hi:
+                bits.append(1 << value)
+            else:
+                raise ValueError(f"Invalid {name} value [{value}], allowed {lo}-{hi}")
+        return cls("", *bits, weekdays=0x7f, day_any=day is None, weekday_any=True, year=year)
+
+    def _day_mask(self, year: int, month: int) -> int:
+        first = (datetime(year, month, 1).weekday() + 1) % 7
+        weekday_mask = self._weekday_masks[first]
+        if self.day_any or self.weekday_any:
+            # a field starting with `*` only makes both fields required, its steps still apply
+            mask = self.days & weekday_mask
+        else:
+            mask = self.days | weekday_mask
+        return mask & ((2 << monthrange(year, month)[1]) - 2)
+
+    def next(self, after: float) -> Optional[float]:
+        """
+        First matching time strictly after `after`, None if there is none.
+        Each step jumps straight to the next set bit of a field and carries
+        into the field above, so the cost is independent of the distance.
+        :param after: Timestamp
+        :return: Optional[float]
+        """
+        dt = datetime.fromtimestamp(int(after) + 1)
+        year, month, day, hour, minute, second = dt.year, dt.month, dt.day, dt.hour, dt.minute, dt.second
+        limit = year + SEARCH_YEARS
+        if self.year is not None:
+            if year > self.year:
+                return None
+            if year < self.year:
+                year, month, day, hour, minute, second = self.year, 1, 1, 0, 0, 0
+            limit = self.year
+
+        while year <= limit:
+            m = _next_bit(self.months, month)
+            if m < 0:
+                year, month, day, hour, minute, second = year + 1, 1, 1, 0, 0, 0
+                continue
+            if m != month:
+                month, day, hour, minute, second = m, 1, 0, 0, 0
+
+            d = _next_bit(self._day_mask(year, month), day)
+            if d < 0:
+                month, day, hour, minute, second = month + 1, 1, 0, 0, 0
+                if month > 12:
+                    year, month = year + 1, 1
+                continue
+            if d != day:
+                day, hour, minute, second = d, 0, 0, 0
+
+            h = _next_bit(self.hours, hour)
+            if h < 0:
+                day, hour, minute, second = day + 1, 0, 0, 0
+                continue
+            if h != hour:
+                hour, minute, second = h, 0, 0
+
+            mi = _next_bit(self.minutes, minute)
+            if mi < 0:
+                hour, minute, second = hour + 1, 0, 0
+                continue
+            if mi != minute:
+                minute, second = mi, 0
+
+            s = _next_bit(self.seconds, second)
+            if s < 0:
+                minute, second = minute + 1, 0
+                continue
+
+            return datetime(year, month, day, hour, minute, s).timestamp()
+        return None
+
+
+@lru_cache(maxsize=16384)
+def _compile(expr: str) -> Cron:
+    text = MACROS.get(expr.lower(), expr)
+    parts = text.split()
+    if len(parts) == 5:
+        parts = ["0"] + parts
+    if len(parts) != 6:
+        raise ValueError(f"Invalid cron expression [{expr}], expected 5 or 6 fields")
+
+    bits = [_parse_field(part, name, lo, hi, aliases) for part, (name, lo, hi, aliases) in zip(parts, FIELDS)]
+    weekdays = bits[5]
+    if weekdays >> 7 & 1:
+        # 7 is another name for sunday
+        weekdays = (weekdays | 1) & 0x7f
+    return Cron(expr, bits[0], bits[1], bits[2], bits[3], bits[4], weekdays,
+                day_any=parts[3].startswith("*"), weekday_any=parts[5].startswith("*"))
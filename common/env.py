@@ -0,0 +1,84 @@
+import os
+from pathlib import Path
+from types import MappingProxyType
+from typing import Dict, Mapping, Optional, Tuple
+
+from common.utils import get_with_home_path
+
+
+_base: Optional[Mapping[str, str]] = None
+
+# path -> ((mtime_ns, size), parsed variables)
+_env_files: Dict[str, Tuple[Tuple[int, int], Dict[str, str]]] = {}
+
+
+def snapshot() -> Mapping[str, str]:
+    """
+    Freeze the daemon environment, every task env is built on top of it.
+    Later changes to `os.environ` do not reach the children.
+    :return: Mapping[str, str]
+    """
+    global _base
+    _base = MappingProxyType(dict(os.environ))
+    return _base
+
+
+def base() -> Mapping[str, str]:
+    if _base is None:
+        return snapshot()
+    return _base
+
+
+def parse_env_file(text: str) -> Dict[str, str]:
+    """
+    Parse `KEY=VALUE` lines. Blank lines and `#` comments are skipped, an
+    `export ` prefix and matching outer quotes are removed.
+    :param text: File content
+    :return: Dict[str, str]
+    """
+    result: Dict[str, str] = {}
+    for line in text.splitlines():
+        line = line.strip()
+        if line == "" or line.startswith("#"):
+            continue
+        if line.startswith("export "):
+            line = line[len("export "):].lstrip()
+        key, sep, value = line.partition("=")
+        if sep == "":
+            continue
+        value = value.strip()
+        if len(value) >= 2 and value[0] == value[-1] and value[0] in "\"'":
+            value = value[1:-1]
+        result[key.strip()] = value
+    return result
+
+
+def resolve_env_file(path: str, cwd: Optional[str] = None) -> Path:
+    result = get_with_home_path(path)
+    if not result.is_absolute() and cwd is not None:
+        result = Path(cwd) / result
+    return result
+
+
+def stat_env_file(path: Path) -> Tuple[int, int]:
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+
+def read_env_file(path: Path, stamp: Optional[Tuple[int, int]] = None) -> Dict[str, str]:
+    """
+    Variables of an env file, parsed again only when its mtime or size changes.
+    :param path: Env file path
+    :param stamp: (mtime_ns, size) if already known
+    :return: Dict[str, str]
+    """
+    key = str(path)
+    if stamp is None:
+        stamp = stat_env_file(path)
+    cached = _env_files.get(key)
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+    with open(path, "r") as f:
+        variables = parse_env_file(f.read())
+    _env_files[key] = (stamp, variables)
+    return variables
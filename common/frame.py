@@ -0,0 +1,113 @@
+import asyncio
+import socket
+import struct
+from typing import Dict, Optional, Tuple
+
+
+# version 1: version byte, 4-byte big-endian payload length; answered in order
+# version 2: version byte, 4-byte request id, 4-byte payload length; answered
+#            as soon as done, in any order, tagged with the id of the request
+VERSION = 2
+HEADER_V1 = struct.Struct("!I")
+HEADER_V2 = struct.Struct("!II")
+
+# first byte of the unframed protocol, one JSON array per connection
+LEGACY = ord("[")
+
+# largest read of a frame payload at once
+CHUNK = 1 << 20
+
+
+def pack(payload: bytes, request_id: Optional[int] = None) -> bytes:
+    """
+    Frame a payload, as version 2 with a request id, else as version 1.
+    :param payload: JSON of a request or response batch
+    :param request_id: Id of the request, echoed by its response
+    :return: bytes
+    """
+    if request_id is None:
+        return bytes((1,)) + HEADER_V1.pack(len(payload)) + payload
+    return bytes((VERSION,)) + HEADER_V2.pack(request_id, len(payload)) + payload
+
+
+def _header(version: int) -> struct.Struct:
+    if version == 1:
+        return HEADER_V1
+    if version == 2:
+        return HEADER_V2
+    raise ValueError(f"Unsupported frame version [{version}], expected 1 or {VERSION}")
+
+
+def _unpack(version: int, header: bytes) -> Tuple[Optional[int], int]:
+    if version == 1:
+        return None, HEADER_V1.unpack(header)[0]
+    return HEADER_V2.unpack(header)
+
+
+async def read_frame(reader: asyncio.StreamReader, first: Optional[bytes] = None) -> Optional[Tuple[Optional[int], bytes]]:
+    """
+    Read one frame from a stream.
+    :param reader: Stream
+    :param first: Version byte, if already read
+    :return: (request id, None for version 1; payload), None on end of stream between frames
+    """
+    if not first:
+        first = await reader.read(1)
+        if not first:
+            return None
+    version = first[0]
+    request_id, length = _unpack(version, await reader.readexactly(_header(version).size))
+    return request_id, await reader.readexactly(length)
+
+
+class FrameSocket:
+    """
+    Blocking framed connection of a client, kept open for many exchanges.
+
+    `submit` sends a request without waiting, `result` waits for the response
+    of one; responses of other requests read meanwhile are kept. Keep the
+    number of requests in flight bounded: the daemon stops reading a
+    connection whose responses are not read.
+    """
+
+    def __init__(self, sock: socket.socket) -> None:
+        self.sock = sock
+        self._last_id = 0
+        self._ready: Dict[int, bytes] = {}
+
+    def _exactly(self, size: int) -> bytes:
+        buf = bytearray()
+        while len(buf) < size:
+            chunk = self.sock.recv(min(size - len(buf), CHUNK))
+            if not chunk:
+                raise ConnectionError("Connection closed by the daemon")
+            buf += chunk
+        return bytes(buf)
+
+    def submit(self, payload: bytes) -> int:
+        """
+        Send a request.
+        :param payload: JSON array of requests
+        :return: Request id
+        """
+        self._last_id = self._last_id % 0xFFFFFFFF + 1
+        self.sock.sendall(pack(payload, self._last_id))
+        return self._last_id
+
+    def result(self, request_id: int) -> bytes:
+        """
+        Wait for the response of a request.
+        :param request_id: Id returned by `submit`
+        :return: JSON array of responses
+        """
+        while request_id not in self._ready:
+            version = self._exactly(1)[0]
+            response_id, length = _unpack(version, self._exactly(_header(version).size))
+            self._ready[response_id] = self._exactly(length)
+        return self._ready.pop(request_id)
+
+    def call(self, payload: bytes) -> bytes:
+        return self.result(self.submit(payload))
+
+    def close(self) -> None:
+        self.sock.close()
@@ -2,12 +2,12 @@ from typing import Any, Dict, List, Optional, Tuple, Union
 
 from pydantic import BaseModel
 
-from common.task import AsyncTask, PeriodicTask, ScheduledTask, Task, TaskFlag
+from common.task import AsyncTask, CronTask, LogsFlag, PeriodicTask, ScaleFlag, ScheduledTask, StatsFlag, Task, TaskFlag
 
 
 class Request(BaseModel):
     command: str
-    data: Union[Task, TaskFlag, Optional[TaskFlag],
+    data: Union[Task, LogsFlag, ScaleFlag, StatsFlag, TaskFlag, Optional[TaskFlag],
                 Tuple[TaskFlag, str]] = None
 
     def into_dict(self) -> Dict[str, Any]:
@@ -18,7 +18,7 @@ class Request(BaseModel):
         """
         data = self.model_dump()
         if data['data'] is None:
-            return {"command": {"List": None}}
+            return {"command": {data["command"]: None}}
         if "task_type" not in data['data']:
             result = {"command": {}}
             result["command"][data["command"]] = data["data"]
@@ -33,6 +33,9 @@ class Request(BaseModel):
             elif "year" in data["data"]["task_type"]:
                 data["data"]["task_type"] = {
                     "Scheduled": data["data"]["task_type"]}
+            elif "expr" in data["data"]["task_type"]:
+                data["data"]["task_type"] = {
+                    "Cron": data["data"]["task_type"]}
             else:
                 raise Exception("Unknown task type")
         result = {"command": {}}
@@ -59,10 +62,19 @@ class Request(BaseModel):
             elif 'Scheduled' in data["task_type"]:
                 data["task_type"] = ScheduledTask(
                     **data["task_type"]["Scheduled"])
+            elif 'Cron' in data["task_type"]:
+                data["task_type"] = CronTask(
+                    **data["task_type"]["Cron"])
             else:
                 raise Exception("Unknown task type")
             return cls(command=command, data=data)
-        elif command in ["List"]:
+        elif command == "Logs":
+            return cls(command=command, data=LogsFlag(**data))
+        elif command == "Scale":
+            return cls(command=command, data=ScaleFlag(**data))
+        elif command == "Stats":
+            return cls(command=command, data=StatsFlag(**data))
+        elif command in ["List", "Metrics"]:
             if data is None:
                 return cls(command=command, data=None)
             else:
@@ -87,6 +99,18 @@ class Status(BaseModel):
     pid: Optional[int] = None
     status: Optional[str] = None
     exit_code: Optional[int] = None
+    next_run: Optional[float] = None
+    wait: Optional[float] = None
+    cpu: Optional[float] = None
+    rss: Optional[int] = None
+    fds: Optional[int] = None
+    uptime: Optional[float] = None
+    nice: Optional[int] = None
+    ionice: Optional[str] = None
+    cpu_affinity: Optional[List[int]] = None
+    rlimits: Optional[Dict[str, int]] = None
+    pids: Optional[List[int]] = None
+    activation: Optional[float] = None
 
 
 class Response(BaseModel):
@@ -123,6 +147,8 @@ class Response(BaseModel):
                     item.task_type = {"Periodic": item.task_type}
                 elif isinstance(item.task_type, ScheduledTask):
                     item.task_type = {"Scheduled": item.task_type}
+                elif isinstance(item.task_type, CronTask):
+                    item.task_type = {"Cron": item.task_type}
                 else:
                     raise Exception("Unknown task type")
             self.data = {"Status": self.data}
@@ -150,6 +176,9 @@ class Response(BaseModel):
                 elif "Scheduled" in item["task_type"]:
                     item["task_type"] = ScheduledTask(
                         **item["task_type"]["Scheduled"])
+                elif "Cron" in item["task_type"]:
+                    item["task_type"] = CronTask(
+                        **item["task_type"]["Cron"])
                 else:
                     raise Exception("Unknown task type")
             result.data = [Status(**i) for i in result.data["Status"]]
@@ -0,0 +1,141 @@
+import ctypes
+import os
+import platform
+from typing import Callable, Dict, List, Optional, Tuple
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+# Task field -> resource limit
+RLIMITS: Dict[str, str] = {
+    "rlimit_nofile": "RLIMIT_NOFILE",
+    "rlimit_as": "RLIMIT_AS",
+    "rlimit_nproc": "RLIMIT_NPROC",
+    "rlimit_core": "RLIMIT_CORE",
+    "rlimit_cpu": "RLIMIT_CPU",
+    "rlimit_fsize": "RLIMIT_FSIZE",
+}
+
+IOPRIO_CLASSES: Dict[str, int] = {
+    "realtime": 1, "rt": 1,
+    "best-effort": 2, "be": 2,
+    "idle": 3,
+}
+
+# ioprio_set has no libc wrapper
+SYS_IOPRIO_SET: Dict[str, int] = {
+    "x86_64": 251, "i386": 289, "i686": 289,
+    "aarch64": 30, "riscv64": 30, "armv7l": 314, "ppc64le": 273, "s390x": 282,
+}
+
+IOPRIO_WHO_PROCESS = 1
+IOPRIO_CLASS_SHIFT = 13
+
+
+def parse_ionice(text: str) -> Tuple[int, int]:
+    """
+    Parse an I/O priority like `idle`, `best-effort:7` or `realtime:0`.
+    :param text: Class with an optional level 0-7, the level defaults to 4
+    :return: (class, level)
+    """
+    name, _, level = text.partition(":")
+    io_class = IOPRIO_CLASSES.get(name.strip().lower())
+    if io_class is None:
+        raise ValueError(f"Invalid ionice class [{name}], allowed idle, best-effort, realtime")
+    if io_class == 3:
+        return io_class, 0
+    if level == "":
+        return io_class, 4
+    if not level.strip().isdigit() or int(level) > 7:
+        raise ValueError(f"Invalid ionice level [{level}], allowed 0-7")
+    return io_class, int(level)
+
+
+def format_cores(cores: Optional[List[int]]) -> str:
+    """
+    Core list in `taskset` notation, e.g. [0, 1, 2, 5] -> "0-2,5".
+    """
+    if not cores:
+        return ""
+    ranges = []
+    cores = sorted(set(cores))
+    start = prev = cores[0]
+    for core in cores[1:] + [-1]:
+        if core == prev + 1:
+            prev = core
+            continue
+        ranges.append(str(start) if start == prev else f"{start}-{prev}")
+        start = prev = core
+    return ",".join(ranges)
+
+
+def _ioprio_set() -> Optional[Callable[[int], int]]:
+    number = SYS_IOPRIO_SET.get(platform.machine())
+    if number is None or platform.system() != "Linux":
+        return None
+    syscall = ctypes.CDLL(None, use_errno=True).syscall
+
+    def ioprio_set(prio: int) -> int:
+        return syscall(number, IOPRIO_WHO_PROCESS, 0, prio)
+    return ioprio_set
+
+
+def preexec(nice: Optional[int] = None, ionice: Optional[str] = None, affinity: Optional[List[int]] = None,
+            rlimits: Optional[Dict[str, int]] = None) -> Optional[Callable[[], None]]:
+    """
+    Code applying the resource controls in the child between fork and exec.
+    Everything is resolved and checked here, in the parent, the child only makes
+    syscalls: an error in the child only surfaces as "Exception occurred in preexec_fn".
+    :param nice: Absolute nice value
+    :param ionice: I/O priority, see `parse_ionice`
+    :param affinity: CPU cores
+    :param rlimits: Task field -> soft and hard limit
+    :return: None if there is nothing to apply
+    """
+    steps: List[Callable[[], None]] = []
+    privileged = os.geteuid() == 0
+    if nice is not None:
+        if nice < os.getpriority(os.PRIO_PROCESS, 0) and not privileged:
+            raise ValueError(f"nice [{nice}] below the daemon's needs root")
+        steps.append(lambda: os.setpriority(os.PRIO_PROCESS, 0, nice))
+    if ionice is not None:
+        io_class, level = parse_ionice(ionice)
+        ioprio_set = _ioprio_set()
+        if ioprio_set is None:
+            raise ValueError(f"ionice is not supported on {platform.system()} {platform.machine()}")
+        if io_class == 1 and not privileged:
+            raise ValueError("ionice realtime needs root")
+        prio = io_class << IOPRIO_CLASS_SHIFT | level
+
+        def set_ionice() -> None:
+            if ioprio_set(prio) != 0:
+                errno = ctypes.get_errno()
+                raise OSError(errno, os.strerror(errno))
+        steps.append(set_ionice)
+    if affinity:
+        cores = frozenset(affinity)
+        available = os.sched_getaffinity(0)
+        if not cores <= available:
+            raise ValueError(f"cpu_affinity [{format_cores(list(cores - available))}] "
+                             f"outside the daemon's cores [{format_cores(list(available))}]")
+        steps.append(lambda: os.sched_setaffinity(0, cores))
+    for field, value in (rlimits or {}).items():
+        if value is None:
+            continue
+        if resource is None:
+            raise ValueError(f"{field} is not supported on {platform.system()}")
+        limit = getattr(resource, RLIMITS[field])
+        hard = resource.getrlimit(limit)[1]
+        if hard != resource.RLIM_INFINITY and value > hard and not privileged:
+            raise ValueError(f"{field} [{value}] above the hard limit [{hard}] needs root")
+        steps.append(lambda limit=limit, value=value: resource.setrlimit(limit, (value, value)))
+    if len(steps) == 0:
+        return None
+
+    def apply() -> None:
+        for step in steps:
+            step()
+    return apply
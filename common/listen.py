@@ -0,0 +1,28 @@
+import socket
+from typing import Tuple
+
+from common.utils import get_with_home
+
+
+def parse_address(address: str) -> Tuple[int, object]:
+    """
+    Parse a `listen` entry, `tcp://host:port`, `tcp://[::1]:port` or `unix:///path`.
+    :param address: Address
+    :return: (socket family, bind address)
+    """
+    scheme, sep, rest = address.partition("://")
+    if sep == "":
+        raise ValueError(f"Invalid listen address [{address}], expected tcp://host:port or unix:///path")
+    scheme = scheme.lower()
+    if scheme == "unix":
+        if rest == "":
+            raise ValueError(f"Invalid listen address [{address}], empty path")
+        return socket.AF_UNIX, get_with_home(rest)
+    if scheme != "tcp":
+        raise ValueError(f"Invalid listen scheme [{scheme}], allowed tcp, unix")
+    host, _, port = rest.rpartition(":")
+    if not port.isdigit() or int(port) > 65535:
+        raise ValueError(f"Invalid listen port in [{address}]")
+    if host.startswith("[") and host.endswith("]"):
+        return socket.AF_INET6, (host[1:-1], int(port))
+    return socket.AF_INET, (host or "0.0.0.0", int(port))
@@ -0,0 +1,192 @@
+import errno
+import fcntl
+import os
+import shutil
+import signal
+import subprocess
+from typing import IO, Callable, List, Mapping, Optional
+
+
+# first descriptor of the sockets passed to a child, as systemd does
+LISTEN_FDS_START = 3
+
+# ignored by the Python runtime, reset for children as `restore_signals` of Popen does
+DEFAULT_SIGNALS = tuple(getattr(signal, name) for name in ("SIGPIPE", "SIGXFZ", "SIGXFSZ") if hasattr(signal, name))
+
+
+class Spawned:
+    """
+    Process started by `posix_spawn` or `listen_exec`, with the attributes of
+    `subprocess.Popen` the reaper relies on.
+    """
+    __slots__ = ("pid", "stdin", "returncode")
+
+    def __init__(self, pid: int, stdin: Optional[IO[bytes]] = None) -> None:
+        self.pid = pid
+        self.stdin = stdin
+        self.returncode: Optional[int] = None
+
+
+def backend(cwd: Optional[str] = None, preexec: Optional[Callable[[], None]] = None,
+            fds: Optional[List[int]] = None) -> str:
+    """
+    Fastest backend able to start a process with these requirements.
+    `posix_spawn` has no chdir action before Python 3.13 and none can run code
+    in the child, `subprocess` without `preexec_fn` still takes the vfork path.
+    Passed sockets need their own descriptors and LISTEN_PID, see `listen_exec`.
+    :param cwd: Working directory
+    :param preexec: Code that must run in the child before exec
+    :param fds: Sockets passed to the child
+    :return: "posix_spawn" | "subprocess" | "preexec" | "listen"
+    """
+    if fds:
+        return "listen"
+    if preexec is not None:
+        return "preexec"
+    if cwd is None and hasattr(os, "posix_spawnp"):
+        return "posix_spawn"
+    return "subprocess"
+
+
+def posix_spawn(argv: List[str], env: Mapping[str, str], stdin: bool = False,
+                stdout: Optional[int] = None, stderr: Optional[int] = None) -> Spawned:
+    """
+    Start a process in a new session with `posix_spawnp`.
+    :param argv: Command and arguments, the command is searched in PATH
+    :param env: Environment
+    :param stdin: Give the child a pipe as stdin
+    :param stdout: File descriptor for stdout, inherited if None
+    :param stderr: File descriptor for stderr, inherited if None
+    :return: Spawned
+    """
+    return _posix_spawn(argv, env, stdin, stdout, stderr, [])
+
+
+def _posix_spawn(argv: List[str], env: Mapping[str, str], stdin: bool, stdout: Optional[int],
+                 stderr: Optional[int], extra: List[tuple]) -> Spawned:
+    actions = []
+    read_end = write_end = None
+    if stdin:
+        # both ends are close-on-exec, dup2 gives the child an inheritable copy
+        read_end, write_end = os.pipe()
+        actions.append((os.POSIX_SPAWN_DUP2, read_end, 0))
+    if stdout is not None:
+        actions.append((os.POSIX_SPAWN_DUP2, stdout, 1))
+    if stderr is not None:
+        actions.append((os.POSIX_SPAWN_DUP2, stderr, 2))
+    actions += extra
+    try:
+        pid = os.posix_spawnp(argv[0], argv, env, file_actions=actions, setsid=True, setsigdef=DEFAULT_SIGNALS)
+    except BaseException:
+        if write_end is not None:
+            os.close(write_end)
+        raise
+    finally:
+        if read_end is not None:
+            os.close(read_end)
+    return Spawned(pid, None if write_end is None else open(write_end, "wb"))
+
+
+def popen(argv: List[str], env: Mapping[str, str], stdin: bool = False,
+          stdout: Optional[int] = None, stderr: Optional[int] = None, cwd: Optional[str] = None,
+          preexec: Optional[Callable[[], None]] = None) -> subprocess.Popen:
+    """
+    Start a process in a new session with `subprocess.Popen`. A `preexec` forces
+    CPython onto its plain fork path, pass one only when the child needs it.
+    :return: subprocess.Popen
+    """
+    return subprocess.Popen(
+        argv,
+        stdin=subprocess.PIPE if stdin else None,
+        stdout=stdout,
+        stderr=stderr,
+        env=env,
+        cwd=cwd,
+        start_new_session=True,
+        preexec_fn=preexec,
+    )
+
+
+# exported by a shell that then execs the task, `$$` is the pid the task keeps
+LISTEN_SHIM = 'cd -- "$0" || exit 127; LISTEN_PID=$$; export LISTEN_PID; exec "$@"'
+
+
+def _resolve(command: str, env: Mapping[str, str], cwd: Optional[str]) -> str:
+    """
+    The executable the shim will exec, checked in the daemon so that a missing
+    command or directory raises here as it does with the other backends.
+    """
+    if cwd is not None and not os.path.isdir(cwd):
+        raise FileNotFoundError(errno.ENOENT, os.strerror(errno.ENOENT), cwd)
+    if os.sep in command:
+        path = command if cwd is None else os.path.join(cwd, command)
+        if os.access(path, os.X_OK) and not os.path.isdir(path):
+            return command
+    else:
+        found = shutil.which(command, path=env.get("PATH", os.defpath))
+        if found is not None:
+            return found
+    raise FileNotFoundError(errno.ENOENT, os.strerror(errno.ENOENT), command)
+
+
+def listen_exec(argv: List[str], env: Mapping[str, str], stdin: bool = False,
+                stdout: Optional[int] = None, stderr: Optional[int] = None, cwd: Optional[str] = None,
+                preexec: Optional[Callable[[], None]] = None, fds: Optional[List[int]] = None):
+    """
+    Start a process in a new session with `fds` passed systemd-style: copied to
+    descriptors 3, 4, ... with LISTEN_FDS and LISTEN_PID in the environment.
+    The copies are `posix_spawn` file actions; with a `preexec` they are made
+    by it after the resource controls, with `dup2` only. A shell
+    exports LISTEN_PID and changes to `cwd` before it execs the command.
+    :return: Spawned | subprocess.Popen
+    """
+    fds = fds or []
+    environ = dict(env)
+    environ["LISTEN_FDS"] = str(len(fds))
+    environ.pop("LISTEN_FDNAMES", None)
+    environ.pop("LISTEN_PID", None)
+    argv = ["/bin/sh", "-c", LISTEN_SHIM, cwd or ".", _resolve(argv[0], environ, cwd), *argv[1:]]
+
+    # out of the way of the targets first, a source may sit at 3, 4, ...
+    low = LISTEN_FDS_START + len(fds)
+    sources = [fcntl.fcntl(fd, fcntl.F_DUPFD_CLOEXEC, low) for fd in fds]
+    try:
+        if preexec is None:
+            actions = [(os.POSIX_SPAWN_DUP2, fd, LISTEN_FDS_START + i) for i, fd in enumerate(sources)]
+            return _posix_spawn(argv, environ, stdin, stdout, stderr, actions)
+
+        def place() -> None:
+            preexec()
+            for i, fd in enumerate(sources):
+                os.dup2(fd, LISTEN_FDS_START + i)
+
+        # close_fds would close the copies again; the sources are close-on-exec,
+        # as is every descriptor the daemon opens itself
+        return subprocess.Popen(
+            argv,
+            stdin=subprocess.PIPE if stdin else None,
+            stdout=stdout,
+            stderr=stderr,
+            env=environ,
+            start_new_session=True,
+            close_fds=False,
+            preexec_fn=place,
+        )
+    finally:
+        for fd in sources:
+            os.close(fd)
+
+
+def spawn(argv: List[str], env: Mapping[str, str], stdin: bool = False,
+          stdout: Optional[int] = None, stderr: Optional[int] = None, cwd: Optional[str] = None,
+          preexec: Optional[Callable[[], None]] = None, fds: Optional[List[int]] = None):
+    """
+    Start a process in a new session through the fastest usable backend.
+    :return: Spawned | subprocess.Popen
+    """
+    mode = backend(cwd, preexec, fds)
+    if mode == "listen":
+        return listen_exec(argv, env, stdin, stdout, stderr, cwd, preexec, fds)
+    if mode == "posix_spawn":
+        return posix_spawn(argv, env, stdin, stdout, stderr)
+    return popen(argv, env, stdin, stdout, stderr, cwd, preexec)
@@ -1,14 +1,16 @@
-import asyncio
-import os
-import subprocess
 from argparse import Namespace
-from asyncio.subprocess import Process
 from io import TextIOWrapper
 from pathlib import Path
 import time
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Mapping, Optional, Tuple
 
-from pydantic import BaseModel
+from pydantic import BaseModel, PrivateAttr, field_validator
+
+from common.cron import Cron
+from common.env import base, read_env_file, resolve_env_file, stat_env_file
+from common.limits import RLIMITS, parse_ionice, preexec
+from common.listen import parse_address
+from common.spawn import spawn
 
 
 class ScheduledTask(BaseModel):
@@ -20,11 +22,28 @@ class ScheduledTask(BaseModel):
     second: Optional[int] = None
 
 
+class CronTask(BaseModel):
+    expr: str
+
+    @field_validator("expr")
+    @classmethod
+    def check_expr(cls, expr: str) -> str:
+        Cron.parse(expr)
+        return expr
+
+
 class AsyncTask(BaseModel):
     max_restart: int
     has_restart: int
     started_at: int
     stopped_at: int
+    instances: int = 1
+    pin: bool = False
+    # seconds a rolling-restart replacement must stay up before the old process is stopped
+    ready_delay: float = 1.0
+    # spawned on the first connection to `listen`, stopped after `idle_timeout` seconds without connections
+    on_demand: bool = False
+    idle_timeout: int = 600
 
 
 class PeriodicTask(BaseModel):
@@ -32,6 +51,7 @@ class PeriodicTask(BaseModel):
     interval: int
     last_run: int = 0
     sync: bool = False
+    splay: bool = False
 
 
 class Task(BaseModel):
@@ -42,15 +62,61 @@ class Task(BaseModel):
     args: List[str] = []
     dir: Optional[str] = None
     env: Dict[str, str] = {}
+    env_file: Optional[str] = None
     stdin: Optional[bool] = None
     stdout: Optional[str] = None
     stderr: Optional[str] = None
+    capture: bool = False
+    nice: Optional[int] = None
+    ionice: Optional[str] = None
+    cpu_affinity: Optional[List[int]] = None
+    rlimit_nofile: Optional[int] = None
+    rlimit_as: Optional[int] = None
+    rlimit_nproc: Optional[int] = None
+    rlimit_core: Optional[int] = None
+    rlimit_cpu: Optional[int] = None
+    rlimit_fsize: Optional[int] = None
+    listen: Optional[List[str]] = None
+    # seconds between SIGTERM and SIGKILL of the process group on stop, the daemon's stop_timeout if not set
+    stop_timeout: Optional[float] = None
     created_at: int = int(time.time())
     task_type: Any
     pid: Optional[int] = None
     status: Optional[str] = "added"
     code: Optional[int] = None
 
+    # merged environment and the env_file stamp it was built from
+    _environ: Optional[Dict[str, str]] = PrivateAttr(default=None)
+    _env_stamp: Optional[Tuple[int, int]] = PrivateAttr(default=None)
+
+    @field_validator("nice")
+    @classmethod
+    def check_nice(cls, nice: Optional[int]) -> Optional[int]:
+        if nice is not None and not -20 <= nice <= 19:
+            raise ValueError(f"Invalid nice [{nice}], allowed -20-19")
+        return nice
+
+    @field_validator("ionice")
+    @classmethod
+    def check_ionice(cls, ionice: Optional[str]) -> Optional[str]:
+        if ionice is not None:
+            parse_ionice(ionice)
+        return ionice
+
+    @field_validator("listen")
+    @classmethod
+    def check_listen(cls, addresses: Optional[List[str]]) -> Optional[List[str]]:
+        for address in addresses or ():
+            parse_address(address)
+        return addresses
+
+    @field_validator("cpu_affinity")
+    @classmethod
+    def check_cpu_affinity(cls, cores: Optional[List[int]]) -> Optional[List[int]]:
+        if cores is not None and (len(cores) == 0 or min(cores) < 0):
+            raise ValueError(f"Invalid cpu_affinity {cores}, expected a non-empty list of core numbers")
+        return cores
+
     @classmethod
     def default(cls) -> "Task":
         return cls(
@@ -60,9 +126,14 @@ class Task(BaseModel):
             args=[],
             dir=None,
             env={},
+            env_file=None,
             stdin=None,
             stdout=None,
             stderr=None,
+            capture=False,
+            nice=None,
+            ionice=None,
+            cpu_affinity=None,
             created_at=int(time.time()),
             task_type=None,
             pid=None,
@@ -84,6 +155,8 @@ class Task(BaseModel):
             data["task_type"] = {"Periodic": data["task_type"]}
         elif "year" in data["task_type"]:
             data["task_type"] = {"Scheduled": data["task_type"]}
+        elif "expr" in data["task_type"]:
+            data["task_type"] = {"Cron": data["task_type"]}
         else:
             raise Exception("Unknown task type")
         return data
@@ -105,6 +178,8 @@ class Task(BaseModel):
         elif "Scheduled" in result.task_type:
             result.task_type = ScheduledTask(
                 **result.task_type["Scheduled"])
+        elif "Cron" in result.task_type:
+            result.task_type = CronTask(**result.task_type["Cron"])
         else:
             raise Exception("Unknown task type")
         return result
@@ -135,43 +210,82 @@ class Task(BaseModel):
 
         return task
 
-    async def start(self) -> Process:
-        stdin_file = None
+    def environ(self) -> Mapping[str, str]:
+        """
+        Environment of the task process: the daemon base snapshot, then `env_file`,
+        then `env`. Built once per task definition, `Reload` replaces the task and
+        with it the cache, a changed `env_file` is picked up by its mtime.
+        :return: Mapping[str, str]
+        """
+        stamp = None
+        path = None
+        if self.env_file is not None:
+            path = resolve_env_file(self.env_file, self.dir)
+            stamp = stat_env_file(path)
+        if self._environ is None or stamp != self._env_stamp:
+            environ = dict(base())
+            if path is not None:
+                environ.update(read_env_file(path, stamp))
+            if self.env is not None:
+                environ.update(self.env)
+            self._environ = environ
+            self._env_stamp = stamp
+        return self._environ
+
+    def rlimits(self) -> Dict[str, int]:
+        return {field: getattr(self, field) for field in RLIMITS if getattr(self, field) is not None}
+
+    async def start(self, stdout: Optional[int] = None, stderr: Optional[int] = None,
+                    affinity: Optional[List[int]] = None, instance: Optional[int] = None,
+                    fds: Optional[List[int]] = None):
+        """
+        Spawn the task process in a new session. No waiter is attached, the caller reaps it.
+        Resource controls are applied in the child before exec, which needs the fork backend.
+        :param stdout: Open descriptor for stdout, `self.stdout` is opened if None
+        :param stderr: Open descriptor for stderr, `self.stderr` is opened if None
+        :param affinity: CPU cores of the process, `cpu_affinity` if None
+        :param instance: Instance index, exported as INSTANCE_ID
+        :param fds: Sockets of `listen`, passed from descriptor 3 on
+        :return: Spawned | subprocess.Popen
+        """
+        limits = preexec(self.nice, self.ionice, self.cpu_affinity if affinity is None else affinity, self.rlimits())
+        environ = self.environ()
+        if instance is not None:
+            environ = {**environ, "INSTANCE_ID": str(instance)}
+
         stdout_file = None
         stderr_file = None
 
-        if self.stdin is not None:
-            stdin_file: int = asyncio.subprocess.PIPE
-
-        if self.stdout is not None:
+        if stdout is None and self.stdout is not None:
             path = Path(self.stdout)
             parent = path.parent
             if not parent.exists():
                 parent.mkdir(parents=True)
             stdout_file: TextIOWrapper = open(file=self.stdout, mode="a+")
 
-        if self.stderr is not None:
+        if stderr is None and self.stderr is not None:
             path = Path(self.stderr)
             parent = path.parent
             if not parent.exists():
                 parent.mkdir(parents=True)
             stderr_file: TextIOWrapper = open(file=self.stderr, mode="a+")
 
-        env: os._Environ[str] = os.environ
-        if self.env is not None:
-            env.update(self.env)
-
-        child = await asyncio.create_subprocess_exec(
-            *[self.command, *self.args],
-            stdin=stdin_file,
-            stdout=stdout_file,
-            stderr=stderr_file,
-            env=os.environ,
-            cwd=self.dir,
-            preexec_fn=subprocess.os.setsid,
-        )
-
-        return child
+        try:
+            return spawn(
+                [self.command, *self.args],
+                env=environ,
+                stdin=self.stdin is not None,
+                stdout=stdout if stdout_file is None else stdout_file.fileno(),
+                stderr=stderr if stderr_file is None else stderr_file.fileno(),
+                cwd=self.dir,
+                preexec=limits,
+                fds=fds,
+            )
+        finally:
+            # the child holds its own copies
+            for f in (stdout_file, stderr_file):
+                if f is not None:
+                    f.close()
 
 
 class TaskFlag(BaseModel):
@@ -206,3 +320,17 @@ class TaskFlag(BaseModel):
         elif args.task_group is not None:
             return cls(id=0, group=args.task_group, mat=args.task_mat)
         raise Exception("Task is none")
+
+
+class LogsFlag(TaskFlag):
+    lines: int = 10
+    follow: bool = False
+
+
+class ScaleFlag(TaskFlag):
+    instances: int
+
+
+class StatsFlag(TaskFlag):
+    step: int = 10
+    points: int = 30
@@ -0,0 +1,11 @@
+import asyncio
+
+import pytest
+
+
+@pytest.fixture(scope="session")
+def loop():
+    # the reaper and the capturer are bound to the one loop of the daemon
+    loop = asyncio.new_event_loop()
+    yield loop
+    loop.close()
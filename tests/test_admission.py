@@ -0,0 +1,65 @@
+import asyncio
+
+from watchmend.admission import Admission
+
+
+def test_group_waiter_does_not_block_other_groups():
+    async def main():
+        admission = Admission()
+        admission.configure(limit=10, group_limits={"backup": 1})
+        assert await admission.acquire(1, "backup") == 0.0
+        backup = asyncio.create_task(admission.acquire(2, "backup"))
+        await asyncio.sleep(0)
+        assert admission.depth() == 1
+
+        web = asyncio.create_task(admission.acquire(3, "web"))
+        await asyncio.wait_for(web, 1)
+        assert web.result() == 0.0
+        assert not backup.done()
+
+        admission.release("backup")
+        assert await asyncio.wait_for(backup, 1) is not None
+        assert admission.depth() == 0
+
+    asyncio.run(main())
+
+
+def test_same_group_keeps_its_order():
+    async def main():
+        admission = Admission()
+        admission.configure(limit=10, group_limits={"backup": 1})
+        await admission.acquire(1, "backup")
+        first = asyncio.create_task(admission.acquire(2, "backup"))
+        await asyncio.sleep(0)
+        admission.release("backup")
+        # the slot freed for the waiter is not taken by a newcomer of its group
+        second = asyncio.create_task(admission.acquire(3, "backup"))
+        await asyncio.sleep(0)
+        assert first.done() and not second.done()
+        admission.release("backup")
+        await asyncio.wait_for(second, 1)
+
+    asyncio.run(main())
+
+
+def test_withdraw_leaves_the_queue():
+    async def main():
+        admission = Admission()
+        admission.configure(limit=1)
+        await admission.acquire(1, None)
+        waiter = asyncio.create_task(admission.acquire(2, None))
+        await asyncio.sleep(0)
+        assert admission.depth() == 1
+        assert admission.queued_since(2) is not None
+
+        assert admission.withdraw(2)
+        assert await asyncio.wait_for(waiter, 1) is None
+        assert admission.depth() == 0
+        assert admission.queued_since(2) is None
+        assert not admission.withdraw(2)
+
+        # the withdrawn waiter took no slot
+        admission.release(None)
+        assert await admission.acquire(3, None) == 0.0
+
+    asyncio.run(main())
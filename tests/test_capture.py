@@ -0,0 +1,93 @@
+import asyncio
+import os
+
+from common.task import AsyncTask, Task, TaskFlag
+from watchmend import lib
+from watchmend.capture import capturer
+
+
+def open_fds(path: str) -> int:
+    path = os.path.realpath(path)
+    count = 0
+    for fd in os.listdir("/proc/self/fd"):
+        try:
+            count += os.readlink(f"/proc/self/fd/{fd}") == path
+        except OSError:
+            pass
+    return count
+
+
+def capture_task(task_id: int, path: str) -> Task:
+    return Task(
+        id=task_id,
+        name=f"capture-{task_id}",
+        command="echo",
+        args=["hello"],
+        stdout=path,
+        capture=True,
+        task_type=AsyncTask(max_restart=0, has_restart=0, started_at=0, stopped_at=0),
+    )
+
+
+async def run_once(task: Task) -> None:
+    await lib.run(task)
+    for _ in range(200):
+        await asyncio.sleep(0.01)
+        if lib.tasks.get(task.id).task.status == "stopped":
+            break
+    await capturer.flush()
+
+
+def test_sink_closed_on_remove(tmp_path, loop):
+    path = str(tmp_path / "out.log")
+
+    async def main():
+        await run_once(capture_task(9001, path))
+        assert open_fds(path) == 1
+        await lib.remove(TaskFlag(id=9001))
+        assert open_fds(path) == 0
+        assert os.path.realpath(path) not in capturer._sinks
+
+    loop.run_until_complete(main())
+    with open(path) as f:
+        assert f.read() == "hello\n"
+
+
+def test_sink_released_on_reload_to_another_path(tmp_path, loop):
+    first = str(tmp_path / "first.log")
+    second = str(tmp_path / "second.log")
+
+    async def main():
+        await run_once(capture_task(9002, first))
+        await lib.re_load(capture_task(9002, second))
+        assert open_fds(first) == 0
+        await lib.start(TaskFlag(id=9002))
+        for _ in range(200):
+            await asyncio.sleep(0.01)
+            if lib.tasks.get(9002).task.status == "stopped":
+                break
+        await capturer.flush()
+        assert open_fds(second) == 1
+        await lib.remove(TaskFlag(id=9002))
+        assert open_fds(second) == 0
+
+    loop.run_until_complete(main())
+
+
+def test_pending_bytes_written_before_close(tmp_path, loop):
+    path = str(tmp_path / "pending.log")
+
+    async def main():
+        capturer.retain(path)
+        sink = capturer.sink(path)
+        sink.pending += b"late\n"
+        capturer.mark(sink)
+        capturer.release(path)
+        # dropped, but kept open until its batch is written
+        assert os.path.realpath(path) not in capturer._sinks
+        await capturer.flush()
+        assert open_fds(path) == 0
+
+    loop.run_until_complete(main())
+    with open(path) as f:
+        assert f.read() == "late\n"
@@ -0,0 +1,81 @@
+import asyncio
+import json
+
+from common.frame import HEADER_V1, HEADER_V2, pack
+from common.task import AsyncTask, Task, TaskFlag
+from watchmend import lib
+from watchmend.engine.connection import serve
+
+SLOW_STOP = "exec 2>/dev/null; trap 'sleep 0.3; exit 0' TERM; while :; do sleep 0.05; done"
+
+
+def request(command: str, data=None) -> bytes:
+    return json.dumps([{"command": {command: data}}]).encode("utf-8")
+
+
+async def read_response(reader: asyncio.StreamReader):
+    version = (await reader.readexactly(1))[0]
+    if version == 1:
+        request_id, length = None, HEADER_V1.unpack(await reader.readexactly(HEADER_V1.size))[0]
+    else:
+        request_id, length = HEADER_V2.unpack(await reader.readexactly(HEADER_V2.size))
+    return request_id, json.loads(await reader.readexactly(length))
+
+
+def test_version_1_frame_waits_for_earlier_requests(tmp_path, loop):
+    path = str(tmp_path / "watchmen.sock")
+
+    async def main():
+        await lib.run(Task(id=9101, name="slow", command="sh", args=["-c", SLOW_STOP],
+                           task_type=AsyncTask(max_restart=0, has_restart=0, started_at=0, stopped_at=0)))
+        await asyncio.sleep(0.2)
+        server = await asyncio.start_unix_server(serve, path)
+        reader, writer = await asyncio.open_unix_connection(path)
+        try:
+            # a slow stop, then an unrelated version 1 request
+            writer.write(pack(request("Stop", {"id": 9101}), 7))
+            writer.write(pack(request("Metrics")))
+            await writer.drain()
+            first = await read_response(reader)
+            second = await read_response(reader)
+        finally:
+            # the daemon closes its side once the client is done, its handler ends
+            writer.write_eof()
+            await reader.read()
+            writer.close()
+            server.close()
+            await lib.remove(TaskFlag(id=9101))
+        assert first[0] == 7
+        assert first[1][0]["code"] == 10000
+        assert second[0] is None
+
+    loop.run_until_complete(main())
+
+
+def test_version_2_frames_on_other_tasks_overtake(tmp_path, loop):
+    path = str(tmp_path / "watchmen.sock")
+
+    async def main():
+        await lib.run(Task(id=9102, name="slow2", command="sh", args=["-c", SLOW_STOP],
+                           task_type=AsyncTask(max_restart=0, has_restart=0, started_at=0, stopped_at=0)))
+        await asyncio.sleep(0.2)
+        server = await asyncio.start_unix_server(serve, path)
+        reader, writer = await asyncio.open_unix_connection(path)
+        try:
+            writer.write(pack(request("Stop", {"id": 9102}), 1))
+            writer.write(pack(request("Metrics"), 2))
+            # same task as the stop, answered after it
+            writer.write(pack(request("List", {"id": 9102}), 3))
+            await writer.drain()
+            responses = [await read_response(reader) for _ in range(3)]
+        finally:
+            # the daemon closes its side once the client is done, its handler ends
+            writer.write_eof()
+            await reader.read()
+            writer.close()
+            server.close()
+            await lib.remove(TaskFlag(id=9102))
+        assert [i for i, _ in responses] == [2, 1, 3]
+        assert responses[2][1][0]["data"]["Status"][0]["status"] == "stopped"
+
+    loop.run_until_complete(main())
@@ -0,0 +1,38 @@
+from datetime import datetime
+
+from common.cron import Cron
+
+
+def fire_days(expr: str, count: int = 8) -> list:
+    cron = Cron.parse(expr)
+    after = datetime(2024, 1, 1).timestamp() - 1
+    days = []
+    for _ in range(count):
+        after = cron.next(after)
+        days.append(datetime.fromtimestamp(after))
+    return days
+
+
+def test_weekday_step():
+    # sunday, tuesday, thursday, saturday
+    days = fire_days("0 0 * * */2")
+    assert {d.isoweekday() % 7 for d in days} == {0, 2, 4, 6}
+    assert all(d.hour == 0 and d.minute == 0 for d in days)
+
+
+def test_day_step_with_weekday():
+    # odd days of the month that are mondays
+    days = fire_days("0 0 */2 * 1")
+    assert all(d.day % 2 == 1 and d.isoweekday() == 1 for d in days)
+
+
+def test_day_and_weekday_lists():
+    # the 13th or any friday
+    days = fire_days("0 0 13 * 5", 20)
+    assert all(d.day == 13 or d.isoweekday() == 5 for d in days)
+    assert any(d.day == 13 and d.isoweekday() != 5 for d in days)
+
+
+def test_stars():
+    days = fire_days("0 0 * * *", 3)
+    assert [d.day for d in days] == [1, 2, 3]
@@ -0,0 +1,29 @@
+from watchmend.history import RESOLUTIONS, History, history
+
+
+def series_bytes(task_id: int) -> int:
+    return sum(s.cpu.itemsize * len(s.cpu) + s.rss.itemsize * len(s.rss) + s.restarts.itemsize * len(s.restarts)
+               for s in history._get(task_id))
+
+
+def test_memory_per_task_is_bounded():
+    task_id = -1
+    start = 1_700_000_000
+    try:
+        # two weeks of samples every 5s, longer than the coarsest resolution keeps
+        for i in range(0, 14 * 86400, 5):
+            history.sample(task_id, start + i, 12.5, 64 << 20)
+            if i % 3600 == 0:
+                history.restart(task_id, start + i)
+
+        series = history._get(task_id)
+        assert [(s.step, len(s.cpu), len(s.rss), len(s.restarts)) for s in series] == \
+            [(step, size, size, size) for step, size in RESOLUTIONS]
+        assert [size for _, size in RESOLUTIONS] == [360, 1440, 168]
+        assert series_bytes(task_id) == History.bytes_per_task()
+
+        points = history.query(task_id, 3600, 1000, start + 14 * 86400)
+        assert len(points["cpu"]) == 168
+        assert series_bytes(task_id) == History.bytes_per_task()
+    finally:
+        history.remove(task_id)
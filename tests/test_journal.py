@@ -0,0 +1,98 @@
+import asyncio
+
+import pytest
+
+import watchmend.journal as journal_module
+from watchmend.journal import Journal, Writer
+
+
+def task(task_id: int) -> dict:
+    return {"id": task_id, "name": f"task-{task_id}"}
+
+
+def test_append_after_torn_tail(tmp_path):
+    journal = Journal(tmp_path / "cache.json")
+    journal.append([{"put": task(1)}])
+    journal.close()
+    with open(journal.journal_path, "ab") as f:
+        f.write(b'{"put":{"id":2,"na')
+
+    journal = Journal(tmp_path / "cache.json")
+    assert [t["id"] for t in journal.load()] == [1]
+    journal.append([{"put": task(3)}])
+    journal.append([{"put": task(4)}])
+    journal.close()
+
+    journal = Journal(tmp_path / "cache.json")
+    assert [t["id"] for t in journal.load()] == [1, 3, 4]
+    assert journal.records == 3
+
+
+def test_unterminated_record_is_dropped(tmp_path):
+    journal = Journal(tmp_path / "cache.json")
+    journal.append([{"put": task(1)}])
+    journal.close()
+    with open(journal.journal_path, "ab") as f:
+        f.write(b'{"del":1}')
+
+    journal = Journal(tmp_path / "cache.json")
+    assert [t["id"] for t in journal.load()] == [1]
+    journal.append([{"del": 1}])
+    journal.close()
+
+    assert Journal(tmp_path / "cache.json").load() == []
+
+
+class FailingJournal(Journal):
+    def __init__(self, path, failures: int = 1) -> None:
+        super().__init__(path)
+        self.failures = failures
+
+    def append(self, records) -> None:
+        if self.failures > 0:
+            self.failures -= 1
+            raise OSError(28, "No space left on device")
+        super().append(records)
+
+
+def test_writer_keeps_running_after_a_failed_append(tmp_path, monkeypatch):
+    monkeypatch.setattr(journal_module, "RETRY_DELAY", 0.01)
+    journal = FailingJournal(tmp_path / "cache.json")
+    state = {1: task(1), 2: task(2)}
+
+    async def main():
+        writer = Writer(journal, lambda task_id: {"put": state[task_id]}, lambda: list(state.values()), flush_ms=1)
+        writer.start()
+        writer.mark(1)
+        writer.mark(2)
+        for _ in range(100):
+            await asyncio.sleep(0.01)
+            if journal.records == 2:
+                break
+        assert journal.failures == 0
+        # the writer is still alive after the failure
+        writer.mark(1)
+        await asyncio.sleep(0.1)
+        assert journal.records == 3
+        writer._task.cancel()
+
+    asyncio.run(main())
+    journal.close()
+    assert sorted(t["id"] for t in Journal(tmp_path / "cache.json").load()) == [1, 2]
+
+
+def test_failed_flush_keeps_changes_pending(tmp_path):
+    journal = FailingJournal(tmp_path / "cache.json")
+
+    async def main():
+        writer = Writer(journal, lambda task_id: {"put": task(task_id)}, lambda: [])
+        writer.start()
+        writer.mark(1)
+        with pytest.raises(OSError):
+            await writer.flush()
+        await writer.flush()
+        writer._task.cancel()
+
+    asyncio.run(main())
+    journal.close()
+    assert [t["id"] for t in Journal(tmp_path / "cache.json").load()] == [1]
@@ -0,0 +1,111 @@
+import asyncio
+import socket
+import sys
+import threading
+
+from common.task import AsyncTask, Task, TaskFlag
+from watchmend import lib
+
+SERVICE = r"""
+import os, signal, socket, sys
+assert os.environ["LISTEN_PID"] == str(os.getpid())
+server = socket.socket(fileno=3)
+busy = False
+stopping = False
+def term(signum, frame):
+    global stopping
+    stopping = True
+    if not busy:
+        sys.exit(0)
+signal.signal(signal.SIGTERM, term)
+while not stopping:
+    conn, _ = server.accept()
+    busy = True
+    with conn:
+        conn.recv(64)
+        conn.sendall(b"ok\n")
+    busy = False
+"""
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class Load:
+    """
+    Clients connecting, sending a line and reading the answer in a loop.
+    """
+
+    def __init__(self, port: int, clients: int) -> None:
+        self.port = port
+        self.served = 0
+        self.refused = 0
+        self.failed = 0
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._threads = [threading.Thread(target=self._run, daemon=True) for _ in range(clients)]
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                with socket.create_connection(("127.0.0.1", self.port), timeout=5) as conn:
+                    conn.sendall(b"ping\n")
+                    ok = conn.recv(64) == b"ok\n"
+                with self._lock:
+                    self.served += ok
+                    self.failed += not ok
+            except ConnectionRefusedError:
+                with self._lock:
+                    self.refused += 1
+            except OSError:
+                with self._lock:
+                    self.failed += 1
+
+    def start(self) -> None:
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        for thread in self._threads:
+            thread.join()
+
+
+def test_rolling_restart_refuses_no_connection(loop):
+    port = free_port()
+    task = Task(
+        id=9201,
+        name="rolling",
+        command=sys.executable,
+        args=["-c", SERVICE],
+        listen=[f"tcp://127.0.0.1:{port}"],
+        task_type=AsyncTask(max_restart=0, has_restart=0, started_at=0, stopped_at=0, ready_delay=0.3),
+    )
+
+    async def main():
+        await lib.run(task)
+        # the daemon holds the socket, connections queue until the service accepts
+        load = Load(port, 4)
+        load.start()
+        pids = [lib.tasks.get(task.id).task.pid]
+        try:
+            for _ in range(3):
+                await asyncio.sleep(0.2)
+                response = await lib.rolling_restart(TaskFlag(id=task.id))
+                assert response.code == 10000, response.msg
+                pids.append(lib.tasks.get(task.id).task.pid)
+            await asyncio.sleep(0.2)
+        finally:
+            await asyncio.to_thread(load.stop)
+            await lib.stop(TaskFlag(id=task.id))
+            await lib.remove(TaskFlag(id=task.id))
+        return load, pids
+
+    load, pids = loop.run_until_complete(main())
+    assert len(set(pids)) == 4
+    assert load.served > 0
+    assert load.refused == 0
+    assert load.failed == 0
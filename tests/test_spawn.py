@@ -0,0 +1,69 @@
+import os
+import signal
+import socket
+import time
+
+import pytest
+
+from common.spawn import listen_exec, popen, posix_spawn
+
+# signals between 32 and SIGRTMIN are reserved by libc, its posix_spawn ignores them in the child
+USER_SIGNALS = sum(1 << (sig - 1) for sig in range(1, signal.NSIG) if sig < 32 or sig >= signal.SIGRTMIN)
+
+
+def status(pid: int, field: str) -> str:
+    # the child may still be the shim or not yet exec'd
+    deadline = time.monotonic() + 5
+    while True:
+        with open(f"/proc/{pid}/status") as f:
+            values = dict(line.rstrip("\n").split(":\t", 1) for line in f if ":\t" in line)
+        if values["Name"] == "sleep" or time.monotonic() > deadline:
+            return values[field]
+        time.sleep(0.01)
+
+
+def reap(child) -> None:
+    os.kill(child.pid, signal.SIGKILL)
+    os.waitpid(child.pid, 0)
+
+
+@pytest.fixture
+def listener():
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    sock.listen()
+    yield sock
+    sock.close()
+
+
+def test_ignored_signals_match_across_backends(listener):
+    env = dict(os.environ)
+    children = {
+        "posix_spawn": posix_spawn(["sleep", "30"], env),
+        "subprocess": popen(["sleep", "30"], env),
+        "preexec": popen(["sleep", "30"], env, preexec=lambda: None),
+        "listen": listen_exec(["sleep", "30"], env, fds=[listener.fileno()]),
+        "listen preexec": listen_exec(["sleep", "30"], env, preexec=lambda: None, fds=[listener.fileno()]),
+    }
+    try:
+        ignored = {name: int(status(child.pid, "SigIgn"), 16) & USER_SIGNALS for name, child in children.items()}
+    finally:
+        for child in children.values():
+            reap(child)
+    assert ignored == {name: 0 for name in children}
+
+
+@pytest.mark.parametrize("preexec", [None, lambda: None], ids=["posix_spawn", "preexec"])
+def test_listen_pid_is_the_child(listener, tmp_path, preexec):
+    out = tmp_path / "env"
+    script = ("import os, socket; sock = socket.socket(fileno=3); "
+              "open(os.environ['OUT'], 'w').write("
+              "f\"{os.environ['LISTEN_PID']} {os.getpid()} {os.environ['LISTEN_FDS']} {sock.getsockname()[1]}\")")
+    env = {**os.environ, "OUT": str(out), "LISTEN_PID": "1"}
+    child = listen_exec(["python3", "-c", script], env, preexec=preexec, fds=[listener.fileno()])
+    _, code = os.waitpid(child.pid, 0)
+    assert code == 0
+    listen_pid, pid, fds, port = out.read_text().split()
+    assert listen_pid == pid
+    assert fds == "1"
+    assert int(port) == listener.getsockname()[1]
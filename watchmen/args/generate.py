@@ -12,6 +12,10 @@ CONFIG = """[watchmen]
 # socket: TCP socket
 # http: HTTP Api (Include Web panel)
 # redis: Redis pub/sub
+# sock and socket carry frames of 1 version byte, a 4-byte big-endian length and a JSON array,
+# many per connection, answered in order; version 2 frames put a 4-byte request id before the
+# length and are answered out of order, tagged with it, requests on the same task keep their order;
+# a connection starting with `[` is served one unframed JSON array
 engines = ["sock"]
 
 # The default engine to use for connecting to the watchmen server
@@ -43,7 +47,102 @@ mat = "^.*\\.(toml|ini|json)$"
 # Tasks cache file, json format
 cache = "$HOME/.watchmen/cache.json"
 
-# Monitor interval for rerun tasks, u64: second
+# Journal records appended to the cache before it is compacted, u64
+# Default is 1000
+cache_compact = 1000
+
+# Window in which cache writes are coalesced into one journal write, u64: millisecond
+# Default is 100
+cache_flush_ms = 100
+
+# Cached running tasks restarted at the same time on startup, u64
+# Default is 32
+restore_concurrency = 32
+
+# Tasks a group or name pattern command (`watchmen restart -g workers`) runs at the same time, u64
+# Stops are not limited, they are bounded by stop_deadline
+# Default is 32
+bulk_concurrency = 32
+
+# First auto restart delay, doubled after every consecutive failure, u64: millisecond
+# Default is 100
+restart_backoff_ms = 100
+
+# Upper bound of the auto restart delay, u64: millisecond
+# A task that stays up this long starts again from `restart_backoff_ms`
+# Default is 30000
+restart_backoff_max_ms = 30000
+
+# Random spread applied to each auto restart delay, f64: 0 - 1
+# Default is 0.2
+restart_jitter = 0.2
+
+# Auto restarts allowed per second across all tasks, f64
+# Default is 20
+restart_rate = 20
+
+# Auto restarts allowed in a burst across all tasks, u64
+# Default is 50
+restart_burst = 50
+
+# Periodic, scheduled and cron executions running at the same time, u64
+# Executions over the limit wait in a FIFO queue, unlimited if not set
+# max_executions = 64
+
+# Executions running at the same time per task group, { group = u64 }
+# group_executions = { backup = 2 }
+
+# Groups whose periodic tasks run at a stable offset inside their interval, derived from the task id
+# Spreads tasks sharing an interval over the period instead of firing them together
+# splay_groups = ["reports"]
+
+# CPU cores of the tasks of a group, { group = [u64] }, a task's own cpu_affinity takes precedence
+# Keeps batch groups off the cores of latency-sensitive services
+# group_affinity = { batch = [2, 3] }
+
+# Task stdout / stderr files kept open at the same time, u64
+# Tasks sharing a file share one descriptor, the least recently used is closed past the limit
+# Default is 256
+log_fd_limit = 256
+
+# Recent output kept in memory per `capture = true` task, u64: byte
+# Default is 65536
+capture_buffer = 65536
+
+# Window in which captured output is batched into one file write, u64: millisecond
+# Default is 200
+capture_flush_ms = 200
+
+# Size at which a captured output file is rotated, u64: byte, 0 disables rotation
+# Default is 10485760
+log_rotate_size = 10485760
+
+# Rotated files kept per captured output file, u64
+# Default is 5
+log_rotate_keep = 5
+
+# Gzip rotated files
+# Default is false
+log_compress = false
+
+# Seconds between /proc samples of task CPU, RSS and open fds, f64, 0 disables sampling
+# Samples are kept for `watchmen list -s` as 10s points for 1 hour, 1m for 1 day and 1h for 1 week,
+# 10 bytes per point, 19680 bytes per task whatever the uptime
+# Default is 5
+sample_interval = 5
+
+# Seconds a stopped task gets between SIGTERM and SIGKILL of its process group, f64
+# A task's own stop_timeout takes precedence
+# Default is 10
+stop_timeout = 10
+
+# Seconds a group stop or the daemon shutdown may take at most, f64
+# The tasks are stopped concurrently, stop_timeout is cut short past it
+# Default is 30
+stop_deadline = 30
+
+# Longest the monitor sleeps between timer checks, u64: second
+# Tasks fire at their own deadline, this only bounds drift after clock changes
 interval = 5
 
 
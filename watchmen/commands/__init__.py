@@ -6,11 +6,15 @@ from watchmen.commands.add import add
 from watchmen.commands.reload import reload_task
 from watchmen.commands.start import start
 from watchmen.commands.restart import restart
+from watchmen.commands.rolling_restart import rolling_restart
 from watchmen.commands.stop import stop
 from watchmen.commands.remove import remove
+from watchmen.commands.scale import scale
 from watchmen.commands.pause import pause
 from watchmen.commands.resume import resume
 from watchmen.commands.list import list_tasks
+from watchmen.commands.metrics import metrics
+from watchmen.commands.logs import logs
 
 
 async def handle_exec(commands: Namespace, config: Config) -> None:
@@ -25,16 +29,24 @@ async def handle_exec(commands: Namespace, config: Config) -> None:
             return await start(commands, config)
         case 'restart':
             return await restart(commands, config)
+        case 'rolling-restart':
+            return await rolling_restart(commands, config)
         case 'stop':
             return await stop(commands, config)
         case 'remove':
             return await remove(commands, config)
+        case 'scale':
+            return await scale(commands, config)
         case 'pause':
             return await pause(commands, config)
         case 'resume':
             return await resume(commands, config)
         case 'list':
             return await list_tasks(commands, config)
+        case 'metrics':
+            return await metrics(commands, config)
+        case 'logs':
+            return await logs(commands, config)
         case _:
             raise NotImplementedError(
                 f"Command {commands.subcommand} not implemented"
@@ -16,8 +16,8 @@ async def task_to_request(args: Namespace, config: Config) -> List[Task]:
 
     if args.task_path is not None:
         mat: str = ""
-        if args.run_regex is not None:
-            mat = args.run_regex
+        if args.task_regex is not None:
+            mat = args.task_regex
         elif config.watchmen.mat is not None:
             mat = config.watchmen.mat
         else:
@@ -70,8 +70,8 @@ async def taskflag_to_request(args: Namespace, config: Config) -> List[TaskFlag]
 
     if args.task_path is not None:
         mat: str = ""
-        if args.run_regex is not None:
-            mat = args.run_regex
+        if args.task_regex is not None:
+            mat = args.task_regex
         elif config.watchmen.mat is not None:
             mat = config.watchmen.mat
         else:
@@ -1,14 +1,16 @@
 import os
 import re
 from argparse import Namespace
+from datetime import datetime
 from pathlib import Path
-from typing import List
+from typing import Any, Dict, List, Optional
 
 import toml
 
 from common import Config
 from common.handle import Request, Response, Status
-from common.task import TaskFlag
+from common.limits import format_cores
+from common.task import StatsFlag, TaskFlag
 from watchmen.engine import send
 from watchmen.utils import output
 from watchmen.utils.file import recursive_search_files
@@ -21,8 +23,8 @@ async def list_tasks(args: Namespace, config: Config) -> None:
 
     if args.task_path is not None:
         mat: str = ""
-        if args.run_regex is not None:
-            mat = args.run_regex
+        if args.task_regex is not None:
+            mat = args.task_regex
         elif config.watchmen.mat is not None:
             mat = config.watchmen.mat
         else:
@@ -94,7 +96,13 @@ async def list_tasks(args: Namespace, config: Config) -> None:
     else:
         reqs.append(Request(command="List", data=None))
 
-    if args.task_less:
+    if args.task_stats:
+        for r in reqs:
+            flag = r.data.model_dump() if r.data is not None else {"id": 0}
+            r.command = "Stats"
+            r.data = StatsFlag(**flag, step=args.task_step, points=args.task_points)
+        print_result_stats(await send(config, reqs))
+    elif args.task_less:
         print_result_less(await send(config, reqs))
     elif args.task_more:
         print_result_more(await send(config, reqs))
@@ -102,6 +110,150 @@ async def list_tasks(args: Namespace, config: Config) -> None:
         print_result(await send(config, reqs))
 
 
+def format_time(timestamp: Optional[float]) -> str:
+    if timestamp is None:
+        return ""
+    return datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def format_wait(seconds: Optional[float]) -> str:
+    if seconds is None:
+        return ""
+    return f"{seconds:.1f}s"
+
+
+def format_activation(seconds: Optional[float]) -> str:
+    if seconds is None:
+        return ""
+    return f"{seconds * 1000:.1f}ms"
+
+
+def format_cpu(cpu: Optional[float]) -> str:
+    if cpu is None:
+        return ""
+    return f"{cpu:.1f}%"
+
+
+def format_bytes(size: Optional[int]) -> str:
+    if size is None:
+        return ""
+    value = float(size)
+    for unit in ["B", "K", "M", "G"]:
+        if value < 1024:
+            return f"{value:.0f}{unit}" if unit == "B" else f"{value:.1f}{unit}"
+        value /= 1024
+    return f"{value:.1f}T"
+
+
+def format_duration(seconds: Optional[float]) -> str:
+    if seconds is None:
+        return ""
+    seconds = int(max(seconds, 0))
+    days, rest = divmod(seconds, 86400)
+    hours, rest = divmod(rest, 3600)
+    minutes, seconds = divmod(rest, 60)
+    if days > 0:
+        return f"{days}d{hours}h"
+    if hours > 0:
+        return f"{hours}h{minutes}m"
+    if minutes > 0:
+        return f"{minutes}m{seconds}s"
+    return f"{seconds}s"
+
+
+def format_pid(s: Status) -> str:
+    if s.pids is not None and len(s.pids) > 1:
+        return f"{s.pids[0]} +{len(s.pids) - 1}"
+    return str(s.pid or "")
+
+
+def format_limits(s: Status) -> str:
+    limits = []
+    if s.nice is not None:
+        limits.append(f"nice={s.nice}")
+    if s.ionice is not None:
+        limits.append(f"io={s.ionice}")
+    if s.cpu_affinity:
+        limits.append(f"cpu={format_cores(s.cpu_affinity)}")
+    for field, value in (s.rlimits or {}).items():
+        limits.append(f"{field[len('rlimit_'):]}={value}")
+    return " ".join(limits)
+
+
+SPARKS = "▁▂▃▄▅▆▇█"
+
+
+def sparkline(values: List[Optional[float]]) -> str:
+    known = [v for v in values if v is not None]
+    if len(known) == 0:
+        return " " * len(values)
+    top = max(known)
+    line = ""
+    for v in values:
+        if v is None:
+            line += " "
+        elif top <= 0:
+            line += SPARKS[0]
+        else:
+            line += SPARKS[min(int(v / top * len(SPARKS)), len(SPARKS) - 1)]
+    return line
+
+
+def print_result_stats(res: List[Response]) -> None:
+    stats: List[Dict[str, Any]] = []
+    for r in res:
+        if r.code != 10000:
+            pr([r])
+            return
+        if r.data is not None and 'Stats' in r.data:
+            stats.extend(r.data['Stats'])
+
+    column_id: List[str] = ["ID"]
+    column_name: List[str] = ["Name"]
+    column_cpu: List[str] = ["CPU%"]
+    column_cpu_max: List[str] = ["Max"]
+    column_rss: List[str] = ["RSS"]
+    column_rss_max: List[str] = ["Max"]
+    column_restarts: List[str] = ["Restarts"]
+
+    step = ""
+    for s in stats:
+        step = f"{s['step']}s"
+        cpu = [v for v in s["cpu"] if v is not None]
+        rss = [v if v > 0 else None for v in s["rss"]]
+        column_id.append(str(s["id"]))
+        column_name.append(s["name"])
+        column_cpu.append(String.green(sparkline(s["cpu"])))
+        column_cpu_max.append(format_cpu(max(cpu) if len(cpu) > 0 else None))
+        column_rss.append(String.cyan(sparkline(rss)))
+        column_rss_max.append(format_bytes(max(s["rss"]) if max(s["rss"], default=0) > 0 else None))
+        column_restarts.append(str(sum(s["restarts"])))
+
+    pattern = re.compile(r'\033\[[0-9;]*m')
+    max_id = max([len(i) for i in column_id])
+    max_name = max([len(i) for i in column_name])
+    max_cpu = max([len(pattern.sub('', i)) for i in column_cpu])
+    max_cpu_max = max([len(i) for i in column_cpu_max])
+    max_rss = max([len(pattern.sub('', i)) for i in column_rss])
+    max_rss_max = max([len(i) for i in column_rss_max])
+    max_restarts = max([len(i) for i in column_restarts])
+
+    max_sum = max_id + max_name + max_cpu + max_cpu_max + max_rss + max_rss_max + max_restarts + 3 * (7 - 1) + 4
+
+    for i in range(len(column_id)):
+        output("{:-<{width}}".format("", width=max_sum))
+        # pad on the visible width, the sparklines carry color codes
+        cpu = column_cpu[i] + " " * (max_cpu - len(pattern.sub('', column_cpu[i])))
+        rss = column_rss[i] + " " * (max_rss - len(pattern.sub('', column_rss[i])))
+        row = "| {: <{max_id}} | {: <{max_name}} | {} | {: <{max_cpu_max}} | {} | {: <{max_rss_max}} | {: <{max_restarts}} |"
+        output(
+            row.format(column_id[i], column_name[i], cpu, column_cpu_max[i], rss, column_rss_max[i], column_restarts[i],
+                       max_id=max_id, max_name=max_name, max_cpu_max=max_cpu_max, max_rss_max=max_rss_max, max_restarts=max_restarts)
+        )
+    output("{:-<{width}}".format("", width=max_sum))
+    output(f'{String.purple(len(stats))} Total, {step} per point')
+
+
 def print_result(res: List[Response]) -> None:
     status: List[Status] = []
     for r in res:
@@ -119,6 +271,7 @@ def print_result(res: List[Response]) -> None:
     total_waiting = 0
     total_interval = 0
     total_paused = 0
+    total_queued = 0
 
     column_id: List[str] = ["ID"]
     column_name: List[str] = ["Name"]
@@ -127,6 +280,7 @@ def print_result(res: List[Response]) -> None:
     column_pid: List[str] = ["Pid"]
     column_code: List[str] = ["ExitCode"]
     column_type: List[str] = ["Type"]
+    column_next: List[str] = ["Next"]
 
     for s in status:
         total += 1
@@ -143,6 +297,8 @@ def print_result(res: List[Response]) -> None:
             column_status.append(String.red("stopped"))
         elif s.status == "auto restart":
             column_status.append(String.rgb("auto restart", 128, 128, 128))
+        elif s.status == "idle":
+            column_status.append(String.rgb("idle", 100, 149, 237))
         elif s.status == "waiting":
             total_waiting += 1
             column_status.append(String.blue("waiting"))
@@ -156,13 +312,19 @@ def print_result(res: List[Response]) -> None:
             column_status.append(String.green("executing"))
         elif s.status == "processing":
             column_status.append(String.green("processing"))
+        elif s.status == "restoring":
+            column_status.append(String.rgb("restoring", 128, 128, 128))
+        elif s.status == "queued":
+            total_queued += 1
+            column_status.append(String.rgb("queued", 255, 165, 0))
         else:
             column_status.append(String(s.status).gray())
         cmd = s.command.split('/')
         column_command.append(cmd[-1] if len(cmd) > 0 else s.command)
-        column_pid.append(s.pid or "")
+        column_pid.append(format_pid(s))
         column_code.append(s.exit_code if s.exit_code is not None else "")
         column_type.append(list(s.task_type.keys())[0])
+        column_next.append(format_time(s.next_run))
 
     pattern = re.compile(r'\033\[[0-9;]*m')
     max_id = max([len(pattern.sub('', str(i))) for i in column_id])
@@ -172,18 +334,19 @@ def print_result(res: List[Response]) -> None:
     max_pid = max([len(pattern.sub('', str(i))) for i in column_pid])
     max_code = max([len(pattern.sub('', str(i))) for i in column_code])
     max_type = max([len(pattern.sub('', i)) for i in column_type])
+    max_next = max([len(pattern.sub('', i)) for i in column_next])
 
     max_status_onlytext = max([len(pattern.sub('', i)) for i in column_status])
 
     max_sum = max_id + max_name + max_status_onlytext + \
-        max_command + max_pid + max_code + max_type + 3 * (7 - 1) + 4
+        max_command + max_pid + max_code + max_type + max_next + 3 * (8 - 1) + 4
 
     for i in range(len(column_id)):
         output("{:-<{width}}".format("", width=max_sum))
-        row = "| {: <{max_id}} | {: <{max_name}} | {: <{max_status}} | {: <{max_command}} | {: <{max_pid}} | {: <{max_code}} | {: <{max_type}} |"
+        row = "| {: <{max_id}} | {: <{max_name}} | {: <{max_status}} | {: <{max_command}} | {: <{max_pid}} | {: <{max_code}} | {: <{max_type}} | {: <{max_next}} |"
         output(
-            row.format(column_id[i], column_name[i], column_status[i], column_command[i], column_pid[i], column_code[i], column_type[i],
-                       max_id=max_id, max_name=max_name, max_status=max_status, max_command=max_command, max_pid=max_pid, max_code=max_code, max_type=max_type)
+            row.format(column_id[i], column_name[i], column_status[i], column_command[i], column_pid[i], column_code[i], column_type[i], column_next[i],
+                       max_id=max_id, max_name=max_name, max_status=max_status, max_command=max_command, max_pid=max_pid, max_code=max_code, max_type=max_type, max_next=max_next)
         )
     output("{:-<{width}}".format("", width=max_sum))
 
@@ -194,7 +357,8 @@ def print_result(res: List[Response]) -> None:
     total_waiting = String.blue(total_waiting)
     total_interval = String.cyan(total_interval)
     total_paused = String.yellow(total_paused)
-    output(f'{total} Total: {total_running} running, {total_stopped} stopped, {total_added} added, {total_waiting} waiting, {total_interval} interval, {total_paused} paused')
+    total_queued = String.rgb(total_queued, 255, 165, 0)
+    output(f'{total} Total: {total_running} running, {total_stopped} stopped, {total_added} added, {total_waiting} waiting, {total_interval} interval, {total_paused} paused, {total_queued} queued')
 
 
 def print_result_more(res: List[Response]) -> None:
@@ -214,6 +378,7 @@ def print_result_more(res: List[Response]) -> None:
     total_waiting = 0
     total_interval = 0
     total_paused = 0
+    total_queued = 0
 
     column_id: List[str] = ["ID"]
     column_group: List[str] = ["Group"]
@@ -224,6 +389,13 @@ def print_result_more(res: List[Response]) -> None:
     column_pid: List[str] = ["Pid"]
     column_code: List[str] = ["ExitCode"]
     column_type: List[str] = ["Type"]
+    column_next: List[str] = ["Next"]
+    column_wait: List[str] = ["Wait"]
+    column_cpu: List[str] = ["CPU%"]
+    column_rss: List[str] = ["RSS"]
+    column_uptime: List[str] = ["Uptime"]
+    column_limits: List[str] = ["Limits"]
+    column_activation: List[str] = ["Activation"]
 
     for s in status:
         total += 1
@@ -241,6 +413,8 @@ def print_result_more(res: List[Response]) -> None:
             column_status.append(String.red("stopped"))
         elif s.status == "auto restart":
             column_status.append(String.rgb("auto restart", 128, 128, 128))
+        elif s.status == "idle":
+            column_status.append(String.rgb("idle", 100, 149, 237))
         elif s.status == "waiting":
             total_waiting += 1
             column_status.append(String.blue("waiting"))
@@ -254,14 +428,26 @@ def print_result_more(res: List[Response]) -> None:
             column_status.append(String.green("executing"))
         elif s.status == "processing":
             column_status.append(String.green("processing"))
+        elif s.status == "restoring":
+            column_status.append(String.rgb("restoring", 128, 128, 128))
+        elif s.status == "queued":
+            total_queued += 1
+            column_status.append(String.rgb("queued", 255, 165, 0))
         else:
             column_status.append(String(s.status).gray())
         cmd = s.command.split('/')
         column_command.append(cmd[-1] if len(cmd) > 0 else s.command)
         column_args.append(" ".join(s.args))
-        column_pid.append(s.pid or "")
+        column_pid.append(format_pid(s))
         column_code.append(s.exit_code if s.exit_code is not None else "")
         column_type.append(list(s.task_type.keys())[0])
+        column_next.append(format_time(s.next_run))
+        column_wait.append(format_wait(s.wait))
+        column_cpu.append(format_cpu(s.cpu))
+        column_rss.append(format_bytes(s.rss))
+        column_uptime.append(format_duration(s.uptime))
+        column_limits.append(format_limits(s))
+        column_activation.append(format_activation(s.activation))
 
     pattern = re.compile(r'\033\[[0-9;]*m')
     max_id = max([len(pattern.sub('', str(i))) for i in column_id])
@@ -273,19 +459,27 @@ def print_result_more(res: List[Response]) -> None:
     max_pid = max([len(pattern.sub('', str(i))) for i in column_pid])
     max_code = max([len(pattern.sub('', str(i))) for i in column_code])
     max_type = max([len(pattern.sub('', i)) for i in column_type])
+    max_next = max([len(pattern.sub('', i)) for i in column_next])
+    max_wait = max([len(pattern.sub('', i)) for i in column_wait])
+    max_cpu = max([len(pattern.sub('', i)) for i in column_cpu])
+    max_rss = max([len(pattern.sub('', i)) for i in column_rss])
+    max_uptime = max([len(pattern.sub('', i)) for i in column_uptime])
+    max_limits = max([len(pattern.sub('', i)) for i in column_limits])
+    max_activation = max([len(pattern.sub('', i)) for i in column_activation])
 
     max_status_onlytext = max([len(pattern.sub('', i)) for i in column_status])
 
     max_sum = max_id + max_group + max_name + max_status_onlytext + \
         max_command + max_args + max_pid + \
-        max_code + max_type + 3 * (9 - 1) + 4
+        max_code + max_type + max_next + max_wait + \
+        max_cpu + max_rss + max_uptime + max_limits + max_activation + 3 * (16 - 1) + 4
 
     for i in range(len(column_id)):
         output("{:-<{width}}".format("", width=max_sum))
-        row = "| {: <{max_id}} | {: <{max_group}} | {: <{max_name}} | {: <{max_status}} | {: <{max_command}} | {: <{max_args}} | {: <{max_pid}} | {: <{max_code}} | {: <{max_type}} |"
+        row = "| {: <{max_id}} | {: <{max_group}} | {: <{max_name}} | {: <{max_status}} | {: <{max_command}} | {: <{max_args}} | {: <{max_pid}} | {: <{max_code}} | {: <{max_type}} | {: <{max_next}} | {: <{max_wait}} | {: <{max_cpu}} | {: <{max_rss}} | {: <{max_uptime}} | {: <{max_limits}} | {: <{max_activation}} |"
         output(
-            row.format(column_id[i], column_group[i], column_name[i], column_status[i], column_command[i], column_args[i], column_pid[i], column_code[i], column_type[i],
-                       max_id=max_id, max_group=max_group, max_name=max_name, max_status=max_status, max_command=max_command, max_args=max_args, max_pid=max_pid, max_code=max_code, max_type=max_type)
+            row.format(column_id[i], column_group[i], column_name[i], column_status[i], column_command[i], column_args[i], column_pid[i], column_code[i], column_type[i], column_next[i], column_wait[i], column_cpu[i], column_rss[i], column_uptime[i], column_limits[i], column_activation[i],
+                       max_id=max_id, max_group=max_group, max_name=max_name, max_status=max_status, max_command=max_command, max_args=max_args, max_pid=max_pid, max_code=max_code, max_type=max_type, max_next=max_next, max_wait=max_wait, max_cpu=max_cpu, max_rss=max_rss, max_uptime=max_uptime, max_limits=max_limits, max_activation=max_activation)
         )
     output("{:-<{width}}".format("", width=max_sum))
 
@@ -296,7 +490,8 @@ def print_result_more(res: List[Response]) -> None:
     total_waiting = String.blue(total_waiting)
     total_interval = String.cyan(total_interval)
     total_paused = String.yellow(total_paused)
-    output(f'{total} Total: {total_running} running, {total_stopped} stopped, {total_added} added, {total_waiting} waiting, {total_interval} interval, {total_paused} paused')
+    total_queued = String.rgb(total_queued, 255, 165, 0)
+    output(f'{total} Total: {total_running} running, {total_stopped} stopped, {total_added} added, {total_waiting} waiting, {total_interval} interval, {total_paused} paused, {total_queued} queued')
 
 
 def print_result_less(res: List[Response]) -> None:
@@ -316,6 +511,7 @@ def print_result_less(res: List[Response]) -> None:
     total_waiting = 0
     total_interval = 0
     total_paused = 0
+    total_queued = 0
 
     column_id: List[str] = ["ID"]
     column_name: List[str] = ["Name"]
@@ -336,6 +532,8 @@ def print_result_less(res: List[Response]) -> None:
             column_status.append(String.red("stopped"))
         elif s.status == "auto restart":
             column_status.append(String.rgb("auto restart", 128, 128, 128))
+        elif s.status == "idle":
+            column_status.append(String.rgb("idle", 100, 149, 237))
         elif s.status == "waiting":
             total_waiting += 1
             column_status.append(String.blue("waiting"))
@@ -349,6 +547,11 @@ def print_result_less(res: List[Response]) -> None:
             column_status.append(String.green("executing"))
         elif s.status == "processing":
             column_status.append(String.green("processing"))
+        elif s.status == "restoring":
+            column_status.append(String.rgb("restoring", 128, 128, 128))
+        elif s.status == "queued":
+            total_queued += 1
+            column_status.append(String.rgb("queued", 255, 165, 0))
         else:
             column_status.append(String(s.status).gray())
 
@@ -377,4 +580,5 @@ def print_result_less(res: List[Response]) -> None:
     total_waiting = String.blue(total_waiting)
     total_interval = String.cyan(total_interval)
     total_paused = String.yellow(total_paused)
-    output(f'{total} Total: {total_running} running, {total_stopped} stopped, {total_added} added, {total_waiting} waiting, {total_interval} interval, {total_paused} paused')
+    total_queued = String.rgb(total_queued, 255, 165, 0)
+    output(f'{total} Total: {total_running} running, {total_stopped} stopped, {total_added} added, {total_waiting} waiting, {total_interval} interval, {total_paused} paused, {total_queued} queued')
@@ -0,0 +1,31 @@
+import sys
+from argparse import Namespace
+
+from common import Config
+from common.handle import Request, Response
+from common.task import LogsFlag
+from watchmen.engine import stream
+from watchmen.utils.print_result import print_result
+
+
+async def logs(args: Namespace, config: Config) -> None:
+    if args.task_id is None and args.task_name is None:
+        raise Exception("Task id or name is required")
+    if args.task_id is not None and args.task_name is not None:
+        raise Exception("Cannot use '--id' and '--name' at the same time")
+
+    flag = LogsFlag(id=args.task_id or 0, name=args.task_name, lines=args.task_lines, follow=args.task_follow)
+    out = sys.stdout.buffer
+    try:
+        async for item in stream(config, Request(command="Logs", data=flag)):
+            if isinstance(item, Response):
+                if item.code != 10000:
+                    print_result([item])
+                    return
+                text = item.data.get("String", "") if isinstance(item.data, dict) else ""
+                out.write(text.encode("utf-8"))
+            else:
+                out.write(item)
+            out.flush()
+    except KeyboardInterrupt:
+        pass
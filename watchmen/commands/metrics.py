@@ -0,0 +1,19 @@
+from argparse import Namespace
+from typing import List
+
+from common import Config
+from common.handle import Request, Response
+from watchmen.engine import send
+from watchmen.utils import output
+from watchmen.utils.print_result import print_result
+
+
+async def metrics(args: Namespace, config: Config) -> None:
+    res: List[Response] = await send(config, [Request(command="Metrics")])
+    for r in res:
+        if r.code != 10000 or not isinstance(r.data, dict):
+            print_result([r])
+            return
+        width = max([len(k) for k in r.data] + [0])
+        for k, v in sorted(r.data.items()):
+            output(f"{k: <{width}}  {v}")
@@ -0,0 +1,17 @@
+from argparse import Namespace
+
+from common import Config
+from common.handle import Request
+from common.task import ScaleFlag
+from watchmen.engine import send
+from watchmen.utils.print_result import print_result
+
+
+async def scale(args: Namespace, config: Config) -> None:
+    if args.task_id is None and args.task_name is None:
+        raise Exception("Task id or name is required")
+    if args.task_id is not None and args.task_name is not None:
+        raise Exception("Cannot use '--id' and '--name' at the same time")
+
+    flag = ScaleFlag(id=args.task_id or 0, name=args.task_name, instances=args.task_instances)
+    print_result(await send(config, [Request(command="Scale", data=flag)]))
@@ -1,9 +1,9 @@
-from typing import List
+from typing import AsyncIterator, List, Union
 
 from common.config import Config
 from common.handle import Request, Response
-from watchmen.engine.sock import send as send_sock
-from watchmen.engine.socket import send as send_socket
+from watchmen.engine.sock import send as send_sock, stream as stream_sock
+from watchmen.engine.socket import send as send_socket, stream as stream_socket
 
 
 async def send(config: Config, requests: List[Request]) -> List[Response]:
@@ -13,3 +13,14 @@ async def send(config: Config, requests: List[Request]) -> List[Response]:
         return await send_socket(config.socket.host, config.socket.port, requests)
     else:
         raise Exception("No engine found")
+
+
+async def stream(config: Config, request: Request) -> AsyncIterator[Union[Response, bytes]]:
+    if config.watchmen.engine == "sock":
+        iterator = stream_sock(config.sock.path, request)
+    elif config.watchmen.engine == "socket":
+        iterator = stream_socket(config.socket.host, config.socket.port, request)
+    else:
+        raise Exception("No engine found")
+    async for item in iterator:
+        yield item
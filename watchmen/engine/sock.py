@@ -1,29 +1,78 @@
 import json
 import socket
 from pathlib import Path
-from typing import List
+from typing import AsyncIterator, Dict, List, Union
 
+from common.frame import FrameSocket
 from common.handle import Request, Response
 from watchmen.utils.serialize import CustomEncoder
 
 
-async def send(path: str, requests: List[Request]) -> List[Response]:
-    sock_path = Path(path)
-    if not sock_path.exists():
-        raise Exception(f'Socket file {path} not exists')
+# framed connections kept open for the next request, by socket path
+_connections: Dict[str, FrameSocket] = {}
 
-    client_socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
-    client_socket.connect(path)
 
-    client_message = json.dumps(requests, cls=CustomEncoder)
-    client_socket.send(client_message.encode('utf-8'))
+def _connect(path: str) -> FrameSocket:
+    connection = _connections.get(path)
+    if connection is None:
+        sock_path = Path(path)
+        if not sock_path.exists():
+            raise Exception(f'Socket file {path} not exists')
+
+        client_socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        client_socket.connect(path)
+        connection = _connections[path] = FrameSocket(client_socket)
+    return connection
 
-    server_response = client_socket.recv(10240).decode('utf-8')
+
+async def send(path: str, requests: List[Request]) -> List[Response]:
+    connection = _connect(path)
+    try:
+        server_response = connection.call(json.dumps(requests, cls=CustomEncoder).encode('utf-8'))
+    except OSError:
+        # not retried, the daemon may have run the requests already
+        _connections.pop(path, None)
+        connection.close()
+        raise
 
     response: List[Response] = []
     for i in json.loads(server_response):
         response.append(Response(i['code'], i['msg'], i['data']))
 
-    client_socket.close()
-
     return response
+
+
+async def stream(path: str, request: Request) -> AsyncIterator[Union[Response, bytes]]:
+    """
+    Send one streaming request. Yields its response, then raw output chunks
+    until the daemon closes the connection.
+    """
+    sock_path = Path(path)
+    if not sock_path.exists():
+        raise Exception(f'Socket file {path} not exists')
+
+    client_socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    client_socket.connect(path)
+    try:
+        client_socket.sendall(json.dumps([request], cls=CustomEncoder).encode('utf-8'))
+
+        buf = b""
+        while b"\n" not in buf:
+            chunk = client_socket.recv(65536)
+            if not chunk:
+                break
+            buf += chunk
+        head, _, rest = buf.partition(b"\n")
+        for i in json.loads(head.decode('utf-8')):
+            yield Response(i['code'], i['msg'], i['data'])
+
+        if rest:
+            yield rest
+        while True:
+            # reading only when the caller asks for more is the backpressure
+            chunk = client_socket.recv(65536)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        client_socket.close()
@@ -1,24 +1,69 @@
 import json
 import socket
-from typing import List
+from typing import AsyncIterator, Dict, List, Tuple, Union
 
+from common.frame import FrameSocket
 from common.handle import Request, Response
 from watchmen.utils.serialize import CustomEncoder
 
 
-async def send(host: str, port: int, requests: List[Request]) -> List[Response]:
-    client_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    client_socket.connect((host, port))
+# framed connections kept open for the next request, by address
+_connections: Dict[Tuple[str, int], FrameSocket] = {}
+
 
-    client_message = json.dumps(requests, cls=CustomEncoder)
-    client_socket.send(client_message.encode('utf-8'))
+def _connect(host: str, port: int) -> FrameSocket:
+    connection = _connections.get((host, port))
+    if connection is None:
+        client_socket = socket.create_connection((host, port))
+        client_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        connection = _connections[(host, port)] = FrameSocket(client_socket)
+    return connection
 
-    server_response = client_socket.recv(10240).decode('utf-8')
+
+async def send(host: str, port: int, requests: List[Request]) -> List[Response]:
+    connection = _connect(host, port)
+    try:
+        server_response = connection.call(json.dumps(requests, cls=CustomEncoder).encode('utf-8'))
+    except OSError:
+        # not retried, the daemon may have run the requests already
+        _connections.pop((host, port), None)
+        connection.close()
+        raise
 
     response: List[Response] = []
     for i in json.loads(server_response):
         response.append(Response(i['code'], i['msg'], i['data']))
 
-    client_socket.close()
-
     return response
+
+
+async def stream(host: str, port: int, request: Request) -> AsyncIterator[Union[Response, bytes]]:
+    """
+    Send one streaming request. Yields its response, then raw output chunks
+    until the daemon closes the connection.
+    """
+    client_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    client_socket.connect((host, port))
+    try:
+        client_socket.sendall(json.dumps([request], cls=CustomEncoder).encode('utf-8'))
+
+        buf = b""
+        while b"\n" not in buf:
+            chunk = client_socket.recv(65536)
+            if not chunk:
+                break
+            buf += chunk
+        head, _, rest = buf.partition(b"\n")
+        for i in json.loads(head.decode('utf-8')):
+            yield Response(i['code'], i['msg'], i['data'])
+
+        if rest:
+            yield rest
+        while True:
+            # reading only when the caller asks for more is the backpressure
+            chunk = client_socket.recv(65536)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        client_socket.close()
@@ -7,6 +7,10 @@ from watchmen.utils.types import String
 
 def print_result(res: List[Response]) -> None:
     for r in res:
+        if isinstance(r.data, dict) and 'Results' in r.data:
+            # one response per task of a group or pattern command
+            print_result([Response(**i) for i in r.data['Results']])
+            continue
         data = r.data
         if 'String' in r.data:
             data = r.data['String']
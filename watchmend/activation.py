@@ -0,0 +1,136 @@
+import asyncio
+import select
+import socket
+import time
+from typing import Callable, List, Optional, Set, Tuple
+
+from common.listen import parse_address
+
+
+# /proc/net/tcp states
+TCP_ESTABLISHED = "01"
+# /proc/net/unix states
+SS_CONNECTED = "03"
+
+# longest an activation waits for the task to take the first connection
+ACCEPT_TIMEOUT = 30
+ACCEPT_POLL = 0.005
+
+
+def _targets(addresses: List[str]) -> Tuple[Set[int], Set[str]]:
+    ports = set()
+    paths = set()
+    for address in addresses:
+        family, addr = parse_address(address)
+        if family == socket.AF_UNIX:
+            paths.add(addr)
+        else:
+            ports.add(addr[1])
+    return ports, paths
+
+
+def connected(addresses: List[str]) -> bool:
+    """
+    Whether any connection to `addresses` is established, from /proc/net.
+    :param addresses: Listen addresses
+    :return: bool
+    """
+    ports, paths = _targets(addresses)
+    if ports:
+        for table in ("/proc/net/tcp", "/proc/net/tcp6"):
+            try:
+                with open(table) as f:
+                    next(f, None)
+                    for line in f:
+                        fields = line.split()
+                        if fields[3] == TCP_ESTABLISHED and int(fields[1].rsplit(":", 1)[1], 16) in ports:
+                            return True
+            except OSError:
+                pass
+    if paths:
+        try:
+            with open("/proc/net/unix") as f:
+                next(f, None)
+                for line in f:
+                    fields = line.split()
+                    if len(fields) > 7 and fields[5] == SS_CONNECTED and fields[7] in paths:
+                        return True
+        except OSError:
+            pass
+    return False
+
+
+def pending(fds: List[int]) -> bool:
+    """
+    Whether a connection waits in the backlog of any of `fds`.
+    """
+    readable, _, _ = select.select(fds, [], [], 0)
+    return len(readable) > 0
+
+
+class Activator:
+    """
+    Socket activation of an on-demand task.
+
+    While armed the daemon watches the task's listening sockets without
+    accepting. The first queued connection disarms it and calls `on_connect`,
+    which spawns the task; the connection waits in the backlog until the
+    task accepts it. `latency` is the time from that connection being seen
+    to the backlog being drained by the task.
+    """
+
+    def __init__(self, addresses: List[str], fds: List[int], on_connect: Callable[[], None]) -> None:
+        self.addresses = addresses
+        self.fds = fds
+        self.on_connect = on_connect
+        self.armed = False
+        self.woke: Optional[float] = None
+        self.latency: Optional[float] = None
+        self.activations = 0
+        self.idler: Optional[asyncio.Task] = None
+
+    def arm(self) -> None:
+        if self.armed:
+            return
+        loop = asyncio.get_running_loop()
+        for fd in self.fds:
+            loop.add_reader(fd, self._ready)
+        self.armed = True
+
+    def disarm(self) -> None:
+        if not self.armed:
+            return
+        loop = asyncio.get_running_loop()
+        for fd in self.fds:
+            loop.remove_reader(fd)
+        self.armed = False
+
+    def close(self) -> None:
+        self.disarm()
+        if self.idler is not None and self.idler is not asyncio.current_task():
+            self.idler.cancel()
+        self.idler = None
+
+    def _ready(self) -> None:
+        self.disarm()
+        self.woke = time.monotonic()
+        self.activations += 1
+        self.on_connect()
+
+    async def accepted(self, alive: Callable[[], bool]) -> Optional[float]:
+        """
+        Wait until the task took the queued connections.
+        :param alive: False once the task is gone
+        :return: Seconds since the activating connection, None on timeout or exit
+        """
+        if self.woke is None:
+            return None
+        while time.monotonic() - self.woke < ACCEPT_TIMEOUT and alive():
+            if not pending(self.fds):
+                self.latency = time.monotonic() - self.woke
+                return self.latency
+            await asyncio.sleep(ACCEPT_POLL)
+        return None
+
+    def active(self) -> bool:
+        return pending(self.fds) or connected(self.addresses)
@@ -0,0 +1,146 @@
+import asyncio
+import time
+from collections import deque
+from typing import Deque, Dict, Optional, Tuple
+
+
+class Admission:
+    """
+    Concurrency limits for periodic, scheduled and cron executions.
+
+    An execution needs a free slot both globally and in its group. Executions
+    that do not get one wait in a FIFO queue. A waiter blocked only by its
+    own group does not hold back waiters of other groups behind it.
+    """
+    _instance = None
+
+    def __init__(self) -> None:
+        self.configure()
+
+    def configure(self, limit: Optional[int] = None, group_limits: Optional[Dict[str, int]] = None) -> None:
+        self.limit = limit
+        self.group_limits: Dict[str, int] = group_limits or {}
+        self._running = 0
+        self._groups: Dict[str, int] = {}
+        # (task id, group, future, enqueued at)
+        self._queue: Deque[Tuple[int, str, asyncio.Future, float]] = deque()
+        self._queued: Dict[int, float] = {}
+        # group -> waiters in the queue
+        self._waiting: Dict[str, int] = {}
+
+    def _free(self, group: str) -> bool:
+        if self.limit is not None and self._running >= self.limit:
+            return False
+        group_limit = self.group_limits.get(group)
+        return group_limit is None or self._groups.get(group, 0) < group_limit
+
+    def _take(self, group: str) -> None:
+        self._running += 1
+        self._groups[group] = self._groups.get(group, 0) + 1
+
+    def _enqueue(self, item: Tuple[int, str, asyncio.Future, float]) -> None:
+        self._queue.append(item)
+        self._waiting[item[1]] = self._waiting.get(item[1], 0) + 1
+
+    def _dequeue(self, group: str) -> None:
+        count = self._waiting.get(group, 0) - 1
+        if count > 0:
+            self._waiting[group] = count
+        else:
+            self._waiting.pop(group, None)
+
+    async def acquire(self, task_id: int, group: Optional[str]) -> Optional[float]:
+        """
+        Wait for an execution slot. Waiters of other groups do not hold an
+        execution back, a slot is taken at once while its group has no waiter.
+        :param task_id: Task id
+        :param group: Task group
+        :return: float seconds waited, None if withdrawn without a slot
+        """
+        group = group or ""
+        if self._waiting.get(group, 0) == 0 and self._free(group):
+            self._take(group)
+            return 0.0
+
+        begin = time.time()
+        future = asyncio.get_running_loop().create_future()
+        self._enqueue((task_id, group, future, begin))
+        self._queued[task_id] = begin
+        try:
+            granted = await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                if future.result():
+                    # granted and cancelled at the same time, hand the slot on
+                    self.release(group)
+            else:
+                self._remove(future)
+            raise
+        finally:
+            self._queued.pop(task_id, None)
+        if not granted:
+            return None
+        return time.time() - begin
+
+    def _remove(self, future: asyncio.Future) -> None:
+        for item in self._queue:
+            if item[2] is future:
+                self._queue.remove(item)
+                self._dequeue(item[1])
+                return
+
+    def withdraw(self, task_id: int) -> bool:
+        """
+        Take a task out of the queue, its `acquire` returns None.
+        :param task_id: Task id
+        :return: False if the task was not queued
+        """
+        for item in self._queue:
+            if item[0] == task_id and not item[2].done():
+                self._remove(item[2])
+                item[2].set_result(False)
+                return True
+        return False
+
+    def release(self, group: Optional[str]) -> None:
+        """
+        Give back a slot taken by `acquire` and admit queued executions.
+        :param group: Task group
+        :return: None
+        """
+        group = group or ""
+        self._running -= 1
+        count = self._groups.get(group, 0) - 1
+        if count > 0:
+            self._groups[group] = count
+        else:
+            self._groups.pop(group, None)
+
+        blocked = deque()
+        while self._queue and (self.limit is None or self._running < self.limit):
+            item = self._queue.popleft()
+            if item[2].done():
+                self._dequeue(item[1])
+                continue
+            if self._free(item[1]):
+                self._take(item[1])
+                self._dequeue(item[1])
+                item[2].set_result(True)
+            else:
+                blocked.append(item)
+        blocked.extend(self._queue)
+        self._queue = blocked
+
+    def queued_since(self, task_id: int) -> Optional[float]:
+        return self._queued.get(task_id)
+
+    def depth(self) -> int:
+        return len(self._queue)
+
+    def __new__(cls) -> "Admission":
+        if cls._instance is None:
+            cls._instance = super(Admission, cls).__new__(cls)
+        return cls._instance
+
+
+admission = Admission()
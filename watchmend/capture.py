@@ -0,0 +1,283 @@
+import asyncio
+import gzip
+import os
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from common.utils import get_with_home
+from watchmend.metrics import metrics
+
+
+class Ring:
+    """
+    Fixed-size byte ring holding the most recent output of a task.
+    """
+    __slots__ = ("buf", "pos", "full", "total")
+
+    def __init__(self, size: int) -> None:
+        self.buf = bytearray(size)
+        self.pos = 0
+        self.full = False
+        # bytes ever written, lets a reader tell what it has not seen yet
+        self.total = 0
+
+    def write(self, data: memoryview) -> None:
+        size = len(self.buf)
+        n = len(data)
+        self.total += n
+        if n >= size:
+            self.buf[:] = data[n - size:]
+            self.pos = 0
+            self.full = True
+            return
+        first = min(n, size - self.pos)
+        self.buf[self.pos:self.pos + first] = data[:first]
+        if first < n:
+            self.buf[:n - first] = data[first:]
+            self.full = True
+        self.pos = (self.pos + n) % size
+        if self.pos == 0 and n > 0:
+            self.full = True
+
+    def tail(self, n: Optional[int] = None) -> bytes:
+        """
+        Last `n` buffered bytes, everything buffered if None.
+        :param n: Byte count
+        :return: bytes
+        """
+        used = len(self.buf) if self.full else self.pos
+        if n is None or n > used:
+            n = used
+        start = self.pos - n
+        view = memoryview(self.buf)
+        if start >= 0:
+            return bytes(view[start:self.pos])
+        return bytes(view[len(self.buf) + start:]) + bytes(view[:self.pos])
+
+
+class Sink:
+    """
+    Output file written in batches from the capture thread pool and rotated by size.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.pending = bytearray()
+        self.size = 0
+        self._fd: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def write(self, data: bytes, rotate_size: Optional[int], keep: int, compress: bool) -> None:
+        """
+        Append a batch, blocking, runs in the thread pool.
+        """
+        with self._lock:
+            if self._fd is None:
+                parent = os.path.dirname(self.path)
+                if not os.path.exists(parent):
+                    os.makedirs(parent)
+                self._fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT | os.O_CLOEXEC, 0o644)
+                self.size = os.fstat(self._fd).st_size
+            view = memoryview(data)
+            while len(view) > 0:
+                written = os.write(self._fd, view)
+                view = view[written:]
+            self.size += len(data)
+            if rotate_size is not None and self.size >= rotate_size:
+                self._rotate(keep, compress)
+
+    def _rotate(self, keep: int, compress: bool) -> None:
+        os.close(self._fd)
+        self._fd = None
+        self.size = 0
+        if keep <= 0:
+            os.unlink(self.path)
+            return
+        for i in range(keep - 1, 0, -1):
+            for ext in ("", ".gz"):
+                src = f"{self.path}.{i}{ext}"
+                if os.path.exists(src):
+                    os.replace(src, f"{self.path}.{i + 1}{ext}")
+        for ext in ("", ".gz"):
+            stale = f"{self.path}.{keep + 1}{ext}"
+            if os.path.exists(stale):
+                os.unlink(stale)
+        os.replace(self.path, f"{self.path}.1")
+        if compress:
+            with open(f"{self.path}.1", "rb") as src, gzip.open(f"{self.path}.1.gz", "wb") as dst:
+                shutil.copyfileobj(src, dst)
+            os.unlink(f"{self.path}.1")
+        metrics.incr("capture_rotations")
+
+    def close(self) -> None:
+        with self._lock:
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+
+
+class Capture:
+    """
+    Output of one task: a ring of recent bytes shared by stdout and stderr,
+    and the sinks the streams are written to.
+    """
+
+    def __init__(self, size: int) -> None:
+        self.ring = Ring(size)
+        self._chunk = bytearray(65536)
+        self._readers: Dict[int, Optional[Sink]] = {}
+
+    def attach(self, fd: int, sink: Optional[Sink]) -> None:
+        """
+        Drain the read end of an output pipe until EOF.
+        :param fd: Pipe read end, owned by the capture from now on
+        :param sink: File the stream is written to, None for the ring only
+        :return: None
+        """
+        os.set_blocking(fd, False)
+        self._readers[fd] = sink
+        asyncio.get_running_loop().add_reader(fd, self._on_read, fd)
+
+    def _on_read(self, fd: int) -> None:
+        sink = self._readers[fd]
+        try:
+            n = os.readv(fd, [self._chunk])
+        except BlockingIOError:
+            return
+        except OSError:
+            n = 0
+        if n == 0:
+            asyncio.get_running_loop().remove_reader(fd)
+            os.close(fd)
+            del self._readers[fd]
+            return
+        data = memoryview(self._chunk)[:n]
+        self.ring.write(data)
+        metrics.incr("capture_bytes", n)
+        if sink is not None:
+            sink.pending += data
+            capturer.mark(sink)
+
+
+class Capturer:
+    """
+    Owner of the capture sinks and of the background writer that flushes them.
+    `mark` only records a sink as dirty, the writer collects the pending bytes
+    every `flush_ms` (or at once past `batch` bytes) and writes them in a thread pool.
+    """
+    _instance = None
+
+    def __init__(self) -> None:
+        self.configure()
+        self._sinks: Dict[str, Sink] = {}
+        self._refs: Dict[str, int] = {}
+        # by id, a dropped sink may share its path with the sink that replaced it
+        self._dirty: Dict[int, Sink] = {}
+        # sinks of the batches being written
+        self._writing: Dict[int, Sink] = {}
+        self._event: Optional[asyncio.Event] = None
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._task: Optional[asyncio.Task] = None
+        self._flushing: Optional[asyncio.Lock] = None
+
+    def configure(self, buffer: int = 65536, flush_ms: int = 200, rotate_size: Optional[int] = 10 * 1024 * 1024,
+                  keep: int = 5, compress: bool = False, batch: int = 1024 * 1024) -> None:
+        self.buffer = buffer
+        self.flush_ms = flush_ms
+        self.rotate_size = rotate_size
+        self.keep = keep
+        self.compress = compress
+        self.batch = batch
+
+    def sink(self, path: str) -> Sink:
+        path = os.path.realpath(get_with_home(path))
+        sink = self._sinks.get(path)
+        if sink is None:
+            sink = self._sinks[path] = Sink(path)
+        return sink
+
+    def retain(self, path: str) -> None:
+        path = os.path.realpath(get_with_home(path))
+        self._refs[path] = self._refs.get(path, 0) + 1
+
+    def release(self, path: str) -> None:
+        """
+        Drop a task's reference to a sink. The last one closes it, once its
+        pending bytes are written.
+        :param path: File path
+        :return: None
+        """
+        path = os.path.realpath(get_with_home(path))
+        refs = self._refs.get(path, 0) - 1
+        if refs > 0:
+            self._refs[path] = refs
+            return
+        self._refs.pop(path, None)
+        sink = self._sinks.pop(path, None)
+        if sink is not None and not self._busy(sink):
+            sink.close()
+
+    def _busy(self, sink: Sink) -> bool:
+        return len(sink.pending) > 0 or id(sink) in self._dirty or id(sink) in self._writing
+
+    def size(self) -> int:
+        return len(self._sinks)
+
+    def mark(self, sink: Sink) -> None:
+        if self._event is None:
+            self._event = asyncio.Event()
+            self._flushing = asyncio.Lock()
+            self._pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="capture")
+            self._task = asyncio.create_task(self._run())
+        self._dirty[id(sink)] = sink
+        if len(sink.pending) >= self.batch:
+            asyncio.create_task(self.flush())
+        else:
+            self._event.set()
+
+    async def _run(self) -> None:
+        while True:
+            await self._event.wait()
+            await asyncio.sleep(self.flush_ms / 1000)
+            await self.flush()
+
+    async def flush(self) -> None:
+        """
+        Write every pending batch now.
+        :return: None
+        """
+        if self._event is None:
+            return
+        # batches of one sink must reach the file in order
+        async with self._flushing:
+            self._event.clear()
+            dirty, self._dirty = self._dirty, {}
+            loop = asyncio.get_running_loop()
+            writes: List[asyncio.Future] = []
+            for sink in dirty.values():
+                if len(sink.pending) == 0:
+                    continue
+                data, sink.pending = bytes(sink.pending), bytearray()
+                writes.append(loop.run_in_executor(
+                    self._pool, sink.write, data, self.rotate_size, self.keep, self.compress))
+            self._writing = dirty
+            try:
+                for result in await asyncio.gather(*writes, return_exceptions=True):
+                    if isinstance(result, Exception):
+                        metrics.incr("capture_write_errors")
+            finally:
+                self._writing = {}
+            for sink in dirty.values():
+                # released while its batch was pending
+                if self._sinks.get(sink.path) is not sink and not self._busy(sink):
+                    sink.close()
+
+    def __new__(cls) -> "Capturer":
+        if cls._instance is None:
+            cls._instance = super(Capturer, cls).__new__(cls)
+        return cls._instance
+
+
+capturer = Capturer()
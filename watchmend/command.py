@@ -1,9 +1,28 @@
+import asyncio
+from typing import Any, List, Optional, Set, Tuple
+
 from common import Request, Response
-from watchmend.lib import run, add, re_load, start, stop, restart, remove, pause, resume, lst
+from watchmend.lib import run, add, re_load, start, stop, restart, rolling_restart, scale, remove, pause, resume, lst, stats, get_metrics
+from watchmend.lib import bulk, is_selector, run_many, tasks
+from watchmend.logs import logs, stream
+
+
+# commands taking a TaskFlag, which may select tasks by group or name pattern
+FLAG_COMMANDS = {
+    "Start": start,
+    "Stop": stop,
+    "Restart": restart,
+    "RollingRestart": rolling_restart,
+    "Remove": remove,
+    "Pause": pause,
+    "Resume": resume,
+}
 
 
 async def handle_exec(request: Request) -> Response:
     try:
+        if request.command in FLAG_COMMANDS and is_selector(request.data):
+            return await bulk(FLAG_COMMANDS[request.command], request.data)
         if request.command == "Run":
             return await run(request.data)
         elif request.command == "Add":
@@ -14,6 +33,10 @@ async def handle_exec(request: Request) -> Response:
             return await start(request.data)
         elif request.command == "Stop":
             return await stop(request.data)
+        elif request.command == "RollingRestart":
+            return await rolling_restart(request.data)
+        elif request.command == "Scale":
+            return await scale(request.data)
         elif request.command == "Restart":
             return await restart(request.data)
         elif request.command == "Remove":
@@ -24,5 +47,82 @@ async def handle_exec(request: Request) -> Response:
             return await resume(request.data)
         elif request.command == "List":
             return await lst(request.data)
+        elif request.command == "Metrics":
+            return await get_metrics()
+        elif request.command == "Stats":
+            return await stats(request.data)
+        elif request.command == "Logs":
+            return await logs(request.data)
     except ValueError as e:
         return Response.failed(str(e))
+
+
+def request_keys(requests: List[Request]) -> Optional[Set[Tuple[str, Any]]]:
+    """
+    The tasks requests read or change, as ("id", id) and ("name", name) keys,
+    so that requests sharing a key run in the order they were received.
+    :param requests: Requests of one frame
+    :return: Keys, None if they may touch any task
+    """
+    keys = set()
+    for request in requests:
+        if request.command == "Metrics":
+            continue
+        data = request.data
+        if isinstance(data, tuple):
+            data = data[0]
+        if data is None or is_selector(data):
+            return None
+        tp = None
+        if data.id > 0:
+            keys.add(("id", data.id))
+            tp = tasks.get(data.id)
+        if data.name:
+            keys.add(("name", data.name))
+            tp = tp or tasks.get_by_name(data.name)
+        if tp is not None:
+            # a task known by id in one request and by name in another
+            keys.add(("id", tp.task.id))
+            keys.add(("name", tp.task.name))
+        elif data.id <= 0 and not data.name:
+            return None
+    return keys
+
+
+async def handle_requests(requests: List[Request]) -> List[Response]:
+    """
+    Answer the requests of a connection, in order. The same flag command for
+    several single tasks, e.g. from a task file, runs concurrently, see `run_many`.
+    :param requests: Requests of the connection
+    :return: List[Response]
+    """
+    command = requests[0].command if len(requests) > 0 else None
+    if (len(requests) > 1 and command in FLAG_COMMANDS
+            and all(r.command == command and not is_selector(r.data) for r in requests)):
+        return await run_many(FLAG_COMMANDS[command], [r.data for r in requests])
+    return [await handle_exec(request) for request in requests]
+
+
+def is_stream(requests: List[Request]) -> bool:
+    """
+    Whether requests keep the connection open, `Logs` with `follow`.
+    :param requests: Requests of the connection
+    :return: bool
+    """
+    return len(requests) == 1 and requests[0].command == "Logs" and requests[0].data.follow
+
+
+async def handle_stream(requests: List[Request], reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                        prefix: bytes = b"") -> bool:
+    """
+    Serve a request that keeps the connection open, `Logs` with `follow`.
+    :param requests: Requests of the connection
+    :param reader: Client stream
+    :param writer: Client stream
+    :param prefix: Written before the response
+    :return: False if the requests are not a stream, the caller answers them
+    """
+    if not is_stream(requests):
+        return False
+    await stream(requests[0].data, reader, writer, prefix)
+    return True
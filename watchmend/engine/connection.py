@@ -0,0 +1,201 @@
+import asyncio
+import json
+import logging
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from common.frame import CHUNK, LEGACY, pack, read_frame
+from common.handle import Request, Response
+from watchmend.command import handle_requests, handle_stream, is_stream, request_keys
+
+
+logger = logging.getLogger("watchmen")
+
+# most requests of a connection running at once, the connection is not read meanwhile
+PIPELINE = 256
+
+
+def _parse(payload: bytes) -> Optional[List[Request]]:
+    try:
+        return [Request.from_dict(i) for i in json.loads(payload)]
+    except Exception as e:
+        logger.warning(f"Invalid request: {e}")
+        return None
+
+
+def _encode(responses: List[Response]) -> bytes:
+    return json.dumps([i.into_dict() for i in responses]).encode("utf-8")
+
+
+async def _legacy(first: bytes, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    """
+    The unframed protocol: one JSON array of requests, read until it parses,
+    answered with one JSON array, then the connection is closed. Clients that
+    follow logs still use it.
+    """
+    buf = bytearray(first)
+    while True:
+        try:
+            json.loads(buf)
+            break
+        except ValueError:
+            chunk = await reader.read(CHUNK)
+            if not chunk:
+                return
+            buf += chunk
+    requests = _parse(buf)
+    if requests is None:
+        responses = [Response.wrong("Invalid request")]
+    elif await handle_stream(requests, reader, writer):
+        return
+    else:
+        responses = await handle_requests(requests)
+    writer.write(_encode(responses))
+    await writer.drain()
+
+
+class Sequencer:
+    """
+    Order of the requests of a connection. Requests are registered as they
+    are read; one waits for the earlier requests sharing a task with it, and
+    a request that may touch any task waits for all earlier ones, and all
+    later ones wait for it.
+    """
+
+    def __init__(self) -> None:
+        self._last: Dict[Tuple[str, Any], asyncio.Future] = {}
+        self._barrier: Optional[asyncio.Future] = None
+        self._pending: Set[asyncio.Future] = set()
+
+    def order(self, keys: Optional[Set[Tuple[str, Any]]]) -> Tuple[List[asyncio.Future], asyncio.Future]:
+        """
+        Register a request.
+        :param keys: Keys of the request, see `request_keys`
+        :return: (futures to wait for before running it, future to pass to `release`)
+        """
+        done = asyncio.get_running_loop().create_future()
+        if keys is None:
+            waits = list(self._pending)
+            self._last.clear()
+            self._barrier = done
+        else:
+            waits = [self._last[key] for key in keys if key in self._last]
+            if self._barrier is not None:
+                waits.append(self._barrier)
+            for key in keys:
+                self._last[key] = done
+        self._pending.add(done)
+        return waits, done
+
+    def release(self, keys: Optional[Set[Tuple[str, Any]]], done: asyncio.Future) -> None:
+        done.set_result(None)
+        self._pending.discard(done)
+        if self._barrier is done:
+            self._barrier = None
+        for key in keys or ():
+            if self._last.get(key) is done:
+                del self._last[key]
+
+
+async def _answer(requests: Optional[List[Request]]) -> List[Response]:
+    if requests is None:
+        return [Response.wrong("Invalid request")]
+    try:
+        return await handle_requests(requests)
+    except Exception as e:
+        logger.exception(f"Request failed: {e}")
+        return [Response.failed(str(e))]
+
+
+async def _framed(first: bytes, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    """
+    Framed exchanges until the client closes the connection: every frame holds
+    a JSON array of requests and is answered with a frame of its responses.
+
+    Version 1 frames are answered in order, after every request read before
+    them and before any read after them. Version 2 frames run concurrently
+    with the other requests of the connection, except those on the same tasks,
+    and are answered as soon as done, tagged with their request id.
+    """
+    sequencer = Sequencer()
+    slots = asyncio.Semaphore(PIPELINE)
+    running: Set[asyncio.Task] = set()
+    lock = asyncio.Lock()
+
+    async def write(payload: bytes) -> None:
+        async with lock:
+            writer.write(payload)
+            await writer.drain()
+
+    async def dispatch(request_id: int, requests: Optional[List[Request]], keys: Optional[Set[Tuple[str, Any]]],
+                       waits: List[asyncio.Future], done: asyncio.Future) -> None:
+        try:
+            await asyncio.gather(*waits)
+            responses = await _answer(requests)
+        finally:
+            sequencer.release(keys, done)
+        try:
+            await write(pack(_encode(responses), request_id))
+        except ConnectionError:
+            pass
+        finally:
+            slots.release()
+
+    try:
+        frame = await read_frame(reader, first)
+        while frame is not None:
+            request_id, payload = frame
+            requests = _parse(payload)
+            if requests is not None and is_stream(requests):
+                # a follow writes raw output until the client leaves, the connection is its own
+                await asyncio.gather(*running)
+                await handle_stream(requests, reader, writer)
+                return
+            if request_id is None:
+                # answered in order: after every earlier request, before every later one
+                keys = None
+            else:
+                keys = request_keys(requests) if requests is not None else set()
+            waits, done = sequencer.order(keys)
+            if request_id is None:
+                try:
+                    await asyncio.gather(*waits)
+                    responses = await _answer(requests)
+                finally:
+                    sequencer.release(keys, done)
+                await write(pack(_encode(responses)))
+            else:
+                await slots.acquire()
+                task = asyncio.create_task(dispatch(request_id, requests, keys, waits, done))
+                running.add(task)
+                task.add_done_callback(running.discard)
+            frame = await read_frame(reader)
+    finally:
+        # requests already read are run to the end, even if their client left
+        await asyncio.gather(*running)
+
+
+async def serve(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    """
+    Serve a client connection of the sock or socket engine, framed or unframed
+    depending on its first byte, see `common.frame`.
+    :param reader: Client stream
+    :param writer: Client stream
+    :return: None
+    """
+    try:
+        first = await reader.read(1)
+        if first and first[0] == LEGACY:
+            await _legacy(first, reader, writer)
+        elif first:
+            await _framed(first, reader, writer)
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass
+    except ValueError as e:
+        # unsupported frame version, nothing else can be read from the stream
+        logger.warning(f"Closing client connection: {e}")
+    finally:
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except ConnectionError:
+            pass
@@ -8,7 +8,8 @@ async def start(config: Config, load_cache: bool) -> None:
     logger = get_logger(log_dir=config.watchmen.log_dir)
     if load_cache:
         try:
-            await load(path=config.watchmen.cache)
+            await load(path=config.watchmen.cache, compact=config.watchmen.cache_compact,
+                       flush_ms=config.watchmen.cache_flush_ms, concurrency=config.watchmen.restore_concurrency)
         except Exception as e:
             logger.warning(f"Failed to load cache: {e}")
 
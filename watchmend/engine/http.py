@@ -5,7 +5,7 @@ from pathlib import Path
 
 from common.config import Config
 from common.handle import Request
-from watchmend.command import handle_exec
+from watchmend.command import handle_requests, handle_stream
 
 
 async def start(config: Config) -> asyncio.Task[None]:
@@ -49,10 +49,14 @@ async def handle_connection(reader: asyncio.StreamReader, writer: asyncio.Stream
         await writer.wait_closed()
 
     else:
-        reses = []
-        for i in json.loads(body):
-            res = await handle_exec(Request.from_dict(i))
-            reses.append(res)
+        requests = [Request.from_dict(i) for i in json.loads(body)]
+        prefix = 'HTTP/1.1 200 OK\r\nContent-Type: text/plain; charset=utf-8\r\n\r\n'.encode()
+        if await handle_stream(requests, reader, writer, prefix):
+            writer.close()
+            await writer.wait_closed()
+            return
+
+        reses = await handle_requests(requests)
 
         b = json.dumps([i.into_dict() for i in reses]).encode("utf-8")
 
@@ -0,0 +1,83 @@
+import os
+from collections import OrderedDict
+from typing import Dict
+
+from common.utils import get_with_home
+from watchmend.metrics import metrics
+
+
+class FdPool:
+    """
+    Shared O_APPEND descriptors for task stdout / stderr files.
+
+    One descriptor per resolved path is reused across runs and tasks. Tasks
+    referencing a path are counted, the descriptor is closed when the last
+    one is removed. Past `limit` open descriptors the least recently used is
+    closed, it is opened again on its next spawn.
+    """
+    _instance = None
+
+    def __init__(self) -> None:
+        self.limit = 256
+        self._fds: "OrderedDict[str, int]" = OrderedDict()
+        self._refs: Dict[str, int] = {}
+
+    def configure(self, limit: int = 256) -> None:
+        # stdout and stderr of one spawn must both stay open
+        self.limit = max(limit, 2)
+
+    @staticmethod
+    def resolve(path: str) -> str:
+        return os.path.realpath(get_with_home(path))
+
+    def acquire(self, path: str) -> int:
+        """
+        Descriptor appending to `path`, valid until the next `acquire`
+        may evict it. Use it right away.
+        :param path: File path
+        :return: int
+        """
+        path = self.resolve(path)
+        fd = self._fds.get(path)
+        if fd is not None:
+            self._fds.move_to_end(path)
+            metrics.incr("fd_pool_hits")
+            return fd
+
+        metrics.incr("fd_pool_misses")
+        parent = os.path.dirname(path)
+        if not os.path.exists(parent):
+            os.makedirs(parent)
+        fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT | os.O_CLOEXEC, 0o644)
+        self._fds[path] = fd
+        while len(self._fds) > self.limit:
+            _, old = self._fds.popitem(last=False)
+            os.close(old)
+            metrics.incr("fd_pool_evictions")
+        return fd
+
+    def retain(self, path: str) -> None:
+        path = self.resolve(path)
+        self._refs[path] = self._refs.get(path, 0) + 1
+
+    def release(self, path: str) -> None:
+        path = self.resolve(path)
+        refs = self._refs.get(path, 0) - 1
+        if refs > 0:
+            self._refs[path] = refs
+            return
+        self._refs.pop(path, None)
+        fd = self._fds.pop(path, None)
+        if fd is not None:
+            os.close(fd)
+
+    def size(self) -> int:
+        return len(self._fds)
+
+    def __new__(cls) -> "FdPool":
+        if cls._instance is None:
+            cls._instance = super(FdPool, cls).__new__(cls)
+        return cls._instance
+
+
+fd_pool = FdPool()
@@ -0,0 +1,240 @@
+import asyncio
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from watchmend.metrics import metrics
+
+
+logger = logging.getLogger("watchmen")
+
+# seconds before a failed write is retried
+RETRY_DELAY = 1
+
+
+class Journal:
+    """
+    Append-only state journal on top of the json cache file.
+
+    Every change is appended as one json line to `<cache>.journal`:
+    `{"put": <task dict>}` or `{"del": <task id>}`. Once `threshold` records
+    have been appended the journal is sealed (renamed to `<cache>.journal.1`)
+    and folded into the cache file in the background, written through a temp
+    file, fsync and rename.
+    """
+
+    def __init__(self, path: Path, threshold: int = 1000) -> None:
+        self.path = path
+        self.journal_path = path.with_name(path.name + ".journal")
+        self.sealed_path = path.with_name(path.name + ".journal.1")
+        self.threshold = threshold
+        self.records = 0
+        self.compacting = False
+        self._fd: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def exists(self) -> bool:
+        return self.path.is_file() or self.journal_path.is_file() or self.sealed_path.is_file()
+
+    def load(self) -> List[Dict[str, Any]]:
+        """
+        Read the snapshot and replay the sealed and the live journal on top of it.
+        :return: List[Dict[str, Any]]
+        """
+        state: Dict[int, Dict[str, Any]] = {}
+        if self.path.is_file():
+            with open(self.path, "r") as f:
+                for task in json.load(f):
+                    state[task["id"]] = task
+        self._replay(self.sealed_path, state)
+        self.records = self._replay(self.journal_path, state)
+        return list(state.values())
+
+    def _replay(self, path: Path, state: Dict[int, Dict[str, Any]]) -> int:
+        count = 0
+        if not path.is_file():
+            return count
+        good = 0
+        with open(path, "rb") as f:
+            for line in f:
+                try:
+                    if not line.endswith(b"\n"):
+                        raise ValueError("unterminated record")
+                    record = json.loads(line)
+                except ValueError:
+                    # torn tail of a write interrupted by a crash
+                    break
+                if "put" in record:
+                    state[record["put"]["id"]] = record["put"]
+                elif "del" in record:
+                    state.pop(record["del"], None)
+                count += 1
+                good += len(line)
+        if good < path.stat().st_size:
+            # cut the torn tail, records appended after it would never be replayed
+            os.truncate(path, good)
+        return count
+
+    def _open(self) -> int:
+        if self._fd is None:
+            parent = self.journal_path.parent
+            if not parent.exists():
+                parent.mkdir(parents=True)
+            self._fd = os.open(self.journal_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        return self._fd
+
+    def append(self, records: List[Dict[str, Any]]) -> None:
+        """
+        Append records to the live journal, one line each, in a single write.
+        :param records: List[Dict[str, Any]]
+        :return: None
+        """
+        data = b"".join(json.dumps(r, separators=(",", ":")).encode("utf-8") + b"\n" for r in records)
+        with self._lock:
+            fd = self._open()
+            os.write(fd, data)
+            os.fsync(fd)
+            self.records += len(records)
+
+    def need_compact(self) -> bool:
+        return not self.compacting and self.records >= self.threshold
+
+    def seal(self) -> None:
+        """
+        Close the live journal and move it aside, new records go to a fresh file.
+        Must be called at the same point the snapshot state is taken.
+        :return: None
+        """
+        with self._lock:
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+            if self.journal_path.exists():
+                if self.sealed_path.exists():
+                    # a previous compaction failed, keep its records
+                    with open(self.sealed_path, "ab") as dst, open(self.journal_path, "rb") as src:
+                        dst.write(src.read())
+                    self.journal_path.unlink()
+                else:
+                    os.replace(self.journal_path, self.sealed_path)
+            self.records = 0
+            self.compacting = True
+
+    def compact(self, state: List[Dict[str, Any]]) -> None:
+        """
+        Write the snapshot atomically and drop the sealed journal.
+        Blocking, run it in a worker thread.
+        :param state: Full task state at the moment of `seal`
+        :return: None
+        """
+        try:
+            tmp = self.path.with_name(self.path.name + ".tmp")
+            with open(tmp, "w") as f:
+                json.dump(state, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.path)
+            dir_fd = os.open(self.path.parent, os.O_RDONLY)
+            try:
+                os.fsync(dir_fd)
+            finally:
+                os.close(dir_fd)
+            if self.sealed_path.exists():
+                self.sealed_path.unlink()
+        finally:
+            self.compacting = False
+
+    def close(self) -> None:
+        with self._lock:
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+
+
+class Writer:
+    """
+    Single background writer in front of a `Journal`.
+
+    `mark` only records that a task is dirty. The writer waits `flush_ms` after
+    the first mark, then serializes each dirty task once and appends the batch
+    from a worker thread, so a burst of changes costs one write.
+    """
+
+    def __init__(self, journal: Journal, record: Callable[[int], Dict[str, Any]],
+                 state: Callable[[], List[Dict[str, Any]]], flush_ms: int = 100) -> None:
+        self.journal = journal
+        self._record = record
+        self._state = state
+        self._flush_ms = flush_ms
+        self._dirty: Dict[int, None] = {}
+        self._event: Optional[asyncio.Event] = None
+        self._flushing: Optional[asyncio.Lock] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        self._event = asyncio.Event()
+        self._flushing = asyncio.Lock()
+        self._task = asyncio.create_task(self._run())
+
+    def mark(self, task_id: int) -> None:
+        metrics.incr("cache_requested")
+        self._dirty[task_id] = None
+        if self._event is not None:
+            self._event.set()
+
+    async def _run(self) -> None:
+        while True:
+            await self._event.wait()
+            await asyncio.sleep(self._flush_ms / 1000)
+            try:
+                await self.flush()
+            except Exception as e:
+                # the changes stay dirty, a full disk or an I/O error does not end persistence
+                metrics.incr("cache_failed")
+                logger.error(f"Writing the cache journal failed, retrying in {RETRY_DELAY}s: {e}")
+                await asyncio.sleep(RETRY_DELAY)
+
+    def _take(self) -> Tuple[List[int], List[Dict[str, Any]]]:
+        if self._event is not None:
+            self._event.clear()
+        dirty, self._dirty = self._dirty, {}
+        return list(dirty), [self._record(task_id) for task_id in dirty]
+
+    def _restore(self, task_ids: List[int]) -> None:
+        # marked again meanwhile or not, the current state is written next time
+        for task_id in task_ids:
+            self._dirty[task_id] = None
+        if self._event is not None:
+            self._event.set()
+
+    async def flush(self) -> None:
+        """
+        Write every pending change now. On failure the changes stay pending.
+        :return: None
+        """
+        async with self._flushing:
+            task_ids, records = self._take()
+            if len(records) > 0:
+                try:
+                    await asyncio.to_thread(self.journal.append, records)
+                except BaseException:
+                    self._restore(task_ids)
+                    raise
+                metrics.incr("cache_written", len(records))
+            if self.journal.need_compact():
+                self.journal.seal()
+                asyncio.create_task(asyncio.to_thread(self.journal.compact, self._state()))
+
+    def flush_sync(self) -> None:
+        """
+        Write every pending change from outside the event loop (atexit).
+        :return: None
+        """
+        _, records = self._take()
+        if len(records) > 0:
+            self.journal.append(records)
+            metrics.incr("cache_written", len(records))
+        self.journal.close()
@@ -1,23 +1,92 @@
 import asyncio
 import atexit
-import json
+import logging
 import os
 import re
 import signal
-from asyncio.subprocess import Process
+import time
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
 
 from common.handle import Response, Status
-from common.task import AsyncTask, PeriodicTask, ScheduledTask, Task, TaskFlag
+from common.task import AsyncTask, CronTask, PeriodicTask, ScaleFlag, ScheduledTask, StatsFlag, Task, TaskFlag
 from common.utils import get_with_home_path
+from watchmend.activation import Activator
+from watchmend.admission import admission
+from watchmend.capture import Capture, capturer
+from watchmend.fdpool import fd_pool
+from watchmend.history import history
+from watchmend.journal import Journal, Writer
+from watchmend.listeners import listeners
+from watchmend.metrics import metrics
+from watchmend.reaper import Child, reaper
+from watchmend.sampler import live_groups, sampler
+from watchmend.restart import restarter
+from watchmend.scheduler import scheduler
+
+
+logger = logging.getLogger("watchmen")
+
+# poll interval for the descendants of a stopped task process
+STOP_POLL = 0.05
+# longest wait for a killed process group to be gone
+KILL_WAIT = 1
+
+
+class Instance:
+    """
+    One supervised child of a task. Async tasks have `instances` of them,
+    the other task types a single one.
+    """
+    def __init__(self, index: int) -> None:
+        self.index = index
+        self.child: Optional[Child] = None
+        self.joinhandle: Optional[asyncio.Task] = None
+        # running | auto restart | stopped, async tasks only
+        self.status = "stopped"
+
+        # auto restart state of async tasks
+        self.failures = 0
+        self.started_at: Optional[float] = None
+        self.restart_at: Optional[float] = None
+        self.pending: Optional[asyncio.Task] = None
+
+    @property
+    def pid(self) -> Optional[int]:
+        if self.child is None or self.child.returncode is not None:
+            return None
+        return self.child.pid
+
+    def cancel_restart(self) -> None:
+        if self.pending is not None and self.pending is not asyncio.current_task():
+            self.pending.cancel()
+        self.pending = None
+        self.restart_at = None
 
 
 class TaskProcess:
-    def __init__(self, task: Task, joinhandle: Optional[asyncio.Task] = None, child: Optional[Process] = None) -> None:
+    def __init__(self, task: Task) -> None:
         self.task = task
-        self.joinhandle = joinhandle
-        self.child = child
+        self.children: List[Instance] = [Instance(0)]
+
+        # seconds the last execution waited for admission
+        self.wait: Optional[float] = None
+
+        # recent output of a `capture` task, kept across restarts
+        self.capture: Optional[Capture] = None
+
+        # socket activation of an `on_demand` task, from start to stop
+        self.activator: Optional[Activator] = None
+
+    def pids(self) -> List[int]:
+        return [inst.pid for inst in self.children if inst.pid is not None]
+
+    def restart_at(self) -> Optional[float]:
+        return min((inst.restart_at for inst in self.children if inst.restart_at is not None), default=None)
+
+    def cancel_restart(self) -> None:
+        for inst in self.children:
+            inst.cancel_restart()
 
 
 class Tasks:
@@ -26,16 +95,55 @@ class Tasks:
     def __init__(self) -> None:
         self._tasks: Dict[int, TaskProcess] = {}
         self._cache_path: Optional[Path] = None
+        self._writer: Optional[Writer] = None
+
+        # secondary indexes, kept in sync by add / remove / update
+        self._names: Dict[str, int] = {}
+        self._groups: Dict[str, Set[int]] = {}
+        self._statuses: Dict[str, Set[int]] = {}
+
+        # group -> CPU cores of its tasks without a cpu_affinity
+        self.group_affinity: Dict[str, List[int]] = {}
+
+        # tasks a group or pattern command runs at the same time
+        self.bulk_concurrency = 32
+
+        # seconds from SIGTERM to SIGKILL of tasks without their own stop_timeout,
+        # and the overall bound of a group stop or the daemon shutdown
+        self.stop_timeout: float = 10
+        self.stop_deadline: float = 30
+        # set by `shutdown`, statuses are no longer cached and nothing is started
+        self.closing = False
 
         atexit.register(self._atexit)
 
     def _atexit(self):
+        if self._writer is not None:
+            self._writer.flush_sync()
+        # normally nothing is left after `shutdown`, unless the loop died before it ran
+        left = []
         for v in self._tasks.values():
-            if v.child is not None:
-                try:
-                    v.child.kill()
-                except:
-                    pass
+            for inst in v.children:
+                if inst.child is not None and inst.child.returncode is None:
+                    left.append((inst.child, _stop_timeout(v)))
+        _halt_sync(left, self.stop_deadline)
+
+    def _index(self, tp: TaskProcess) -> None:
+        task_id = tp.task.id
+        self._names[tp.task.name] = task_id
+        self._groups.setdefault(tp.task.group or "", set()).add(task_id)
+        self._statuses.setdefault(tp.task.status or "", set()).add(task_id)
+
+    def _unindex(self, tp: TaskProcess) -> None:
+        task_id = tp.task.id
+        if self._names.get(tp.task.name) == task_id:
+            del self._names[tp.task.name]
+        for index, key in ((self._groups, tp.task.group or ""), (self._statuses, tp.task.status or "")):
+            ids = index.get(key)
+            if ids is not None:
+                ids.discard(task_id)
+                if not ids:
+                    del index[key]
 
     def set_cache_path(self, path: Path) -> None:
         self._cache_path = path
@@ -43,8 +151,46 @@ class Tasks:
     def get_cache_path(self) -> Optional[Path]:
         return self._cache_path
 
+    def set_writer(self, writer: Writer) -> None:
+        self._writer = writer
+
+    def get_writer(self) -> Optional[Writer]:
+        return self._writer
+
     def add(self, task_id: int, tp: TaskProcess) -> None:
+        # files kept by the new definition are retained before the old one lets go of them
+        for path in (tp.task.stdout, tp.task.stderr):
+            if path is not None:
+                fd_pool.retain(path)
+                capturer.retain(path)
+        for address in tp.task.listen or ():
+            listeners.retain(address)
+        old = self._tasks.get(task_id)
+        if old is not None:
+            self._unindex(old)
+            _release_files(old.task)
         self._tasks[task_id] = tp
+        self._index(tp)
+        scheduler.schedule(tp.task)
+
+    def update(self, task_id: int, status: str) -> None:
+        """
+        Set task status and move it in the status index.
+        :param task_id: Task id
+        :param status: New status
+        :return: None
+        """
+        tp = self._tasks.get(task_id)
+        if tp is None or tp.task.status == status:
+            return
+        ids = self._statuses.get(tp.task.status or "")
+        if ids is not None:
+            ids.discard(task_id)
+            if not ids:
+                del self._statuses[tp.task.status or ""]
+        tp.task.status = status
+        self._statuses.setdefault(status or "", set()).add(task_id)
+        scheduler.schedule(tp.task)
 
     def check(self, task_id: int) -> bool:
         return task_id in self._tasks
@@ -53,17 +199,27 @@ class Tasks:
         return self._tasks.get(task_id)
 
     def get_by_name(self, name: str) -> Optional[TaskProcess]:
-        for tp in self._tasks.values():
-            if tp.task.name == name:
-                return tp
-        return None
+        task_id = self._names.get(name)
+        if task_id is None:
+            return None
+        return self._tasks.get(task_id)
+
+    def get_by_group(self, group: str) -> List[TaskProcess]:
+        return [self._tasks[i] for i in self._groups.get(group or "", ())]
+
+    def get_by_status(self, status: str) -> List[TaskProcess]:
+        return [self._tasks[i] for i in self._statuses.get(status or "", ())]
 
     def get_all(self) -> Dict[int, TaskProcess]:
         return self._tasks
 
     def remove(self, task_id: int) -> None:
-        if task_id in self._tasks:
-            del self._tasks[task_id]
+        tp = self._tasks.pop(task_id, None)
+        if tp is not None:
+            self._unindex(tp)
+            _release_files(tp.task)
+        history.remove(task_id)
+        scheduler.disarm(task_id)
 
     def __new__(cls) -> "Tasks":
         if cls._instance is None:
@@ -71,6 +227,15 @@ class Tasks:
         return cls._instance
 
 
+def _release_files(task: Task) -> None:
+    for path in (task.stdout, task.stderr):
+        if path is not None:
+            fd_pool.release(path)
+            capturer.release(path)
+    for address in task.listen or ():
+        listeners.release(address)
+
+
 tasks = Tasks()
 
 
@@ -82,65 +247,113 @@ async def get_all() -> Dict[int, Task]:
     return tasks.get_all()
 
 
-async def load(path: str) -> None:
+async def load(path: str, compact: Optional[int] = None, flush_ms: Optional[int] = None,
+               concurrency: Optional[int] = None) -> None:
     """
-    Load tasks from file.
+    Load tasks from the cache file and replay its journal.
+    Tasks cached as running are marked `restoring` and restarted in the background.
     :param path: File path
+    :param compact: Journal records before compaction into the cache file
+    :param flush_ms: Window in which cache writes are coalesced
+    :param concurrency: Tasks restored at the same time
     :return: Response
     """
+    begin = time.monotonic()
     path_home = get_with_home_path(path)
 
     tasks.set_cache_path(path_home)
+    journal = Journal(path_home, compact or 1000)
+    writer = Writer(journal, _record, _state, 100 if flush_ms is None else flush_ms)
+    writer.start()
+    tasks.set_writer(writer)
 
-    if not path_home.exists() or not path_home.is_file():
+    if not journal.exists():
         raise Exception(f"Cache file [{path_home}] is not valid")
 
-    with open(path_home, "r") as f:
-        tasks_cache = json.load(f)
+    tasks_cache = journal.load()
 
+    restoring: List[int] = []
     for task in tasks_cache:
         tp = TaskProcess(task=Task.from_dict(task))
+        tp.task.pid = None
         if isinstance(tp.task.task_type, AsyncTask):
-            if tp.task.status == "running":
-                child = await tp.task.start()
-
-                task_id = tp.task.id
-                max_restart = tp.task.task_type.max_restart
-                has_restart = tp.task.task_type.has_restart
-
-                async def watch():
-                    await child.wait()
-                    returncode = child.returncode
-                    if max_restart is None:
-                        await update(task_id, None, "stopped", returncode, False)
-                    else:
-                        if max_restart == 0:
-                            await update(task_id, None, "auto restart", returncode, True)
-                        else:
-                            if has_restart < max_restart:
-                                await update(task_id, None, "auto restart", returncode, True)
-                            else:
-                                await update(task_id, None, "stopped", returncode, False)
-
-                tp.joinhandle = asyncio.create_task(watch())
-                tp.child = child
-                tp.task.pid = child.pid
-                tp.task.status = "running"
-                tp.task.code = None
+            if tp.task.status in ("running", "auto restart", "idle"):
+                tp.task.status = "restoring"
+                restoring.append(tp.task.id)
+        elif isinstance(tp.task.task_type, PeriodicTask):
+            if tp.task.status == "executing" or tp.task.status == "queued":
+                tp.task.status = "interval"
+        elif isinstance(tp.task.task_type, (ScheduledTask, CronTask)):
+            if tp.task.status == "processing" or tp.task.status == "queued":
+                tp.task.status = "waiting"
         tasks.add(tp.task.id, tp)
 
+    logger.info(f"Loaded {len(tasks_cache)} tasks from cache in {time.monotonic() - begin:.3f}s")
+
+    if len(restoring) > 0:
+        asyncio.create_task(_restore(restoring, concurrency or 32, begin))
+
+
+async def _restore(task_ids: List[int], concurrency: int, begin: float) -> None:
+    """
+    Restart tasks left `restoring` by `load`, at most `concurrency` at a time.
+    :param task_ids: Task ids
+    :param concurrency: Tasks restored at the same time
+    :param begin: Monotonic time load started
+    :return: None
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def restore(task_id: int) -> bool:
+        async with semaphore:
+            tp = tasks.get(task_id)
+            # stopped, removed or started by hand in the meantime
+            if tp is None or tp.task.status != "restoring":
+                return False
+            try:
+                await start(TaskFlag(id=task_id))
+                return True
+            except Exception as e:
+                logger.warning(f"Failed to restore task [{task_id}:{tp.task.name}]: {e}")
+                tasks.update(task_id, "stopped")
+                cache(task_id)
+                return False
+
+    results = await asyncio.gather(*[restore(i) for i in task_ids])
+    logger.info(f"Restored {sum(results)}/{len(task_ids)} tasks, cold start took {time.monotonic() - begin:.3f}s")
+
+
+def _record(task_id: int) -> Dict[str, Any]:
+    tp = tasks.get(task_id)
+    if tp is None:
+        return {"del": task_id}
+    return {"put": tp.task.into_dict()}
+
+
+def _state() -> List[Dict[str, Any]]:
+    return [tp.task.into_dict() for tp in tasks.get_all().values()]
 
-async def cache() -> None:
-    path = tasks.get_cache_path()
-    if path is not None:
-        parent = path.parent
-        if not parent.exists():
-            parent.mkdir(parents=True)
-        tasks_cache = []
-        for tp in tasks.get_all().values():
-            tasks_cache.append(tp.task.into_dict())
-        with open(path, "w") as f:
-            json.dump(tasks_cache, f)
+
+def cache(task_id: int) -> None:
+    """
+    Mark a task as changed, the writer persists it on its next flush.
+    :param task_id: Task id
+    :return: None
+    """
+    writer = tasks.get_writer()
+    if writer is not None and not tasks.closing:
+        writer.mark(task_id)
+
+
+async def flush() -> None:
+    """
+    Persist all pending changes, called on shutdown.
+    :return: None
+    """
+    writer = tasks.get_writer()
+    if writer is not None:
+        await writer.flush()
+    await capturer.flush()
 
 
 async def update(task_id: int, pid: int, status: Optional[str], code: int, restart: Optional[bool] = False, from_status: Optional[List[str]] = None) -> Response:
@@ -161,16 +374,16 @@ async def update(task_id: int, pid: int, status: Optional[str], code: int, resta
     tp.task.pid = pid
     if status is not None:
         if from_status is None:
-            tp.task.status = status
+            tasks.update(task_id, status)
         else:
             if tp.task.status in from_status:
-                tp.task.status = status
+                tasks.update(task_id, status)
     tp.task.code = code
 
     if isinstance(tp.task.task_type, AsyncTask):
         has = tp.task.task_type.has_restart
         if restart is None:
-            tp.task.status = "stopped"
+            tasks.update(task_id, "stopped")
         else:
             if tp.task.task_type.max_restart is None:
                 has = 0
@@ -178,7 +391,7 @@ async def update(task_id: int, pid: int, status: Optional[str], code: int, resta
                 if has < tp.task.task_type.max_restart:
                     has += 1
                 else:
-                    tp.task.status = "stopped"
+                    tasks.update(task_id, "stopped")
         tp.task.task_type.has_restart = has
 
     return Response.success(f"Task [{task_id}:{tp.task.name}] updated")
@@ -191,23 +404,23 @@ async def run(task: Task) -> Response:
     :return: Response
     """
     res = await add(task)
-    if not isinstance(task.task_type, ScheduledTask):
+    if not isinstance(task.task_type, (ScheduledTask, CronTask)):
         return await start(TaskFlag(id=task.id, name="", mat=False))
     return res
 
 
 async def add(task: Task) -> Response:
-    if tasks.check(task.id):
+    if tasks.check(task.id) or tasks.get_by_name(task.name) is not None:
         return Response.failed(f"Task [{task.id}:{task.name}] already exists")
 
-    if isinstance(task.task_type, ScheduledTask):
+    if isinstance(task.task_type, (ScheduledTask, CronTask)):
         task.status = "waiting"
     else:
         task.status = "added"
 
     tp = TaskProcess(task)
     tasks.add(task.id, tp)
-    asyncio.create_task(cache())
+    cache(tp.task.id)
     return Response.success(f"Task [{task.id}:{task.name}] added")
 
 
@@ -217,8 +430,94 @@ async def re_load(task: Task) -> Response:
     :param task: Task
     :return: Response
     """
-    await remove(TaskFlag(id=task.id, name="", mat=False), to_cache=False)
-    return await add(task)
+    # sockets shared by the old and the new definition stay bound across the reload
+    for address in task.listen or ():
+        listeners.retain(address)
+    try:
+        await remove(TaskFlag(id=task.id, name="", mat=False), to_cache=False)
+        return await add(task)
+    finally:
+        for address in task.listen or ():
+            listeners.release(address)
+
+
+def _affinity(tp: TaskProcess, index: Optional[int]) -> Optional[List[int]]:
+    """
+    CPU cores of a task process: its own `cpu_affinity`, else its group's.
+    Pinned async instances take one core of that set, or of the daemon's, round-robin.
+    :param tp: TaskProcess
+    :param index: Instance index, None for the other task types
+    :return: Optional[List[int]]
+    """
+    cores = tp.task.cpu_affinity or tasks.group_affinity.get(tp.task.group or "")
+    task_type = tp.task.task_type
+    if index is None or not isinstance(task_type, AsyncTask) or not task_type.pin:
+        return cores
+    cores = sorted(cores or os.sched_getaffinity(0))
+    return [cores[index % len(cores)]]
+
+
+async def _spawn(tp: TaskProcess, index: Optional[int] = None) -> Child:
+    """
+    Spawn a task process with its output files taken from the fd pool.
+    :param tp: TaskProcess
+    :param index: Instance index of an async task, exported as INSTANCE_ID
+    :return: Child
+    """
+    if tp.task.capture:
+        return await _spawn_captured(tp, index)
+    stdout = None if tp.task.stdout is None else fd_pool.acquire(tp.task.stdout)
+    stderr = None if tp.task.stderr is None else fd_pool.acquire(tp.task.stderr)
+    fds = listeners.acquire(tp.task.listen) if tp.task.listen else None
+    return reaper.watch(await tp.task.start(stdout, stderr, _affinity(tp, index), index, fds))
+
+
+async def _spawn_captured(tp: TaskProcess, index: Optional[int] = None) -> Child:
+    """
+    Spawn a `capture` task with its output going through pipes to the daemon.
+    stderr shares the stdout pipe unless it has a file of its own.
+    :param tp: TaskProcess
+    :param index: Instance index of an async task
+    :return: Child
+    """
+    if tp.capture is None:
+        tp.capture = Capture(capturer.buffer)
+    fds = listeners.acquire(tp.task.listen) if tp.task.listen else None
+    pipes = [os.pipe()]
+    if tp.task.stderr is not None and tp.task.stderr != tp.task.stdout:
+        pipes.append(os.pipe())
+    try:
+        process = await tp.task.start(pipes[0][1], pipes[-1][1], _affinity(tp, index), index, fds)
+    except Exception:
+        for r, _ in pipes:
+            os.close(r)
+        raise
+    finally:
+        for _, w in pipes:
+            os.close(w)
+    paths = [tp.task.stdout, tp.task.stderr]
+    for (r, _), path in zip(pipes, paths):
+        tp.capture.attach(r, None if path is None else capturer.sink(path))
+    return reaper.watch(process)
+
+
+async def _admit(tp: TaskProcess, group: Optional[str]) -> bool:
+    """
+    Wait for an execution slot, the task is `queued` meanwhile.
+    :param tp: TaskProcess
+    :param group: Group the slot is taken from
+    :return: False if the task was paused or removed while queued
+    """
+    tasks.update(tp.task.id, "queued")
+    wait = await admission.acquire(tp.task.id, group)
+    if wait is None:
+        return False
+    if tasks.get(tp.task.id) is not tp or tp.task.status != "queued":
+        admission.release(group)
+        return False
+    tp.wait = wait
+    metrics.observe("admission_wait_ms", wait * 1000)
+    return True
 
 
 async def start(tf: TaskFlag) -> None:
@@ -227,103 +526,507 @@ async def start(tf: TaskFlag) -> None:
     :param tf: TaskFlag
     :return: None
     """
-    tp = tasks.get(tf.id)
-    if tp is None:
-        raise ValueError(f"Task [{tf.id}] not exists")
+    if tasks.closing:
+        raise ValueError("Daemon is shutting down")
+
+    tp = _lookup(tf)
 
     if isinstance(tp.task.task_type, AsyncTask):
-        max_restart = tp.task.task_type.max_restart
         if tp.task.status == "running":
-            raise ValueError(f"Task [{tf.id}] is running")
+            raise ValueError(f"Task [{tp.task.id}:{tp.task.name}] is running")
 
-        child = await tp.task.start()
+        if tp.task.task_type.on_demand:
+            _idle(tp)
+            return Response.success(f"Task [{tp.task.id}:{tp.task.name}] idle, starts on the first connection")
 
-        async def watch():
-            await child.wait()
-            returncode = child.returncode
-
-            finish = False
-            if max_restart is None:
-                finish = True
-            else:
-                if returncode is None:
-                    finish = True
-                else:
-                    finish = returncode == 0 or returncode == -15 or max_restart == 0
-
-            if finish:
-                await update(tp.task.id, None, "stopped", returncode)
-            else:
-                await update(tp.task.id, None, "auto restart", returncode)
-
-        tp.joinhandle = asyncio.create_task(watch())
-        tp.child = child
-        tp.task.pid = child.pid
-        tp.task.status = "running"
-        tp.task.code = None
-
-        asyncio.create_task(cache())
-
-        return Response.success(f"Task [{tf.id}:{tp.task.name}] started")
+        await _start_all(tp)
+        return Response.success(f"Task [{tp.task.id}:{tp.task.name}] started")
     elif isinstance(tp.task.task_type, PeriodicTask):
-        child = await tp.task.start()
+        group = tp.task.group
+        if not await _admit(tp, group):
+            return Response.failed(f"Task [{tp.task.id}:{tp.task.name}] left the queue")
+        tp.task.task_type.last_run = int(time.time())
+        try:
+            child = await _spawn(tp)
+        except Exception:
+            admission.release(group)
+            tasks.update(tp.task.id, "interval")
+            raise
 
         async def watch():
             await child.wait()
+            admission.release(group)
             returncode = child.returncode 
             await update(tp.task.id, None, "interval", returncode, False, ["executing"])
-            asyncio.create_task(cache())
+            cache(tp.task.id)
 
-        tp.joinhandle = asyncio.create_task(watch())
-        tp.child = child
+        tp.children[0].joinhandle = asyncio.create_task(watch())
+        tp.children[0].child = child
         tp.task.pid = child.pid
-        tp.task.status = "executing"
+        tasks.update(tp.task.id, "executing")
         tp.task.code = None
-
-        asyncio.create_task(cache())
-
-        return Response.success(f"Task [{tf.id}:{tp.task.name}] executing")
-    elif isinstance(tp.task.task_type, ScheduledTask):
-        child = await tp.task.start()
+        # a sync task may already be executing, the status does not change
+        scheduler.schedule(tp.task)
+
+        cache(tp.task.id)
+
+        return Response.success(f"Task [{tp.task.id}:{tp.task.name}] executing")
+    elif isinstance(tp.task.task_type, (ScheduledTask, CronTask)):
+        group = tp.task.group
+        if not await _admit(tp, group):
+            return Response.failed(f"Task [{tp.task.id}:{tp.task.name}] left the queue")
+        try:
+            child = await _spawn(tp)
+        except Exception:
+            admission.release(group)
+            tasks.update(tp.task.id, "waiting")
+            raise
 
         async def watch():
             await child.wait()
+            admission.release(group)
             returncode = child.returncode
             await update(tp.task.id, None, "waiting", returncode, False, ["processing"])
-            asyncio.create_task(cache())
+            cache(tp.task.id)
 
-        tp.joinhandle = asyncio.create_task(watch())
-        tp.child = child
+        tp.children[0].joinhandle = asyncio.create_task(watch())
+        tp.children[0].child = child
         tp.task.pid = child.pid
-        tp.task.status = "processing"
+        tasks.update(tp.task.id, "processing")
         tp.task.code = None
 
-        asyncio.create_task(cache())
+        cache(tp.task.id)
 
-        return Response.success(f"Task [{tf.id}:{tp.task.name}] processing")
+        return Response.success(f"Task [{tp.task.id}:{tp.task.name}] processing")
     raise ValueError("Task type not supported")
 
 
-async def stop(tf: TaskFlag, to_cache: bool = True) -> Response:
-    tp = tasks.get(tf.id)
-    if tp is None:
-        raise ValueError(f"Task [{tf.id}] not exists")
+def _resize(tp: TaskProcess) -> None:
+    """
+    Match the instances of an async task to its `instances` count.
+    :param tp: TaskProcess
+    :return: None
+    """
+    count = max(1, tp.task.task_type.instances)
+    del tp.children[count:]
+    for index in range(len(tp.children), count):
+        tp.children.append(Instance(index))
 
-    if tp.task.status != "running" and tp.task.status != "auto restart":
-        raise ValueError(f"Task [{tf.id}:{tp.task.name}] is not running")
 
-    pid = tp.task.pid
-    if pid is None:
-        raise ValueError(f"Task [{tf.id}:{tp.task.name}] is not running")
+def _settle(tp: TaskProcess) -> None:
+    """
+    Derive the status and pid of an async task from its instances: running while
+    any instance runs, auto restart while any waits for a restart, idle while an
+    on-demand task waits for a connection, else stopped.
+    :param tp: TaskProcess
+    :return: None
+    """
+    statuses = {inst.status for inst in tp.children}
+    if "running" in statuses:
+        status = "running"
+    elif "auto restart" in statuses:
+        status = "auto restart"
+    elif tp.activator is not None and tp.activator.armed:
+        status = "idle"
+    else:
+        status = "stopped"
+    pids = [inst.pid for inst in tp.children if inst.status == "running" and inst.pid is not None]
+    tp.task.pid = pids[0] if len(pids) > 0 else None
+    tasks.update(tp.task.id, status)
+
+
+async def _start_all(tp: TaskProcess) -> None:
+    """
+    Start every instance of an async task.
+    :param tp: TaskProcess
+    :return: None
+    """
+    _resize(tp)
+    tp.task.code = None
+    try:
+        for inst in tp.children:
+            await _start_instance(tp, inst)
+    finally:
+        _settle(tp)
+        cache(tp.task.id)
+
+
+def _idle(tp: TaskProcess) -> None:
+    """
+    Leave an on-demand task idle, watching its listening sockets for a connection.
+    :param tp: TaskProcess
+    :return: None
+    """
+    if not tp.task.listen:
+        raise ValueError(f"Task [{tp.task.id}:{tp.task.name}] is on demand but has no listen address")
+    if tp.activator is None:
+        fds = listeners.acquire(tp.task.listen)
+        tp.activator = Activator(tp.task.listen, fds, lambda: asyncio.create_task(_activate(tp)))
+    tp.activator.arm()
+    _settle(tp)
+    cache(tp.task.id)
 
+
+async def _activate(tp: TaskProcess) -> None:
+    """
+    Spawn an idle on-demand task on its first connection and watch it for idleness.
+    :param tp: TaskProcess
+    :return: None
+    """
+    act = tp.activator
+    if tasks.get(tp.task.id) is not tp or act is None or tp.task.status != "idle":
+        return
     try:
-        os.kill(pid, signal.SIGTERM)
-        tp.task.status = "stopped"
-        if to_cache:
-            asyncio.create_task(cache())
-        return Response.success(f"Task [{tf.id}:{tp.task.name}] stopped")
-    except ProcessLookupError:
-        raise ValueError(f"Task [{tf.id}:{tp.task.name}] is not running")
+        await _start_all(tp)
+    except Exception as e:
+        logger.warning(f"Failed to activate task [{tp.task.id}:{tp.task.name}]: {e}")
+        # the connection is still queued, re-arming would spawn again right away
+        act.close()
+        tp.activator = None
+        _settle(tp)
+        cache(tp.task.id)
+        return
+    metrics.incr("activations")
+    latency = await act.accepted(lambda: tp.task.status in ("running", "auto restart"))
+    if latency is not None:
+        metrics.observe("activation_latency_ms", latency * 1000)
+    if tp.task.task_type.idle_timeout > 0 and tp.activator is act:
+        act.idler = asyncio.create_task(_idle_watch(tp, act))
+
+
+async def _idle_watch(tp: TaskProcess, act: Activator) -> None:
+    """
+    Stop an activated task once no connection was queued or established for
+    `idle_timeout` seconds, and go back to idle.
+    :param tp: TaskProcess
+    :param act: Activator of the task
+    :return: None
+    """
+    timeout = tp.task.task_type.idle_timeout
+    last = time.monotonic()
+    while True:
+        await asyncio.sleep(min(timeout / 4, 5))
+        if tasks.get(tp.task.id) is not tp or tp.activator is not act or act.armed:
+            return
+        if tp.task.status not in ("running", "auto restart"):
+            return
+        now = time.monotonic()
+        if await asyncio.to_thread(act.active):
+            last = now
+        elif now - last >= timeout:
+            break
+    act.idler = None
+    act.arm()
+    children = [_terminate(inst) for inst in tp.children]
+    _settle(tp)
+    cache(tp.task.id)
+    metrics.incr("idle_stops")
+    await _halt_all(children, _stop_timeout(tp))
+
+
+async def _start_instance(tp: TaskProcess, inst: Instance) -> None:
+    inst.cancel_restart()
+    child = await _spawn(tp, inst.index)
+    inst.child = child
+    inst.status = "running"
+    inst.started_at = time.monotonic()
+    inst.joinhandle = asyncio.create_task(_watch(tp, inst, child))
+
+
+async def _watch(tp: TaskProcess, inst: Instance, child: Child) -> None:
+    """
+    Wait for an async task instance to exit and schedule its restart when it
+    failed, while the task's `max_restart` budget, shared by its instances, lasts.
+    :param tp: TaskProcess
+    :param inst: Instance
+    :param child: Child the instance was started with
+    :return: None
+    """
+    await child.wait()
+    exited = time.monotonic()
+    if inst.child is not child or inst not in tp.children:
+        # restarted or scaled away meanwhile
+        return
+    returncode = child.returncode
+    task_type = tp.task.task_type
+    tp.task.code = returncode
+
+    if (inst.status == "running" and returncode not in (None, 0, -15)
+            and task_type.has_restart < task_type.max_restart and tasks.get(tp.task.id) is tp):
+        task_type.has_restart += 1
+        inst.status = "auto restart"
+        inst.pending = asyncio.create_task(_restart_later(tp, inst, exited))
+    else:
+        inst.status = "stopped"
+    if tp.activator is not None and all(i.status == "stopped" for i in tp.children):
+        # an on-demand task that exited on its own waits for the next connection
+        tp.activator.arm()
+    _settle(tp)
+    cache(tp.task.id)
+
+
+async def _restart_later(tp: TaskProcess, inst: Instance, exited: float) -> None:
+    """
+    Restart an exited async task instance after its backoff delay and a token of
+    the global restart bucket, unless it was stopped, started or removed meanwhile.
+    :param tp: TaskProcess
+    :param inst: Instance
+    :param exited: Monotonic time the child exited
+    :return: None
+    """
+    if inst.started_at is not None and exited - inst.started_at >= restarter.limit:
+        # ran long enough, the crash loop is over
+        inst.failures = 0
+    delay = restarter.delay(inst.failures)
+    inst.failures += 1
+    inst.restart_at = time.time() + delay
+
+    await asyncio.sleep(delay)
+    await restarter.acquire()
+
+    if tasks.get(tp.task.id) is not tp or inst.status != "auto restart" or inst not in tp.children:
+        return
+    inst.pending = None
+    inst.restart_at = None
+    try:
+        await _start_instance(tp, inst)
+    except Exception as e:
+        logger.warning(f"Failed to restart task [{tp.task.id}:{tp.task.name}] instance [{inst.index}]: {e}")
+        inst.status = "stopped"
+        return
+    finally:
+        _settle(tp)
+        cache(tp.task.id)
+    metrics.incr("restarts")
+    history.restart(tp.task.id, time.time())
+    metrics.observe("restart_latency_ms", (time.monotonic() - exited) * 1000)
+
+
+def _signal_group(pgid: int, sig: int) -> bool:
+    """
+    Signal the process group of a task process, every task process leads its own session.
+    :param pgid: Pid of the task process
+    :param sig: Signal, 0 only checks for a process left in the group
+    :return: False if no process of the group is left
+    """
+    try:
+        os.killpg(pgid, sig)
+    except (ProcessLookupError, PermissionError):
+        return False
+    return True
+
+
+def _in_groups(pgid: int, groups: Optional[Set[int]]) -> bool:
+    return _signal_group(pgid, 0) and (groups is None or pgid in groups)
+
+
+async def _group_alive(pgid: int) -> bool:
+    """
+    Whether a process of the group is left. Zombies do not count: orphans are
+    reaped by init, which a container may not have.
+    :param pgid: Pid of the task process
+    :return: bool
+    """
+    if not _signal_group(pgid, 0):
+        return False
+    return _in_groups(pgid, await sampler.groups())
+
+
+def _stop_timeout(tp: TaskProcess, deadline: Optional[float] = None) -> float:
+    timeout = tasks.stop_timeout if tp.task.stop_timeout is None else tp.task.stop_timeout
+    if deadline is not None:
+        timeout = min(timeout, max(deadline - time.monotonic(), 0))
+    return timeout
+
+
+def _terminate(inst: Instance) -> Optional[Child]:
+    """
+    Stop an instance: cancel its pending restart and SIGTERM its process group.
+    :param inst: Instance
+    :return: Child to `_halt`, None if nothing was running
+    """
+    inst.cancel_restart()
+    child = inst.child if inst.status == "running" and inst.pid is not None else None
+    inst.status = "stopped"
+    if child is not None:
+        _signal_group(child.pid, signal.SIGTERM)
+    return child
+
+
+async def _halt(child: Child, timeout: float) -> bool:
+    """
+    Wait for a task process signalled with SIGTERM and the rest of its process
+    group to exit, SIGKILL the group if anything is left after `timeout` seconds.
+    :param child: Child
+    :param timeout: Seconds
+    :return: True if the group was killed
+    """
+    deadline = time.monotonic() + timeout
+    try:
+        await asyncio.wait_for(child.wait(), timeout)
+    except asyncio.TimeoutError:
+        pass
+    # the leader is reaped, forked descendants may still run
+    killed = False
+    while await _group_alive(child.pid):
+        now = time.monotonic()
+        if not killed and now >= deadline:
+            _signal_group(child.pid, signal.SIGKILL)
+            metrics.incr("stop_kills")
+            killed = True
+        elif killed and now >= deadline + KILL_WAIT:
+            break
+        await asyncio.sleep(STOP_POLL)
+    return killed
+
+
+async def _halt_all(children: List[Child], timeout: float) -> int:
+    killed = await asyncio.gather(*(_halt(child, timeout) for child in children if child is not None))
+    return sum(killed)
+
+
+def _halt_sync(children: List[Tuple[Child, float]], deadline: float) -> None:
+    """
+    `_halt` without an event loop, for the exit handler: SIGTERM every group,
+    wait up to each timeout and at most `deadline` seconds, SIGKILL the rest.
+    :param children: Child and its stop timeout
+    :param deadline: Seconds
+    :return: None
+    """
+    begin = time.monotonic()
+    for child, _ in children:
+        _signal_group(child.pid, signal.SIGTERM)
+    left = children
+    while len(left) > 0:
+        now = time.monotonic() - begin
+        for child, _ in left:
+            try:
+                # nothing reaps the leader any more
+                os.waitpid(child.pid, os.WNOHANG)
+            except ChildProcessError:
+                pass
+        groups = live_groups()
+        alive = []
+        for child, timeout in left:
+            if not _in_groups(child.pid, groups):
+                continue
+            if now >= min(timeout, deadline):
+                _signal_group(child.pid, signal.SIGKILL)
+                continue
+            alive.append((child, timeout))
+        left = alive
+        if len(left) > 0:
+            time.sleep(STOP_POLL)
+
+
+async def stop(tf: TaskFlag, to_cache: bool = True, deadline: Optional[float] = None) -> Response:
+    """
+    Stop an async task: SIGTERM the process group of every instance, wait up to
+    the task's `stop_timeout` for the groups to exit, then SIGKILL what is left.
+    :param tf: TaskFlag
+    :param to_cache: Cache the status
+    :param deadline: Monotonic time the stop must be done by, bounds `stop_timeout`
+    :return: Response
+    """
+    tp = _lookup(tf)
+
+    if tp.task.status not in ("running", "auto restart", "idle"):
+        raise ValueError(f"Task [{tp.task.id}:{tp.task.name}] is not running")
+
+    if tp.activator is not None:
+        tp.activator.close()
+        tp.activator = None
+
+    # instances waiting for a restart only have it cancelled, the running ones are signalled together
+    children = [_terminate(inst) for inst in tp.children]
+    timeout = _stop_timeout(tp, deadline)
+    killed = await _halt_all(children, timeout)
+    _settle(tp)
+    if to_cache:
+        cache(tp.task.id)
+    if killed > 0:
+        return Response.success(f"Task [{tp.task.id}:{tp.task.name}] stopped, killed after {timeout:g}s")
+    return Response.success(f"Task [{tp.task.id}:{tp.task.name}] stopped")
+
+
+async def stop_many(tfs: List[TaskFlag]) -> List[Response]:
+    """
+    Stop tasks concurrently, all of them within the daemon's `stop_deadline`.
+    :param tfs: List[TaskFlag]
+    :return: List[Response], in the order of `tfs`
+    """
+    deadline = time.monotonic() + tasks.stop_deadline
+
+    async def one(tf: TaskFlag) -> Response:
+        try:
+            return await stop(tf, deadline=deadline)
+        except Exception as e:
+            # one result per task, a failure does not hide what happened to the others
+            return Response.failed(str(e))
+
+    return list(await asyncio.gather(*(one(tf) for tf in tfs)))
+
+
+async def shutdown() -> None:
+    """
+    Stop the processes of every task on daemon exit, concurrently and within
+    `stop_deadline`. Statuses are left as they are, a daemon started with `-l`
+    restores the tasks that were running.
+    :return: None
+    """
+    tasks.closing = True
+    deadline = time.monotonic() + tasks.stop_deadline
+    halts = []
+    for tp in tasks.get_all().values():
+        if tp.activator is not None:
+            tp.activator.close()
+        for inst in tp.children:
+            inst.cancel_restart()
+            child = inst.child
+            if child is None or child.returncode is not None:
+                continue
+            # keeps `_watch` from restarting it
+            inst.status = "stopped"
+            _signal_group(child.pid, signal.SIGTERM)
+            halts.append(_halt(child, _stop_timeout(tp, deadline)))
+    if len(halts) > 0:
+        killed = sum(await asyncio.gather(*halts))
+        logger.info(f"Stopped {len(halts)} processes, {killed} killed")
+
+
+async def scale(sf: ScaleFlag) -> Response:
+    """
+    Set the instance count of an async task. Running instances are kept, the
+    missing ones are started and the ones past the count are stopped.
+    :param sf: ScaleFlag
+    :return: Response
+    """
+    tp = _lookup(sf)
+
+    if not isinstance(tp.task.task_type, AsyncTask):
+        raise ValueError(f"Task [{tp.task.id}:{tp.task.name}] is not an async task")
+
+    if sf.instances < 1:
+        raise ValueError(f"Invalid instances [{sf.instances}], at least 1")
+
+    tp.task.task_type.instances = sf.instances
+    if tp.task.status in ("running", "auto restart"):
+        children = [_terminate(inst) for inst in tp.children[sf.instances:]]
+        del tp.children[sf.instances:]
+        try:
+            for index in range(len(tp.children), sf.instances):
+                inst = Instance(index)
+                tp.children.append(inst)
+                await _start_instance(tp, inst)
+        finally:
+            _settle(tp)
+            cache(tp.task.id)
+        await _halt_all(children, _stop_timeout(tp))
+    else:
+        _resize(tp)
+        cache(tp.task.id)
+
+    return Response.success(f"Task [{tp.task.id}:{tp.task.name}] scaled to {sf.instances} instances")
 
 
 async def restart(tf: TaskFlag) -> Response:
@@ -331,56 +1034,244 @@ async def restart(tf: TaskFlag) -> Response:
     return await start(tf)
 
 
-async def remove(tf: TaskFlag, to_cache: bool = True) -> Response:
-    if tf.id > 0:
-        tp = tasks.get(tf.id)
-    else:
-        tp = tasks.get_by_name(tf.name)
+async def _ready(child: Child, delay: float) -> bool:
+    try:
+        await asyncio.wait_for(child.wait(), delay)
+    except asyncio.TimeoutError:
+        return True
+    return False
+
+
+async def rolling_restart(tf: TaskFlag) -> Response:
+    """
+    Replace the instances of a running async task one at a time: start the
+    replacement, wait until it stayed up `ready_delay` seconds, then stop the
+    old process. With `listen` both accept from the same daemon-held sockets
+    meanwhile, so no connection is refused.
+    :param tf: TaskFlag
+    :return: Response
+    """
+    tp = _lookup(tf)
+
+    if not isinstance(tp.task.task_type, AsyncTask):
+        raise ValueError(f"Task [{tp.task.id}:{tp.task.name}] is not an async task")
+
+    if tp.task.status != "running":
+        raise ValueError(f"Task [{tp.task.id}:{tp.task.name}] is not running")
+
+    replaced = 0
+    olds: List[Child] = []
+    try:
+        for inst in list(tp.children):
+            old = inst.child if inst.status == "running" else None
+            if old is None:
+                continue
+            child = await _spawn(tp, inst.index)
+            if not await _ready(child, tp.task.task_type.ready_delay):
+                raise ValueError(f"Task [{tp.task.id}:{tp.task.name}] instance [{inst.index}] "
+                                 f"exited with code {child.returncode} before it was ready, "
+                                 f"{replaced} of {len(tp.children)} instances replaced")
+            if inst not in tp.children or inst.child is not old:
+                # stopped or scaled away meanwhile
+                child.terminate()
+                continue
+            inst.child = child
+            inst.started_at = time.monotonic()
+            inst.joinhandle = asyncio.create_task(_watch(tp, inst, child))
+            _signal_group(old.pid, signal.SIGTERM)
+            olds.append(old)
+            replaced += 1
+    finally:
+        _settle(tp)
+        cache(tp.task.id)
+        await _halt_all(olds, _stop_timeout(tp))
+
+    return Response.success(f"Task [{tp.task.id}:{tp.task.name}] rolling restarted {replaced} instances")
 
-    if tp is None:
-        raise ValueError(f"Task [{tf.id}] not exists")
+
+async def remove(tf: TaskFlag, to_cache: bool = True) -> Response:
+    tp = _lookup(tf)
 
     if tp.task.status == "running":
         raise ValueError("Task is running, please stop it first")
 
+    tp.cancel_restart()
+    if tp.activator is not None:
+        tp.activator.close()
+        tp.activator = None
+    admission.withdraw(tp.task.id)
     tasks.remove(tp.task.id)
 
     if to_cache:
-        asyncio.create_task(cache())
+        cache(tp.task.id)
 
-    return Response.success(f"Task [{tf.id}:{tp.task.name}] removed")
+    return Response.success(f"Task [{tp.task.id}:{tp.task.name}] removed")
 
 
 async def pause(tf: TaskFlag) -> Response:
-    if tf.id > 0:
-        tp = tasks.get(tf.id)
-    else:
-        tp = tasks.get_by_name(tf.name)
+    tp = _lookup(tf)
 
-    if tp.task.status != "interval" and tp.task.status != "executing":
+    if tp.task.status not in ("interval", "executing", "queued"):
         raise ValueError(f"Task [{tp.task.id}:{tp.task.name}] is not interval")
 
-    tp.task.status = "paused"
+    tasks.update(tp.task.id, "paused")
+    # a queued execution leaves the queue now, not when it is granted a slot
+    admission.withdraw(tp.task.id)
 
-    await cache()
+    cache(tp.task.id)
 
-    return Response.success(f"Task [{tf.id}:{tp.task.name}] paused")
+    return Response.success(f"Task [{tp.task.id}:{tp.task.name}] paused")
 
 
 async def resume(tf: TaskFlag) -> Response:
-    if tf.id > 0:
-        tp = tasks.get(tf.id)
-    else:
-        tp = tasks.get_by_name(tf.name)
+    tp = _lookup(tf)
 
     if tp.task.status != "paused":
         raise ValueError(f"Task [{tp.task.id}:{tp.task.name}] is not paused")
 
-    tp.task.status = "interval"
+    tasks.update(tp.task.id, "interval")
+
+    cache(tp.task.id)
+
+    return Response.success(f"Task [{tp.task.id}:{tp.task.name}] resumed")
+
+
+def _status(tp: TaskProcess) -> Status:
+    wait = tp.wait
+    queued_at = admission.queued_since(tp.task.id)
+    if queued_at is not None:
+        wait = time.time() - queued_at
+    pids = tp.pids()
+    # instances add up, the uptime is the oldest one's
+    slots = [slot for slot in (sampler.get(tp.task.id, pid) for pid in pids) if slot is not None]
+    cpus = [slot.cpu for slot in slots if slot.cpu is not None]
+    return Status(
+        id=tp.task.id,
+        group=tp.task.group,
+        name=tp.task.name,
+        command=tp.task.command,
+        args=tp.task.args,
+        dir=tp.task.dir,
+        env=tp.task.env,
+        stdin=tp.task.stdin,
+        stdout=tp.task.stdout,
+        stderr=tp.task.stderr,
+        created_at=tp.task.created_at,
+        task_type=tp.task.task_type,
+        pid=tp.task.pid,
+        status=tp.task.status,
+        exit_code=tp.task.code,
+        next_run=scheduler.next_run(tp.task.id) or tp.restart_at(),
+        wait=wait,
+        cpu=sum(cpus) if len(cpus) > 0 else None,
+        rss=sum(slot.rss for slot in slots) if len(slots) > 0 else None,
+        fds=sum(slot.fds for slot in slots) if len(slots) > 0 else None,
+        uptime=time.time() - min(slot.started for slot in slots) if len(slots) > 0 else None,
+        nice=tp.task.nice,
+        ionice=tp.task.ionice,
+        cpu_affinity=_affinity(tp, None),
+        rlimits=tp.task.rlimits() or None,
+        pids=pids if len(pids) > 1 else None,
+        activation=None if tp.activator is None else tp.activator.latency,
+    )
+
+
+def _lookup(tf: TaskFlag) -> TaskProcess:
+    """
+    The task a flag names, by id or else by name.
+    :param tf: TaskFlag
+    :return: TaskProcess
+    """
+    tp = tasks.get(tf.id) if tf.id > 0 else tasks.get_by_name(tf.name)
+    if tp is None:
+        raise ValueError(f"Task [{tf.id if tf.id > 0 else tf.name}] not exists")
+    return tp
+
 
-    await cache()
+def _select(condition: Optional[TaskFlag]) -> List[TaskProcess]:
+    if condition is None:
+        return list(tasks.get_all().values())
+    if condition.id > 0:
+        # condition by id
+        tp = tasks.get(condition.id)
+        return [] if tp is None else [tp]
+    elif condition.name is None and condition.group is not None:
+        # condition by group
+        return tasks.get_by_group(condition.group)
+    elif condition.name is None:
+        return list(tasks.get_all().values())
+    elif condition.mat:
+        # condition by name with regex
+        return [tp for tp in tasks.get_all().values() if re.match(condition.name, tp.task.name)]
+    else:
+        # condition by name
+        tp = tasks.get_by_name(condition.name)
+        return [] if tp is None else [tp]
 
-    return Response.success(f"Task [{tf.id}:{tp.task.name}] resumed")
+
+def is_selector(tf: Any) -> bool:
+    """
+    Whether a flag selects tasks by group or by name pattern rather than naming one.
+    :param tf: Request data
+    :return: bool
+    """
+    if not isinstance(tf, TaskFlag) or tf.id > 0:
+        return False
+    if tf.name is None:
+        return tf.group is not None
+    return tf.mat
+
+
+def resolve(tf: TaskFlag) -> List[TaskFlag]:
+    """
+    One flag per task selected by a group or a name pattern.
+    :param tf: TaskFlag, see `is_selector`
+    :return: List[TaskFlag], in id order
+    """
+    if tf.name is not None:
+        try:
+            re.compile(tf.name)
+        except re.error as e:
+            raise ValueError(f"Invalid name pattern [{tf.name}]: {e}")
+    selected = [TaskFlag(id=tp.task.id) for tp in _select(tf)]
+    if len(selected) == 0:
+        what = f"group [{tf.group}]" if tf.name is None else f"pattern [{tf.name}]"
+        raise ValueError(f"No task matches {what}")
+    return sorted(selected, key=lambda flag: flag.id)
+
+
+async def run_many(handler: Callable[[TaskFlag], Awaitable[Response]], tfs: List[TaskFlag]) -> List[Response]:
+    """
+    Run a flag command for several tasks concurrently, at most `bulk_concurrency`
+    at a time. Stops are not capped, they are bounded by `stop_deadline` instead.
+    :param handler: Command, e.g. `start`
+    :param tfs: List[TaskFlag]
+    :return: List[Response], in the order of `tfs`
+    """
+    if handler is stop:
+        return await stop_many(tfs)
+    semaphore = asyncio.Semaphore(tasks.bulk_concurrency)
+
+    async def one(tf: TaskFlag) -> Response:
+        async with semaphore:
+            try:
+                return await handler(tf)
+            except Exception as e:
+                # one result per task, a failure does not hide what happened to the others
+                return Response.failed(str(e))
+
+    return list(await asyncio.gather(*(one(tf) for tf in tfs)))
+
+
+async def bulk(handler: Callable[[TaskFlag], Awaitable[Response]], tf: TaskFlag) -> Response:
+    """
+    Run a flag command for every task of a group or a name pattern.
+    :param handler: Command, e.g. `start`
+    :param tf: TaskFlag, see `is_selector`
+    :return: Response with the response of each task under `Results`
+    """
+    results = await run_many(handler, resolve(tf))
+    return Response.success({"Results": [r.into_dict() for r in results]})
 
 
 async def lst(condition: Optional[TaskFlag]) -> Response:
@@ -389,98 +1280,33 @@ async def lst(condition: Optional[TaskFlag]) -> Response:
     :param condition: Optional[TaskFlag]
     :return: Response
     """
-    if condition is None:
-        # list all task status
-        statuses = []
-        for k, v in tasks.get_all().items():
-            status = Status(
-                id=k,
-                group=v.task.group,
-                name=v.task.name,
-                command=v.task.command,
-                args=v.task.args,
-                dir=v.task.dir,
-                env=v.task.env,
-                stdin=v.task.stdin,
-                stdout=v.task.stdout,
-                stderr=v.task.stderr,
-                created_at=v.task.created_at,
-                task_type=v.task.task_type,
-                pid=v.task.pid,
-                status=v.task.status,
-                exit_code=v.task.code,
-            )
-            statuses.append(status)
-        return Response.success(statuses)
-    else:
-        # list task status by condition
-        if condition.id > 0:
-            # condition by id
-            tp = tasks.get(condition.id)
-            if tp is None:
-                return Response.success([])
-            status = Status(
-                id=tp.task.id,
-                group=tp.task.group,
-                name=tp.task.name,
-                command=tp.task.command,
-                args=tp.task.args,
-                dir=tp.task.dir,
-                env=tp.task.env,
-                stdin=tp.task.stdin,
-                stdout=tp.task.stdout,
-                stderr=tp.task.stderr,
-                created_at=tp.task.created_at,
-                task_type=tp.task.task_type,
-                pid=tp.task.pid,
-                status=tp.task.status,
-                exit_code=tp.task.code,
-            )
-            return Response.success([status])
-        elif condition.mat:
-            # condition by name with regex
-            statuses = []
-            for k, v in tasks.get_all().items():
-                if re.match(condition.name, v.task.name):
-                    status = Status(
-                        id=k,
-                        group=v.task.group,
-                        name=v.task.name,
-                        command=v.task.command,
-                        args=v.task.args,
-                        dir=v.task.dir,
-                        env=v.task.env,
-                        stdin=v.task.stdin,
-                        stdout=v.task.stdout,
-                        stderr=v.task.stderr,
-                        created_at=v.task.created_at,
-                        task_type=v.task.task_type,
-                        pid=v.task.pid,
-                        status=v.task.status,
-                        exit_code=v.task.code,
-                    )
-                    statuses.append(status)
-            return Response.success(statuses)
-        else:
-            # condition by name
-            tp = tasks.get_by_name(condition.name)
-            if tp is None:
-                return Response.success([])
-            status = Status(
-                id=tp.task.id,
-                group=tp.task.group,
-                name=tp.task.name,
-                command=tp.task.command,
-                args=tp.task.args,
-                dir=tp.task.dir,
-                env=tp.task.env,
-                stdin=tp.task.stdin,
-                stdout=tp.task.stdout,
-                stderr=tp.task.stderr,
-                created_at=tp.task.created_at,
-                task_type=tp.task.task_type,
-                pid=tp.task.pid,
-                status=tp.task.status,
-                exit_code=tp.task.code,
-            )
-            return Response.success([status])
+    return Response.success([_status(tp) for tp in _select(condition)])
+
+
+async def stats(sf: StatsFlag) -> Response:
+    """
+    Resource history of tasks, `points` points at the finest resolution of at least `step` seconds.
+    :param sf: StatsFlag
+    :return: Response
+    """
+    now = time.time()
+    result = []
+    for tp in _select(sf):
+        points = history.query(tp.task.id, sf.step, sf.points, now)
+        if points is not None:
+            result.append({"id": tp.task.id, "name": tp.task.name, **points})
+    return Response.success({"Stats": result})
+
+
+async def get_metrics() -> Response:
+    """
+    Get daemon metrics.
+    :return: Response
+    """
+    result = metrics.get_all()
+    result["fd_pool_size"] = fd_pool.size()
+    result["capture_sinks"] = capturer.size()
+    result["listen_sockets"] = listeners.size()
+    # executions waiting for an admission slot
+    result["admission_queue"] = admission.depth()
+    return Response.success(result)
@@ -0,0 +1,87 @@
+import os
+import socket
+import stat
+from typing import Dict, List
+
+from common.listen import parse_address
+
+
+BACKLOG = 1024
+
+
+def _bind(address: str) -> socket.socket:
+    family, addr = parse_address(address)
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    try:
+        if family == socket.AF_UNIX:
+            # a socket file left by a previous daemon, anything else is kept
+            if os.path.exists(addr) and stat.S_ISSOCK(os.stat(addr).st_mode):
+                os.unlink(addr)
+        else:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind(addr)
+        sock.listen(BACKLOG)
+    except OSError:
+        sock.close()
+        raise
+    return sock
+
+
+class Listeners:
+    """
+    Listening sockets held by the daemon for tasks declaring `listen`.
+
+    A socket is bound on the first spawn that needs it and stays open while
+    a task references its address, so connections queue in its backlog
+    between two processes instead of being refused. Children get a copy at
+    fd 3 onwards, see `common.spawn.listen_exec`.
+    """
+    _instance = None
+
+    def __init__(self) -> None:
+        self._sockets: Dict[str, socket.socket] = {}
+        self._refs: Dict[str, int] = {}
+
+    def acquire(self, addresses: List[str]) -> List[int]:
+        """
+        Descriptors of the sockets of `addresses`, in order, bound if needed.
+        :param addresses: Listen addresses
+        :return: List[int]
+        """
+        fds = []
+        for address in addresses:
+            sock = self._sockets.get(address)
+            if sock is None:
+                sock = self._sockets[address] = _bind(address)
+            fds.append(sock.fileno())
+        return fds
+
+    def retain(self, address: str) -> None:
+        self._refs[address] = self._refs.get(address, 0) + 1
+
+    def release(self, address: str) -> None:
+        refs = self._refs.get(address, 0) - 1
+        if refs > 0:
+            self._refs[address] = refs
+            return
+        self._refs.pop(address, None)
+        sock = self._sockets.pop(address, None)
+        if sock is not None:
+            family = sock.family
+            sock.close()
+            if family == socket.AF_UNIX:
+                try:
+                    os.unlink(parse_address(address)[1])
+                except OSError:
+                    pass
+
+    def size(self) -> int:
+        return len(self._sockets)
+
+    def __new__(cls) -> "Listeners":
+        if cls._instance is None:
+            cls._instance = super(Listeners, cls).__new__(cls)
+        return cls._instance
+
+
+listeners = Listeners()
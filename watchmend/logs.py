@@ -0,0 +1,193 @@
+import asyncio
+import json
+import os
+from typing import Optional, Tuple
+
+from common.handle import Response
+from common.task import LogsFlag
+from common.utils import get_with_home
+from watchmend.capture import Ring
+from watchmend.lib import TaskProcess, tasks
+
+
+# bytes read per step of the reverse tail scan and of a follow read
+BLOCK = 65536
+
+# seconds between checks for new output while following
+POLL = 0.2
+
+
+def tail(path: str, lines: int) -> Tuple[bytes, int]:
+    """
+    Last `lines` lines of a file, scanning blocks backwards from its end, so
+    the cost depends on the lines returned and not on the file size.
+    Blocking, run it in a worker thread.
+    :param path: File path
+    :param lines: Line count
+    :return: (data, file offset the data ends at)
+    """
+    with open(path, "rb") as f:
+        end = f.seek(0, os.SEEK_END)
+        if lines <= 0:
+            return b"", end
+        pos = end
+        blocks = []
+        newlines = 0
+        # a trailing newline ends the last line, it does not start a new one
+        skip = 1
+        while pos > 0 and newlines <= lines:
+            size = min(BLOCK, pos)
+            pos -= size
+            f.seek(pos)
+            block = f.read(size)
+            if skip and block.endswith(b"\n"):
+                newlines -= 1
+            skip = 0
+            newlines += block.count(b"\n")
+            blocks.append(block)
+        data = b"".join(reversed(blocks))
+    return _last_lines(data, lines), end
+
+
+def _last_lines(data: bytes, lines: int) -> bytes:
+    if lines <= 0:
+        return b""
+    pos = len(data)
+    if data.endswith(b"\n"):
+        pos -= 1
+    for _ in range(lines):
+        pos = data.rfind(b"\n", 0, pos)
+        if pos < 0:
+            return data
+    return data[pos + 1:]
+
+
+def _find(flag: LogsFlag) -> Optional[TaskProcess]:
+    if flag.id > 0:
+        return tasks.get(flag.id)
+    return tasks.get_by_name(flag.name)
+
+
+def _source(tp: TaskProcess) -> Tuple[Optional[str], Optional[Ring]]:
+    if tp.task.stdout is not None:
+        return os.path.realpath(get_with_home(tp.task.stdout)), None
+    if tp.capture is not None:
+        return None, tp.capture.ring
+    return None, None
+
+
+async def _read(flag: LogsFlag) -> Tuple[TaskProcess, bytes, int]:
+    tp = _find(flag)
+    if tp is None:
+        raise ValueError(f"Task [{flag.id or flag.name}] not exists")
+    path, ring = _source(tp)
+    if ring is not None:
+        return tp, _last_lines(ring.tail(), flag.lines), ring.total
+    if path is not None:
+        if not os.path.exists(path):
+            return tp, b"", 0
+        data, end = await asyncio.to_thread(tail, path, flag.lines)
+        return tp, data, end
+    raise ValueError(f"Task [{tp.task.id}:{tp.task.name}] has no output")
+
+
+async def logs(flag: LogsFlag) -> Response:
+    """
+    Last lines of a task's output, read from its stdout file or, for a
+    captured task without one, from its ring buffer.
+    :param flag: LogsFlag
+    :return: Response
+    """
+    _, data, _ = await _read(flag)
+    return Response.success(data.decode("utf-8", errors="replace"))
+
+
+async def stream(flag: LogsFlag, reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                 prefix: bytes = b"") -> None:
+    """
+    Answer a following `Logs` request: the usual json response with the last
+    lines, a newline, then raw output as it is written until the client
+    disconnects. Output is read only after the previous chunk was drained,
+    so a slow client slows the reads down instead of growing daemon buffers.
+    :param flag: LogsFlag
+    :param reader: Client stream, EOF ends the follow
+    :param writer: Client stream
+    :param prefix: Written before the response (http status line and headers)
+    :return: None
+    """
+    try:
+        tp, data, position = await _read(flag)
+        response = Response.success(data.decode("utf-8", errors="replace"))
+    except ValueError as e:
+        tp, position = None, 0
+        response = Response.failed(str(e))
+    writer.write(prefix + json.dumps([response.into_dict()]).encode("utf-8") + b"\n")
+    await writer.drain()
+    if tp is None:
+        return
+
+    path, ring = _source(tp)
+    closed = asyncio.create_task(reader.read())
+    try:
+        if ring is not None:
+            await _follow_ring(ring, position, writer, closed)
+        elif path is not None:
+            await _follow_file(path, position, writer, closed)
+    except (ConnectionError, OSError):
+        pass
+    finally:
+        closed.cancel()
+
+
+async def _wait(closed: asyncio.Task) -> bool:
+    """
+    Sleep one poll interval, True if the client went away meanwhile.
+    """
+    done, _ = await asyncio.wait([closed], timeout=POLL)
+    return len(done) > 0
+
+
+async def _follow_ring(ring: Ring, seen: int, writer: asyncio.StreamWriter, closed: asyncio.Task) -> None:
+    while True:
+        if ring.total > seen:
+            # older bytes were overwritten if the client fell a whole ring behind
+            writer.write(ring.tail(min(ring.total - seen, len(ring.buf))))
+            seen = ring.total
+            await writer.drain()
+        elif await _wait(closed):
+            return
+
+
+async def _follow_file(path: str, offset: int, writer: asyncio.StreamWriter, closed: asyncio.Task) -> None:
+    f = None
+    try:
+        while True:
+            if f is None:
+                try:
+                    f = open(path, "rb")
+                except FileNotFoundError:
+                    if await _wait(closed):
+                        return
+                    continue
+                if os.fstat(f.fileno()).st_size >= offset:
+                    f.seek(offset)
+                offset = 0
+            chunk = await asyncio.to_thread(f.read, BLOCK)
+            if chunk:
+                writer.write(chunk)
+                await writer.drain()
+                continue
+            try:
+                st = os.stat(path)
+                if st.st_ino != os.fstat(f.fileno()).st_ino or st.st_size < f.tell():
+                    # rotated or truncated, continue from the start of the new file
+                    f.close()
+                    f = None
+                    continue
+            except FileNotFoundError:
+                pass
+            if await _wait(closed):
+                return
+    finally:
+        if f is not None:
+            f.close()
@@ -1,13 +1,52 @@
 import asyncio
+import signal
 
+from .admission import admission
+from .capture import capturer
 from .engine import start
-from .monitor import run_monitor
+from .fdpool import fd_pool
+from .lib import flush, shutdown, tasks
+from .monitor import run_monitor, run_sampler
+from .restart import restarter
+from .scheduler import scheduler
 from common import Config, DaemonArgs, ExitCode, VERSION
+from common.env import snapshot
 
 
 async def _main(config: Config, load: bool) -> int:
+    # SIGTERM takes the same path as Ctrl-C so pending state is flushed
+    asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+    w = config.watchmen
+    restarter.configure(
+        base_ms=100 if w.restart_backoff_ms is None else w.restart_backoff_ms,
+        limit_ms=30000 if w.restart_backoff_max_ms is None else w.restart_backoff_max_ms,
+        jitter=0.2 if w.restart_jitter is None else w.restart_jitter,
+        rate=w.restart_rate or 20,
+        burst=w.restart_burst or 50,
+    )
+    admission.configure(limit=w.max_executions, group_limits=w.group_executions)
+    scheduler.splay_groups = frozenset(w.splay_groups or ())
+    tasks.group_affinity = w.group_affinity or {}
+    tasks.bulk_concurrency = w.bulk_concurrency or 32
+    tasks.stop_timeout = 10 if w.stop_timeout is None else w.stop_timeout
+    tasks.stop_deadline = 30 if w.stop_deadline is None else w.stop_deadline
+    fd_pool.configure(w.log_fd_limit or 256)
+    capturer.configure(
+        buffer=w.capture_buffer or 65536,
+        flush_ms=200 if w.capture_flush_ms is None else w.capture_flush_ms,
+        rotate_size=10 * 1024 * 1024 if w.log_rotate_size is None else (w.log_rotate_size or None),
+        keep=5 if w.log_rotate_keep is None else w.log_rotate_keep,
+        compress=bool(w.log_compress),
+    )
     asyncio.create_task(run_monitor(config.watchmen.interval or 5))
-    await start(config=config, load_cache=load)
+    sample_interval = 5 if w.sample_interval is None else w.sample_interval
+    if sample_interval > 0:
+        asyncio.create_task(run_sampler(sample_interval))
+    try:
+        await start(config=config, load_cache=load)
+    finally:
+        await shutdown()
+        await flush()
 
 
 def main() -> int:
@@ -18,9 +57,12 @@ def main() -> int:
 
     load: bool = clargs.load
 
+    # base environment of every task, taken before anything can change it
+    snapshot()
+
     config: Config = Config.init(path=clargs.config)
 
     try:
         asyncio.run(_main(config=config, load=load))
-    except KeyboardInterrupt:
+    except (KeyboardInterrupt, asyncio.CancelledError):
         return ExitCode.SUCCESS
@@ -0,0 +1,62 @@
+import bisect
+from typing import Any, Dict, List
+
+
+# histogram bucket upper bounds, milliseconds
+BUCKETS: List[float] = [1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000]
+
+
+class Histogram:
+    def __init__(self) -> None:
+        self.counts: List[int] = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(BUCKETS, value)] += 1
+        self.count += 1
+        self.sum += value
+
+
+class Metrics:
+    _instance = None
+
+    def __init__(self) -> None:
+        self._counters: Dict[str, int] = {}
+        self._histograms: Dict[str, Histogram] = {}
+
+    def incr(self, name: str, value: int = 1) -> None:
+        self._counters[name] = self._counters.get(name, 0) + value
+
+    def get(self, name: str) -> int:
+        return self._counters.get(name, 0)
+
+    def observe(self, name: str, value: float) -> None:
+        histogram = self._histograms.get(name)
+        if histogram is None:
+            histogram = self._histograms[name] = Histogram()
+        histogram.observe(value)
+
+    def get_all(self) -> Dict[str, Any]:
+        result: Dict[str, Any] = dict(self._counters)
+        result["cache_saved"] = self.get("cache_requested") - self.get("cache_written")
+        lookups = self.get("fd_pool_hits") + self.get("fd_pool_misses")
+        if lookups > 0:
+            result["fd_pool_hit_rate"] = round(self.get("fd_pool_hits") / lookups, 4)
+        for name, histogram in self._histograms.items():
+            # cumulative buckets, prometheus style
+            total = 0
+            for bound, count in zip(BUCKETS + ["+Inf"], histogram.counts):
+                total += count
+                result[f'{name}_bucket{{le="{bound}"}}'] = total
+            result[f"{name}_count"] = histogram.count
+            result[f"{name}_sum"] = round(histogram.sum, 3)
+        return result
+
+    def __new__(cls) -> "Metrics":
+        if cls._instance is None:
+            cls._instance = super(Metrics, cls).__new__(cls)
+        return cls._instance
+
+
+metrics = Metrics()
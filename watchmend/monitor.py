@@ -1,50 +1,55 @@
-
 import asyncio
-from datetime import datetime
-import time
-
-from .lib import get_all, start
-from common.task import AsyncTask, PeriodicTask, ScheduledTask, TaskFlag
-
-
-async def rerun_tasks(delay: int) -> None:
-    tasks = await get_all()
-    for _id, tp in tasks.items():
-        if isinstance(tp.task.task_type, AsyncTask):
-            if tp.task.status == 'auto restart':
-                await start(TaskFlag(id=_id, name=None, group=None, mat=False))
-        elif isinstance(tp.task.task_type, ScheduledTask):
-            now = datetime.now()
-            year = now.year if tp.task.task_type.year is None else tp.task.task_type.year
-            month = now.month if tp.task.task_type.month is None else tp.task.task_type.month
-            day = now.day if tp.task.task_type.day is None else tp.task.task_type.day
-            hour = now.hour if tp.task.task_type.hour is None else tp.task.task_type.hour
-            minute = now.minute if tp.task.task_type.minute is None else tp.task.task_type.minute
-            second = now.second if tp.task.task_type.second is None else tp.task.task_type.second
-            exec_dt = datetime(year, month, day, hour, minute, second)
-            exec_timestamp_utc = exec_dt.timestamp()
-            now_timestamp_utc = now.timestamp()
-            diff = abs(exec_timestamp_utc - now_timestamp_utc)
-            if diff < delay and exec_timestamp_utc <= now_timestamp_utc and tp.task.status == 'waiting':
-                async def inner():
-                    await asyncio.sleep(diff)
-                    await start(TaskFlag(id=_id, name=None, group=None, mat=False))
-                asyncio.create_task(inner())
-        elif isinstance(tp.task.task_type, PeriodicTask):
-            now = datetime.now().timestamp()
-            if now >= tp.task.task_type.started_after and now - tp.task.task_type.last_run >= tp.task.task_type.interval:
-                if tp.task.task_type.sync:
-                    if tp.task.status == "interval" or tp.task.status == "executing":
-                        await start(TaskFlag(id=_id, name=None, group=None, mat=False))
-                else:
-                    if tp.task.status == "interval":
-                        await start(TaskFlag(id=_id, name=None, group=None, mat=False))
+import logging
+from typing import List, Tuple
+
+from .lib import start, tasks
+from .sampler import sampler
+from .scheduler import scheduler
+from common.task import CronTask, PeriodicTask, ScheduledTask, TaskFlag
+
+
+logger = logging.getLogger("watchmen")
+
+# statuses in which a task may have a process, a paused periodic task may still be executing
+LIVE_STATUSES = ("running", "executing", "processing", "paused")
+
+
+async def rerun_task(task_id: int) -> None:
+    tp = tasks.get(task_id)
+    if tp is None:
+        return
+
+    rerun = False
+    if isinstance(tp.task.task_type, (ScheduledTask, CronTask)):
+        rerun = tp.task.status == "waiting"
+    elif isinstance(tp.task.task_type, PeriodicTask):
+        if tp.task.task_type.sync:
+            rerun = tp.task.status == "interval" or tp.task.status == "executing"
+        else:
+            rerun = tp.task.status == "interval"
+
+    if not rerun:
+        # state changed since the task was armed, re-arm from the current one
+        scheduler.schedule(tp.task)
+        return
+
+    try:
+        await start(TaskFlag(id=task_id, name=None, group=None, mat=False))
+    except Exception as e:
+        logger.warning(f"Failed to rerun task [{task_id}:{tp.task.name}]: {e}")
+
+
+def fire(task_id: int) -> None:
+    asyncio.create_task(rerun_task(task_id))
 
 
 async def run_monitor(interval: int) -> None:
-    while True:
-        start_time = time.time()
-        await rerun_tasks(5)
-        elapsed_time = time.time() - start_time
-        wait_time = max(0, interval - elapsed_time)
-        await asyncio.sleep(wait_time)
+    await scheduler.run(fire, interval)
+
+
+def _running() -> List[Tuple[int, int]]:
+    return [(tp.task.id, pid) for status in LIVE_STATUSES for tp in tasks.get_by_status(status) for pid in tp.pids()]
+
+
+async def run_sampler(interval: float) -> None:
+    await sampler.run(_running, interval)
@@ -0,0 +1,143 @@
+import asyncio
+import os
+import signal
+import subprocess
+from typing import Dict, List, Optional, Tuple, Union
+
+from common.spawn import Spawned
+from watchmend.metrics import metrics
+
+
+class Child:
+    """
+    Handle of a spawned process, the counterpart of `asyncio.subprocess.Process`
+    without a transport or a per-child watcher. Its exit is reported by the reaper.
+    """
+    __slots__ = ("pid", "returncode", "stdin", "_popen", "_exited")
+
+    def __init__(self, popen: Union[Spawned, subprocess.Popen], exited: asyncio.Future) -> None:
+        self.pid: int = popen.pid
+        self.returncode: Optional[int] = None
+        self.stdin = popen.stdin
+        self._popen = popen
+        self._exited = exited
+
+    async def wait(self) -> int:
+        return await asyncio.shield(self._exited)
+
+    def send_signal(self, sig: int) -> None:
+        if self.returncode is None:
+            os.kill(self.pid, sig)
+
+    def terminate(self) -> None:
+        self.send_signal(signal.SIGTERM)
+
+    def kill(self) -> None:
+        self.send_signal(signal.SIGKILL)
+
+    def _exit(self, returncode: int) -> None:
+        self.returncode = returncode
+        # keeps subprocess from polling a pid that is already reaped
+        self._popen.returncode = returncode
+        if self.stdin is not None:
+            try:
+                self.stdin.close()
+            except OSError:
+                pass
+        if not self._exited.done():
+            self._exited.set_result(returncode)
+
+
+class Reaper:
+    """
+    Central child reaper.
+
+    With `pidfd_open` (Linux 5.3+) every child gets a pidfd registered with
+    the event loop selector, otherwise SIGCHLD drains `waitpid(-1, WNOHANG)`.
+    Exits seen in one loop iteration are dispatched together in one callback.
+    """
+    _instance = None
+
+    def __init__(self) -> None:
+        self._children: Dict[int, Child] = {}
+        self._pidfds: Dict[int, int] = {}
+        self._exited: List[Tuple[int, int]] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.use_pidfd = hasattr(os, "pidfd_open")
+
+    def _start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        if self.use_pidfd:
+            try:
+                os.close(os.pidfd_open(os.getpid()))
+            except OSError:
+                self.use_pidfd = False
+        if not self.use_pidfd:
+            self._loop.add_signal_handler(signal.SIGCHLD, self._drain)
+            # a burst of exits overflows the loop's wakeup pipe, one pending byte is enough
+            signal.set_wakeup_fd(signal.set_wakeup_fd(-1), warn_on_full_buffer=False)
+
+    def watch(self, popen: Union[Spawned, subprocess.Popen]) -> Child:
+        """
+        Take over reaping of a spawned process.
+        :param popen: Process spawned without its own waiter
+        :return: Child
+        """
+        if self._loop is None:
+            self._start()
+        child = Child(popen, self._loop.create_future())
+        self._children[child.pid] = child
+        if self.use_pidfd:
+            fd = os.pidfd_open(child.pid)
+            self._pidfds[child.pid] = fd
+            self._loop.add_reader(fd, self._on_pidfd, child.pid)
+        else:
+            # the child may have exited before it was registered
+            self._drain()
+        return child
+
+    def _on_pidfd(self, pid: int) -> None:
+        fd = self._pidfds.pop(pid)
+        self._loop.remove_reader(fd)
+        os.close(fd)
+        try:
+            _, status = os.waitpid(pid, os.WNOHANG)
+        except ChildProcessError:
+            status = 0
+        self._push(pid, status)
+
+    def _drain(self) -> None:
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            if pid in self._children:
+                self._push(pid, status)
+
+    def _push(self, pid: int, status: int) -> None:
+        if len(self._exited) == 0:
+            self._loop.call_soon(self._dispatch)
+        self._exited.append((pid, status))
+
+    def _dispatch(self) -> None:
+        exited, self._exited = self._exited, []
+        for pid, status in exited:
+            child = self._children.pop(pid, None)
+            if child is not None:
+                child._exit(os.waitstatus_to_exitcode(status))
+        metrics.incr("reaped", len(exited))
+        metrics.incr("reap_batches")
+
+    def count(self) -> int:
+        return len(self._children)
+
+    def __new__(cls) -> "Reaper":
+        if cls._instance is None:
+            cls._instance = super(Reaper, cls).__new__(cls)
+        return cls._instance
+
+
+reaper = Reaper()
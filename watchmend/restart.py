@@ -0,0 +1,60 @@
+import asyncio
+import random
+import time
+
+
+class Restarter:
+    """
+    Restart policy for exited async tasks.
+
+    Each consecutive failure doubles the delay from `base` up to `limit`, with
+    +/- `jitter` of it randomized. A child that stayed up for `limit` seconds
+    starts again from `base`. On top of that every restart takes a token from
+    a global bucket of `burst` tokens refilled at `rate` per second, so a
+    crash-looping fleet cannot fork faster than `rate`.
+    """
+    _instance = None
+
+    def __init__(self) -> None:
+        self.configure()
+
+    def configure(self, base_ms: int = 100, limit_ms: int = 30000, jitter: float = 0.2,
+                  rate: float = 20, burst: int = 50) -> None:
+        self.base = base_ms / 1000
+        self.limit = max(limit_ms, base_ms) / 1000
+        self.jitter = min(max(jitter, 0.0), 1.0)
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+
+    def delay(self, failures: int) -> float:
+        """
+        Backoff before the next restart.
+        :param failures: Consecutive failures so far
+        :return: float seconds
+        """
+        delay = min(self.limit, self.base * (2 ** min(failures, 32)))
+        return delay * (1 + self.jitter * (2 * random.random() - 1))
+
+    async def acquire(self) -> None:
+        """
+        Wait for a token of the global restart bucket.
+        :return: None
+        """
+        while True:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    def __new__(cls) -> "Restarter":
+        if cls._instance is None:
+            cls._instance = super(Restarter, cls).__new__(cls)
+        return cls._instance
+
+
+restarter = Restarter()
@@ -0,0 +1,179 @@
+import asyncio
+import os
+import time
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from watchmend.history import history
+
+
+CLK_TCK = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+# seconds a `groups` pass is reused for
+GROUPS_TTL = 0.05
+
+
+def _boot_time() -> float:
+    try:
+        with open("/proc/stat", "rb") as f:
+            for line in f:
+                if line.startswith(b"btime "):
+                    return float(line.split()[1])
+    except OSError:
+        pass
+    return 0.0
+
+
+def read_pid(pid: int) -> Optional[Tuple[int, int, int, int]]:
+    """
+    Raw counters of one process from /proc.
+    :param pid: Process id
+    :return: (cpu ticks, start ticks since boot, rss bytes, open fds), None if it is gone
+    """
+    try:
+        with open(f"/proc/{pid}/stat", "rb") as f:
+            stat = f.read()
+        with open(f"/proc/{pid}/statm", "rb") as f:
+            statm = f.read()
+        fds = len(os.listdir(f"/proc/{pid}/fd"))
+    except OSError:
+        return None
+    # the command name may contain spaces and parens, fields start after the last ')'
+    fields = stat[stat.rfind(b")") + 2:].split()
+    ticks = int(fields[11]) + int(fields[12])
+    start = int(fields[19])
+    rss = int(statm.split()[1]) * PAGE_SIZE
+    return ticks, start, rss, fds
+
+
+def live_groups() -> Optional[Set[int]]:
+    """
+    Process groups with a process that is not a zombie, in one pass over /proc.
+    :return: Set of process group ids, None without /proc
+    """
+    try:
+        entries = os.listdir("/proc")
+    except OSError:
+        return None
+    groups = set()
+    for entry in entries:
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat", "rb") as f:
+                stat = f.read()
+        except OSError:
+            continue
+        fields = stat[stat.rfind(b")") + 2:].split()
+        if fields[0] != b"Z":
+            groups.add(int(fields[2]))
+    return groups
+
+
+class Slot:
+    """
+    Latest sample of one task.
+    """
+    __slots__ = ("pid", "ticks", "at", "cpu", "rss", "fds", "started")
+
+    def __init__(self, pid: int, ticks: int, at: float, rss: int, fds: int, started: float) -> None:
+        self.pid = pid
+        self.ticks = ticks
+        self.at = at
+        self.cpu: Optional[float] = None
+        self.rss = rss
+        self.fds = fds
+        self.started = started
+
+
+class Sampler:
+    """
+    Periodic /proc sampler for the processes of all tasks.
+
+    Every `interval` seconds the pids of running tasks are read in one pass
+    in a worker thread and folded into one slot per task process. CPU% is the
+    tick delta between two samples of the same pid. Readers only look slots
+    up, they never touch /proc. The sum over the processes of each task is
+    also folded into `history`.
+    """
+    _instance = None
+
+    def __init__(self) -> None:
+        self._slots: Dict[Tuple[int, int], Slot] = {}
+        self._boot = _boot_time()
+        self._groups: Optional[Set[int]] = None
+        self._groups_at: Optional[float] = None
+        self._groups_scan: Optional[asyncio.Task] = None
+
+    def get(self, task_id: int, pid: Optional[int]) -> Optional[Slot]:
+        return self._slots.get((task_id, pid))
+
+    async def groups(self) -> Optional[Set[int]]:
+        """
+        `live_groups`, read in a worker thread. One pass is shared by every
+        caller waiting for it and reused for GROUPS_TTL seconds.
+        :return: Set of process group ids, None without /proc
+        """
+        if self._groups_scan is None and (self._groups_at is None
+                                          or time.monotonic() - self._groups_at >= GROUPS_TTL):
+            self._groups_scan = asyncio.create_task(self._scan_groups())
+        if self._groups_scan is not None:
+            await asyncio.shield(self._groups_scan)
+        return self._groups
+
+    async def _scan_groups(self) -> None:
+        try:
+            self._groups = await asyncio.to_thread(live_groups)
+            self._groups_at = time.monotonic()
+        finally:
+            self._groups_scan = None
+
+    def _read(self, targets: List[Tuple[int, int]]) -> List[Tuple[int, int, Tuple[int, int, int, int]]]:
+        result = []
+        for task_id, pid in targets:
+            sample = read_pid(pid)
+            if sample is not None:
+                result.append((task_id, pid, sample))
+        return result
+
+    def _fold(self, samples: List[Tuple[int, int, Tuple[int, int, int, int]]], at: float) -> None:
+        slots: Dict[Tuple[int, int], Slot] = {}
+        for task_id, pid, (ticks, start, rss, fds) in samples:
+            old = self._slots.get((task_id, pid))
+            slot = Slot(pid, ticks, at, rss, fds, self._boot + start / CLK_TCK)
+            if old is not None and at > old.at:
+                slot.cpu = (ticks - old.ticks) / CLK_TCK / (at - old.at) * 100
+            slots[(task_id, pid)] = slot
+        self._slots = slots
+
+    def _record(self, at: float) -> None:
+        totals: Dict[int, List] = {}
+        for (task_id, _), slot in self._slots.items():
+            total = totals.setdefault(task_id, [None, 0])
+            if slot.cpu is not None:
+                total[0] = (total[0] or 0.0) + slot.cpu
+            total[1] += slot.rss
+        for task_id, (cpu, rss) in totals.items():
+            history.sample(task_id, at, cpu, rss)
+
+    async def run(self, targets: Callable[[], List[Tuple[int, int]]], interval: float) -> None:
+        """
+        Sample forever.
+        :param targets: Returns the (task id, pid) pairs to sample
+        :param interval: Seconds between samples
+        :return: None
+        """
+        while True:
+            pairs = targets()
+            samples = await asyncio.to_thread(self._read, pairs) if len(pairs) > 0 else []
+            self._fold(samples, time.monotonic())
+            self._record(time.time())
+            await asyncio.sleep(interval)
+
+    def __new__(cls) -> "Sampler":
+        if cls._instance is None:
+            cls._instance = super(Sampler, cls).__new__(cls)
+        return cls._instance
+
+
+sampler = Sampler()
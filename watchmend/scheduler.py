@@ -0,0 +1,154 @@
+import asyncio
+import heapq
+import math
+import time
+from functools import lru_cache
+from typing import Callable, Collection, Dict, List, Optional, Tuple
+
+from common.cron import Cron
+from common.task import CronTask, PeriodicTask, ScheduledTask, Task
+
+
+@lru_cache(maxsize=4096)
+def _fields(year: Optional[int], month: Optional[int], day: Optional[int],
+            hour: Optional[int], minute: Optional[int], second: Optional[int]) -> Cron:
+    return Cron.from_fields(year, month, day, hour, minute, second)
+
+
+def next_scheduled(st: ScheduledTask, after: float) -> Optional[float]:
+    """
+    Next time strictly after `after` matching the fields of a scheduled task,
+    fields left as None match any value.
+    :param st: ScheduledTask
+    :param after: Timestamp
+    :return: Optional[float]
+    """
+    return _fields(st.year, st.month, st.day, st.hour, st.minute, st.second).next(after)
+
+
+def splay_offset(task_id: int, interval: int) -> float:
+    """
+    Stable offset of a task inside its interval. Fibonacci hashing of the id
+    spreads consecutive ids evenly over the period.
+    :param task_id: Task id
+    :param interval: Interval in seconds
+    :return: float
+    """
+    return ((task_id * 0x9E3779B97F4A7C15) & 0xFFFFFFFFFFFFFFFF) / 2 ** 64 * interval
+
+
+def next_fire(task: Task, now: float, splay_groups: Collection[str] = ()) -> Optional[float]:
+    """
+    Next time the monitor has to act on a task in its current state, None if never.
+    :param task: Task
+    :param now: Timestamp
+    :param splay_groups: Groups whose periodic tasks are splayed
+    :return: Optional[float]
+    """
+    task_type = task.task_type
+    if isinstance(task_type, PeriodicTask):
+        if task.status == "interval" or (task_type.sync and task.status == "executing"):
+            due = max(task_type.started_after, task_type.last_run + task_type.interval)
+            if task_type.interval > 0 and (task_type.splay or task.group in splay_groups):
+                # first slot of the task's own phase at or after the due time
+                phase = splay_offset(task.id, task_type.interval)
+                return phase + math.ceil((due - phase) / task_type.interval) * task_type.interval
+            return due
+    elif isinstance(task_type, ScheduledTask):
+        if task.status == "waiting":
+            return next_scheduled(task_type, now)
+    elif isinstance(task_type, CronTask):
+        if task.status == "waiting":
+            return Cron.parse(task_type.expr).next(now)
+    return None
+
+
+class Scheduler:
+    """
+    Min-heap of (deadline, seq, task id).
+
+    Re-arming a task pushes a new entry and makes the previous one stale, stale
+    entries are skipped when popped. `run` sleeps until the earliest deadline
+    and is woken early when a sooner one is armed.
+    """
+    _instance = None
+
+    def __init__(self) -> None:
+        self._heap: List[Tuple[float, int, int]] = []
+        self._entries: Dict[int, Tuple[float, int]] = {}
+        self._seq = 0
+        self._wakeup: Optional[asyncio.Event] = None
+        self.splay_groups: Collection[str] = ()
+
+    def arm(self, task_id: int, deadline: Optional[float]) -> None:
+        if deadline is None:
+            self.disarm(task_id)
+            return
+        current = self._entries.get(task_id)
+        if current is not None and current[0] == deadline:
+            return
+        self._seq += 1
+        self._entries[task_id] = (deadline, self._seq)
+        heapq.heappush(self._heap, (deadline, self._seq, task_id))
+        if len(self._heap) > 2 * len(self._entries) + 64:
+            self._heap = [(d, s, i) for i, (d, s) in self._entries.items()]
+            heapq.heapify(self._heap)
+        if self._wakeup is not None and self._heap[0][1] == self._seq:
+            self._wakeup.set()
+
+    def disarm(self, task_id: int) -> None:
+        self._entries.pop(task_id, None)
+
+    def schedule(self, task: Task) -> None:
+        """
+        Re-arm a task from its current type, schedule and status.
+        :param task: Task
+        :return: None
+        """
+        self.arm(task.id, next_fire(task, time.time(), self.splay_groups))
+
+    def next_run(self, task_id: int) -> Optional[float]:
+        entry = self._entries.get(task_id)
+        return None if entry is None else entry[0]
+
+    def _pop_stale(self) -> None:
+        while self._heap:
+            deadline, seq, task_id = self._heap[0]
+            entry = self._entries.get(task_id)
+            if entry is not None and entry[1] == seq:
+                return
+            heapq.heappop(self._heap)
+
+    async def run(self, handler: Callable[[int], None], max_sleep: float) -> None:
+        """
+        Call `handler(task_id)` for every task whose deadline has passed.
+        :param handler: Called once per due task, must not block
+        :param max_sleep: Upper bound of a single sleep, guards against wall clock changes
+        :return: None
+        """
+        self._wakeup = asyncio.Event()
+        while True:
+            self._pop_stale()
+            now = time.time()
+            while self._heap and self._heap[0][0] <= now:
+                _, _, task_id = heapq.heappop(self._heap)
+                del self._entries[task_id]
+                handler(task_id)
+                self._pop_stale()
+
+            timeout = max_sleep
+            if self._heap:
+                timeout = min(max_sleep, self._heap[0][0] - now)
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def __new__(cls) -> "Scheduler":
+        if cls._instance is None:
+            cls._instance = super(Scheduler, cls).__new__(cls)
+        return cls._instance
+
+
+scheduler = Scheduler()